@@ -1,28 +1,98 @@
-from flask import Flask, request, jsonify, render_template
+from flask import (Flask, Blueprint, current_app, request, jsonify, render_template, Response, send_file,
+                   stream_with_context)
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.exc import IntegrityError
 from flask_cors import CORS
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import os
 import json
+import time
+import base64
+import csv
+import io
+import secrets
+import click
+from types import SimpleNamespace
 from werkzeug.security import generate_password_hash, check_password_hash
 import openai
 from dotenv import load_dotenv
+from config import config
+from db_pool import DatabasePool, engine_options
+from llm_client import LLMClient
+from jobs import JobQueue
+from response_cache import ResponseCache
+from single_flight import SingleFlight
+from keyword_matcher import KeywordMatcher
+from localization import LocalizationRegistry
+from inference import AnswerBankBackend, InferenceRouter, RemoteLLMBackend
+from emergency_dispatch import EmergencyDispatcher
+from metrics import Metrics
+from http_cache import HTTPCache
+from surveillance import OutbreakMonitor
+from chat_context import ChatContextBuilder, clip, count_tokens
+from voice_pipeline import AUDIO_TYPES, PipelineBusy, UploadTooLarge, VoicePipeline
+from translation import TranslationService
+from archive import ArchiveStore, month_key
+from prompts import CHAT_PROMPT, CHAT_SUMMARY_PROMPT, CONVERSATION_SUMMARY, RECOMMENDATIONS_PROMPT
+from triage_engine import symptom_codes, triage_engine
+from provider_index import ProviderIndex
+from patient_import import PatientValidationError, validate_patient, read_records, import_patients
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-here')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///rural_health.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Initialize extensions
-db = SQLAlchemy(app)
-CORS(app)
+# Extensions are created unbound and attached to the app in create_app()
+db = SQLAlchemy()
+db_pool = DatabasePool()
 
 # Set OpenAI API key
 openai.api_key = os.environ.get('OPENAI_API_KEY')
 
+# Shared, bounded LLM client used by both AI code paths
+llm_client = LLMClient()
+
+# Background jobs (Celery when a broker is configured, in-process otherwise)
+job_queue = JobQueue()
+
+# Cache of LLM recommendations keyed on normalized prompt inputs
+response_cache = ResponseCache()
+
+# Shares one LLM call among concurrent requests with the same prompt key
+single_flight = SingleFlight()
+
+# In-memory geo and text index over healthcare providers
+provider_index = ProviderIndex()
+
+# Canned responses for every supported language, reloaded when the file changes
+localization = LocalizationRegistry()
+
+# Per-route timings (DB, LLM, serialization) exported at /metrics
+metrics = Metrics()
+
+# ETags, 304s and cached bodies for read endpoints
+http_cache = HTTPCache()
+
+# Sliding-window symptom counts per location, for outbreak signals
+outbreak_monitor = OutbreakMonitor()
+
+# Recent chat turns and a rolling summary, fitted to a token budget
+chat_context = ChatContextBuilder()
+
+# Streamed voice uploads, transcoded and transcribed on a process pool
+voice_pipeline = VoicePipeline()
+
+# Sentence-level machine translation, batched and cached on disk
+translation = TranslationService()
+
+# Monthly archive files for chat messages and assessments older than ARCHIVE_AFTER_DAYS
+archive_store = ArchiveStore()
+
+api = Blueprint('api', __name__, cli_group=None)
+
+# Native JSON column: JSONB on Postgres, JSON (stored as text) elsewhere
+JSONValue = db.JSON().with_variant(JSONB(), 'postgresql')
+
 class Patient(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     full_name = db.Column(db.String(100), nullable=False)
@@ -31,13 +101,14 @@ class Patient(db.Model):
     phone = db.Column(db.String(20))
     location = db.Column(db.String(100))
     preferred_language = db.Column(db.String(5), default='en')  # Language preference
-    medical_conditions = db.Column(db.Text)  # JSON string
+    medical_conditions = db.Column(JSONValue)  # list of condition names
     medications = db.Column(db.Text)
     smoking = db.Column(db.String(10))
     alcohol = db.Column(db.String(10))
     exercise = db.Column(db.String(20))
     pregnancy = db.Column(db.String(10))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # HTTP cache validator
     
     # Relationship
     assessments = db.relationship('Assessment', backref='patient', lazy=True)
@@ -49,13 +120,63 @@ class Assessment(db.Model):
     primary_symptom = db.Column(db.String(50), nullable=False)
     symptom_onset = db.Column(db.String(20), nullable=False)
     symptom_severity = db.Column(db.String(20), nullable=False)
-    additional_symptoms = db.Column(db.Text)  # JSON string
+    additional_symptoms = db.Column(JSONValue)  # list of symptom codes
     pain_description = db.Column(db.Text)
-    breathing_details = db.Column(db.Text)  # JSON string
-    emergency_symptoms = db.Column(db.Text)  # JSON string
+    breathing_details = db.Column(JSONValue)  # list of symptom codes
+    emergency_symptoms = db.Column(JSONValue)  # list of symptom codes
     triage_level = db.Column(db.String(20), nullable=False)
     ai_recommendations = db.Column(db.Text)
+    recommendation_status = db.Column(db.String(10), default='pending')  # pending, ready, failed
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # HTTP cache validator
+    
+    # Indexed copy of the symptom lists above, one row per symptom
+    symptoms = db.relationship('AssessmentSymptom', backref='assessment', lazy=True,
+                               cascade='all, delete-orphan')
+    
+    __table_args__ = (
+        # Same index as database_schema.sql; lets the triage GROUP BY scan the index only
+        db.Index('idx_assessment_triage_level', 'triage_level'),
+        # A patient's assessments newest first, for the timeline
+        db.Index('idx_assessment_patient_created', 'patient_id', 'created_at', 'id'),
+        # Validator for a patient's assessment list: count and newest change, from the index alone
+        db.Index('idx_assessment_patient_updated', 'patient_id', 'updated_at'),
+        # Same index as database_schema.sql; bounds the surveillance rebuild to its horizon
+        db.Index('idx_assessment_created_at', 'created_at'),
+    )
+
+class AssessmentSymptom(db.Model):
+    """One reported symptom of an assessment, so symptom queries can use an index"""
+    assessment_id = db.Column(db.Integer, db.ForeignKey('assessment.id'), primary_key=True)
+    kind = db.Column(db.String(10), primary_key=True)  # additional, breathing, emergency
+    symptom = db.Column(db.String(50), primary_key=True)
+    
+    __table_args__ = (
+        # Symptom counts and "assessments reporting X" lookups scan the index only
+        db.Index('idx_assessment_symptom_kind_symptom', 'kind', 'symptom', 'assessment_id'),
+    )
+
+# Assessment JSON column behind each AssessmentSymptom kind
+SYMPTOM_KINDS = {
+    'additional': 'additional_symptoms',
+    'breathing': 'breathing_details',
+    'emergency': 'emergency_symptoms'
+}
+
+def indexed_symptoms(lists):
+    """(kind, symptom) pairs to index for a mapping of kind -> symptom codes.
+
+    'none' is the checklist's "no symptoms" answer, not a symptom, so it is
+    left out of the index and the symptom statistics.
+    """
+    return [(kind, symptom) for kind, symptoms in lists.items() for symptom in symptoms if symptom != 'none']
+
+def assessment_symptom_rows(assessment_id, lists):
+    """AssessmentSymptom rows for a mapping of kind -> symptom codes"""
+    return [
+        {'assessment_id': assessment_id, 'kind': kind, 'symptom': symptom}
+        for kind, symptom in indexed_symptoms(lists)
+    ]
 
 class Consultation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -69,9 +190,17 @@ class Consultation(db.Model):
     status = db.Column(db.String(20), default='active')  # active, completed, cancelled
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime)
+    # Rolling summary of messages up to summary_through_id, for chat prompts
+    summary = db.Column(db.Text)
+    summary_tokens = db.Column(db.Integer)
+    summary_through_id = db.Column(db.Integer)
     
     # Relationship
     messages = db.relationship('ChatMessage', backref='consultation', lazy=True)
+    
+    __table_args__ = (
+        db.Index('idx_consultation_patient_created', 'patient_id', 'created_at', 'id'),
+    )
 
 class ChatMessage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -81,6 +210,14 @@ class ChatMessage(db.Model):
     language = db.Column(db.String(5), default='en')
     audio_url = db.Column(db.String(255))  # For voice messages
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    token_count = db.Column(db.Integer)  # estimated prompt tokens, set when saved
+    
+    __table_args__ = (
+        # Serves keyset pagination of a consultation's messages
+        db.Index('idx_chat_message_consultation_timestamp', 'consultation_id', 'timestamp', 'id'),
+        # A consultation's newest unsummarized messages, for chat prompts
+        db.Index('idx_chat_message_consultation_id', 'consultation_id', 'id'),
+    )
 
 class HealthcareProvider(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -90,174 +227,273 @@ class HealthcareProvider(db.Model):
     phone = db.Column(db.String(20))
     email = db.Column(db.String(100))
     availability = db.Column(db.String(50))
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('idx_provider_lat_lng', 'latitude', 'longitude'),
+    )
+
+class StatCounter(db.Model):
+    """Running totals behind /api/stats, kept in step with the rows they count"""
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class EmergencyEvent(db.Model):
+    """Append-only log of emergency alerts; only ``planned`` and ``plan_error`` change after insert"""
+    id = db.Column(db.Integer, primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'))
+    symptoms = db.Column(JSONValue)  # list of symptom codes
+    location = db.Column(db.String(100))
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    planned = db.Column(db.Boolean, nullable=False, default=False)  # deliveries created
+    plan_error = db.Column(db.String(255))  # set when the dispatcher gave up planning the event
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    patient = db.relationship('Patient')
+    deliveries = db.relationship('EmergencyDelivery', backref='event', lazy=True)
+    
+    __table_args__ = (
+        db.Index('idx_emergency_event_planned', 'planned', 'id'),
+        db.Index('idx_emergency_event_patient_created', 'patient_id', 'created_at', 'id'),
+    )
+
+class EmergencyDelivery(db.Model):
+    """One notification of an emergency event, retried until sent or out of attempts"""
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('emergency_event.id'), nullable=False)
+    notifier = db.Column(db.String(30), nullable=False)
+    target = db.Column(JSONValue)  # notifier-specific, e.g. provider id and phone
+    status = db.Column(db.String(10), nullable=False, default='pending')  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # or lease expiry while sending
+    last_error = db.Column(db.String(255))
+    delivered_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        # The dispatcher's "what is due" scan
+        db.Index('idx_emergency_delivery_due', 'status', 'next_attempt_at'),
+    )
+
+class VoiceMessage(db.Model):
+    """An uploaded recording on its way through transcription into the chat"""
+    id = db.Column(db.Integer, primary_key=True)
+    consultation_id = db.Column(db.Integer, db.ForeignKey('consultation.id'), nullable=False)
+    language = db.Column(db.String(5), default='en')
+    audio_path = db.Column(db.String(255), nullable=False)
+    size_bytes = db.Column(db.Integer)
+    duration_seconds = db.Column(db.Float)
+    status = db.Column(db.String(12), nullable=False, default='processing')  # processing, replying, done, failed
+    transcript = db.Column(db.Text)
+    reply = db.Column(db.Text)
+    chat_message_id = db.Column(db.Integer, db.ForeignKey('chat_message.id'))
+    error = db.Column(db.String(255))
+    timings = db.Column(JSONValue)  # seconds per stage: upload, queue, transcode, transcribe, reply, total
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        # Messages a voice message points to are kept out of the archive
+        db.Index('idx_voice_message_chat_message_id', 'chat_message_id'),
+    )
+
+class ChatReply(db.Model):
+    """A chat message waiting on the virtual doctor's reply from a background job"""
+    id = db.Column(db.String(32), primary_key=True, default=lambda: secrets.token_hex(16))
+    consultation_id = db.Column(db.Integer, db.ForeignKey('consultation.id'))
+    language = db.Column(db.String(5), default='en')
+    message = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='pending')  # pending, done, failed
+    reply = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
 
 class VirtualDoctorAI:
+    # Canned response for each keyword category, in order of precedence
+    KEYWORD_RESPONSES = {
+        'emergency': 'emergency',
+        'pain': 'pain_scale',
+        'symptom': 'symptom_inquiry',
+        'duration': 'duration'
+    }
+    
     @staticmethod
-    def get_language_responses():
-        return {
-            'en': {
-                'greeting': "Hello! I'm your AI doctor assistant. How can I help you today?",
-                'symptom_inquiry': "Can you describe your symptoms in detail?",
-                'pain_scale': "On a scale of 1-10, how would you rate your pain?",
-                'duration': "How long have you been experiencing these symptoms?",
-                'emergency': "This sounds like it could be an emergency. Please seek immediate medical attention.",
-                'followup': "I recommend following up with a healthcare provider within 24-48 hours."
-            },
-            'hi': {
-                'greeting': "नमस्ते! मैं आपका AI डॉक्टर सहायक हूं। आज मैं आपकी कैसे मदद कर सकता हूं?",
-                'symptom_inquiry': "कृपया अपने लक्षणों का विस्तार से वर्णन करें?",
-                'pain_scale': "1-10 के पैमाने पर, आप अपने दर्द को कैसे रेट करेंगे?",
-                'duration': "आप कितने समय से इन लक्षणों का अनुभव कर रहे हैं?",
-                'emergency': "यह एक आपातकाल हो सकता है। कृपया तुरंत चिकित्सा सहायता लें।",
-                'followup': "मैं सुझाता हूं कि 24-48 घंटों के भीतर किसी स्वास्थ्य सेवा प्रदाता से संपर्क करें।"
-            }
-        }
+    def keyword_response(message, language='en'):
+        """Canned response when the message matches a keyword category, else None"""
+        # Emergency and context keyword detection in a single pass
+        category = current_app.extensions['keyword_matcher'].first_category(message)
+        if category not in VirtualDoctorAI.KEYWORD_RESPONSES:
+            return None
+        
+        return VirtualDoctorAI.canned_response(language, VirtualDoctorAI.KEYWORD_RESPONSES[category])
+    
+    @staticmethod
+    def fallback_response(language='en'):
+        """Canned greeting used when the AI response cannot be generated"""
+        return VirtualDoctorAI.canned_response(language, 'greeting')
+    
+    @staticmethod
+    def canned_response(language, key):
+        """Localized response text, machine-translated where the table only has English
+
+        English is returned until the translation is cached, rather than
+        waiting on the backend.
+        """
+        text = localization.get(language, key)
+        if localization.is_fallback(language, key):
+            return translation.translate(text, language, source='en', wait=False)
+        return text
+    
+    @staticmethod
+    def in_language(text, language, prompt_language):
+        """A reply generated in ``prompt_language``, translated to ``language`` if they differ"""
+        if text is None or prompt_language == language:
+            return text
+        return translation.translate(text, language, source=prompt_language)
+    
+    @staticmethod
+    def build_chat_messages(message, patient_data, language='en'):
+        """GPT-4 chat messages for a patient message, after the consultation history if there is one"""
+        messages = CHAT_PROMPT.render(
+            language=language,
+            age=patient_data.get('age', 'Unknown'),
+            gender=patient_data.get('gender', 'Unknown'),
+            medical_conditions=patient_data.get('medical_conditions', 'None'),
+            message=message
+        )
+        conversation = patient_data.get('conversation')
+        if conversation is not None:
+            messages[1:1] = conversation.messages(CONVERSATION_SUMMARY)
+        return messages
     
     @staticmethod
     def generate_contextual_response(message, patient_data, language='en'):
         """Generate AI response using GPT-4 with context"""
         try:
-            language_responses = VirtualDoctorAI.get_language_responses()
-            responses = language_responses.get(language, language_responses['en'])
-            
-            # Emergency keyword detection
-            emergency_keywords = [
-                'chest pain', 'difficulty breathing', 'severe bleeding', 'unconscious',
-                'heart attack', 'stroke', 'seizure', 'can\'t breathe', 'choking'
-            ]
-            
-            if any(keyword in message.lower() for keyword in emergency_keywords):
-                return responses['emergency']
-            
-            # Context-aware responses
-            if 'pain' in message.lower():
-                return responses['pain_scale']
-            elif any(word in message.lower() for word in ['fever', 'headache', 'cough', 'symptoms']):
-                return responses['symptom_inquiry']
-            elif any(word in message.lower() for word in ['how long', 'when', 'started']):
-                return responses['duration']
-            
-            # Use GPT-4 for complex responses
-            prompt = f"""
-            You are an AI doctor assistant helping rural patients in India. 
-            Respond in {language} language.
-            
-            Patient context:
-            - Age: {patient_data.get('age', 'Unknown')}
-            - Gender: {patient_data.get('gender', 'Unknown')}
-            - Medical history: {patient_data.get('medical_conditions', 'None')}
+            response = VirtualDoctorAI.keyword_response(message, language)
+            if response is not None:
+                return response
             
-            Patient message: {message}
-            
-            Provide a helpful, empathetic medical response. Keep it simple and practical for rural settings.
-            """
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": f"You are a compassionate AI doctor assistant. Respond in {language} language with culturally appropriate medical guidance for rural India."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
-            
-            return response.choices[0].message.content
+            # GPT-4 for complex responses, or the local engine when it is slow or down.
+            # Languages in TRANSLATION_LLM_LANGUAGES are answered in English and translated
+            prompt_language = translation.prompt_language(language)
+            response = inference_router.generate(message, patient_data, prompt_language)
+            if response is not None:
+                return VirtualDoctorAI.in_language(response, language, prompt_language)
             
         except Exception as e:
             print(f"AI response error: {e}")
-            language_responses = VirtualDoctorAI.get_language_responses()
-            return language_responses.get(language, language_responses['en'])['greeting']
+        return VirtualDoctorAI.fallback_response(language)
+
+def load_answer_pairs(limit):
+    """Recent (language, patient message, doctor reply) pairs from chat history"""
+    rows = db.session.query(
+        ChatMessage.id, ChatMessage.consultation_id, ChatMessage.sender,
+        ChatMessage.content, ChatMessage.language, ChatMessage.timestamp
+    ).order_by(ChatMessage.id.desc()).limit(limit * 2).all()
+    rows.sort(key=lambda row: (row.consultation_id, row.timestamp, row.id))
+    
+    # Canned replies say nothing about the question, so they are not answers
+    canned = localization.all_texts()
+    return [
+        (reply.language, question.content, reply.content)
+        for question, reply in zip(rows, rows[1:])
+        if question.sender == 'user' and reply.sender == 'doctor'
+        and question.consultation_id == reply.consultation_id and reply.content not in canned
+    ]
+
+# Remote GPT-4 with hedging to a local answer bank and a circuit breaker
+inference_router = InferenceRouter(
+    remote=RemoteLLMBackend(llm_client, VirtualDoctorAI.build_chat_messages, max_tokens=500, temperature=0.7),
+    local_backends=[AnswerBankBackend(load_answer_pairs)]
+)
 
 # Triage Logic
 class TriageSystem:
     @staticmethod
     def calculate_triage_level(symptom_data):
         """Calculate triage level based on symptoms"""
-        
-        # Emergency conditions
-        emergency_symptoms = symptom_data.get('emergency_symptoms', [])
-        if emergency_symptoms and 'none' not in emergency_symptoms:
-            return 'emergency'
-        
-        # Very severe symptoms
-        if symptom_data.get('symptom_severity') == 'very_severe':
-            return 'emergency'
-        
-        # Urgent conditions
-        primary_symptom = symptom_data.get('primary_symptom')
-        severity = symptom_data.get('symptom_severity')
-        onset = symptom_data.get('symptom_onset')
-        
-        urgent_conditions = [
-            primary_symptom == 'chest_pain' and severity == 'severe',
-            primary_symptom == 'breathing_difficulty',
-            severity == 'severe' and primary_symptom in ['fever', 'abdominal_pain'],
-            onset == 'today' and severity == 'severe'
-        ]
-        
-        if any(urgent_conditions):
-            return 'urgent'
-        
-        # Moderate severity conditions
-        if (severity == 'severe' or 
-            (severity == 'moderate' and primary_symptom in ['fever', 'chest_pain', 'abdominal_pain'])):
-            return 'urgent'
-        
-        return 'routine'
+        return triage_engine.score(symptom_data)
     
     @staticmethod
-    def generate_ai_recommendations(patient_data, symptom_data, triage_level):
-        """Generate AI-powered recommendations using GPT-4"""
+    def calculate_triage_levels(records):
+        """Calculate triage levels for many symptom records in one vectorized pass"""
+        return triage_engine.score_batch(records)
+    
+    @staticmethod
+    def recommendation_cache_key(patient_data, symptom_data, triage_level):
+        """Cache key for the inputs of the recommendation prompt"""
+        age = patient_data.get('age')
+        return response_cache.make_key('recommendations', {
+            'prompt': RECOMMENDATIONS_PROMPT.id,
+            'age_band': int(age) // 10 * 10 if age is not None else None,
+            'gender': patient_data.get('gender'),
+            'conditions': patient_data.get('conditions', []),
+            'medications': patient_data.get('medications'),
+            'smoking': patient_data.get('smoking'),
+            'alcohol': patient_data.get('alcohol'),
+            'primary_symptom': symptom_data.get('primary_symptom'),
+            'symptom_severity': symptom_data.get('symptom_severity'),
+            'symptom_onset': symptom_data.get('symptom_onset'),
+            'additional_symptoms': symptom_data.get('additional_symptoms', []),
+            'triage_level': triage_level
+        })
+    
+    @staticmethod
+    def generate_ai_recommendations(patient_data, symptom_data, triage_level, bypass_cache=False,
+                                    raise_errors=False):
+        """Generate AI-powered recommendations using GPT-4
+
+        Errors give a generic placeholder unless ``raise_errors`` is set, so
+        the background job can mark the assessment failed instead of storing it.
+        """
         try:
-            prompt = f"""
-            As a medical AI assistant, provide personalized healthcare recommendations for a patient with the following information:
-            
-            Patient Information:
-            - Age: {patient_data.get('age')}
-            - Gender: {patient_data.get('gender')}
-            - Medical Conditions: {patient_data.get('conditions', [])}
-            - Medications: {patient_data.get('medications', 'None')}
-            - Lifestyle: Smoking: {patient_data.get('smoking', 'No')}, Alcohol: {patient_data.get('alcohol', 'No')}
-            
-            Symptoms:
-            - Primary Symptom: {symptom_data.get('primary_symptom')}
-            - Severity: {symptom_data.get('symptom_severity')}
-            - Onset: {symptom_data.get('symptom_onset')}
-            - Additional Symptoms: {symptom_data.get('additional_symptoms', [])}
+            cache_key = TriageSystem.recommendation_cache_key(patient_data, symptom_data, triage_level)
+            cached = response_cache.get(cache_key, bypass=bypass_cache)
+            if cached is not None:
+                return cached
             
-            Triage Level: {triage_level}
+            def call_llm():
+                recommendations = llm_client.complete(
+                    messages=RECOMMENDATIONS_PROMPT.render(
+                        age=patient_data.get('age'),
+                        gender=patient_data.get('gender'),
+                        conditions=patient_data.get('conditions', []),
+                        medications=patient_data.get('medications', 'None'),
+                        smoking=patient_data.get('smoking', 'No'),
+                        alcohol=patient_data.get('alcohol', 'No'),
+                        primary_symptom=symptom_data.get('primary_symptom'),
+                        symptom_severity=symptom_data.get('symptom_severity'),
+                        symptom_onset=symptom_data.get('symptom_onset'),
+                        additional_symptoms=symptom_data.get('additional_symptoms', []),
+                        triage_level=triage_level
+                    ),
+                    max_tokens=1000,
+                    temperature=0.3
+                )
+                response_cache.set(cache_key, recommendations)
+                return recommendations
             
-            Please provide:
-            1. Specific self-care recommendations
-            2. Warning signs to watch for
-            3. When to seek immediate medical attention
-            4. Lifestyle modifications if applicable
-            5. Follow-up recommendations
-            
-            Keep recommendations practical for rural healthcare settings in India.
-            """
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a medical AI assistant specializing in rural healthcare in India. Provide practical, culturally appropriate medical guidance."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1000,
-                temperature=0.3
-            )
-            
-            return response.choices[0].message.content
+            # Concurrent requests with the same prompt key share one upstream call
+            return single_flight.do(cache_key, call_llm)
             
         except Exception as e:
             print(f"AI recommendation error: {e}")
+            if raise_errors:
+                raise
             return "Please consult with a healthcare provider for personalized recommendations."
 
-@app.route('/api/chat', methods=['POST'])
+@api.route('/api/chat', methods=['POST'])
 def chat_with_doctor():
-    """Handle chat messages with virtual doctor"""
+    """Handle chat messages with virtual doctor
+
+    Canned replies are returned straight away. Replies from the AI are
+    generated by a background job, so no request thread waits on GPT-4;
+    the client polls the returned status_url for them.
+    """
     try:
         data = request.get_json()
         message = data.get('message')
@@ -268,42 +504,458 @@ def chat_with_doctor():
         if not message:
             return jsonify({'error': 'Message is required'}), 400
         
-        # Generate AI response
-        response = VirtualDoctorAI.generate_contextual_response(
-            message, patient_data, language
-        )
+        response = VirtualDoctorAI.keyword_response(message, language)
+        if response is not None:
+            if consultation_id:
+                save_chat_exchange(consultation_id, message, response, language)
+            return jsonify({
+                'status': 'done',
+                'response': response,
+                'language': language,
+                'timestamp': datetime.utcnow().isoformat()
+            })
         
-        # Save messages to database if consultation_id provided
-        if consultation_id:
-            # Save user message
-            user_message = ChatMessage(
-                consultation_id=consultation_id,
-                sender='user',
-                content=message,
-                language=language
-            )
-            db.session.add(user_message)
+        chat_reply = ChatReply(consultation_id=consultation_id, language=language, message=message)
+        db.session.add(chat_reply)
+        db.session.commit()
+        job_queue.enqueue(answer_chat_message, chat_reply.id, patient_data)
+        
+        return jsonify({
+            'reply_id': chat_reply.id,
+            'status': chat_reply.status,
+            'language': language,
+            'status_url': f'/api/chat/{chat_reply.id}'
+        }), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@job_queue.task
+def answer_chat_message(reply_id, patient_data):
+    """Background job: generate the virtual doctor's reply to a chat message"""
+    chat_reply = ChatReply.query.get(reply_id)
+    if chat_reply is None or chat_reply.status != 'pending':
+        return
+    
+    try:
+        patient_data = {**patient_data, 'conversation': conversation_context(chat_reply.consultation_id)}
+        response = VirtualDoctorAI.generate_contextual_response(chat_reply.message, patient_data, chat_reply.language)
+        if chat_reply.consultation_id:
+            save_chat_exchange(chat_reply.consultation_id, chat_reply.message, response, chat_reply.language)
+        chat_reply.status, chat_reply.reply = 'done', response
+    except Exception:
+        db.session.rollback()
+        chat_reply.status, chat_reply.reply = 'failed', VirtualDoctorAI.fallback_response(chat_reply.language)
+        raise
+    finally:
+        chat_reply.completed_at = datetime.utcnow()
+        db.session.commit()
+
+@api.route('/api/chat/<reply_id>', methods=['GET'])
+def get_chat_reply(reply_id):
+    """Status and reply of a chat message, optionally long-polling until it is answered"""
+    try:
+        wait = min(max(request.args.get('wait', 0, type=float), 0), current_app.config['CHAT_MAX_WAIT'])
+        deadline = time.monotonic() + wait
+        
+        while True:
+            chat_reply = ChatReply.query.get(reply_id)
+            if not chat_reply:
+                return jsonify({'error': 'Chat reply not found'}), 404
+            if chat_reply.status != 'pending' or time.monotonic() >= deadline:
+                break
             
-            # Save AI response
-            ai_message = ChatMessage(
-                consultation_id=consultation_id,
-                sender='doctor',
-                content=response,
-                language=language
-            )
-            db.session.add(ai_message)
-            db.session.commit()
+            # Release the connection while the job works
+            db.session.rollback()
+            time.sleep(0.25)
         
         return jsonify({
+            'reply_id': chat_reply.id,
+            'status': chat_reply.status,
+            'response': chat_reply.reply,
+            'language': chat_reply.language,
+            'timestamp': (chat_reply.completed_at or chat_reply.created_at).isoformat()
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def save_chat_exchange(consultation_id, message, response, language, audio_url=None):
+    """Persist a user message and the doctor's reply; returns the user message"""
+    user_message = ChatMessage(
+        consultation_id=consultation_id,
+        sender='user',
+        content=message,
+        language=language,
+        audio_url=audio_url,
+        token_count=count_tokens(message)
+    )
+    db.session.add(user_message)
+    db.session.add(ChatMessage(
+        consultation_id=consultation_id,
+        sender='doctor',
+        content=response,
+        language=language,
+        token_count=count_tokens(response)
+    ))
+    db.session.commit()
+    return user_message
+
+def unsummarized_messages(consultation_id, through_id, limit, newest_first=True):
+    """(id, sender, content, token_count) rows after the consultation's summary"""
+    order = ChatMessage.id.desc() if newest_first else ChatMessage.id
+    return db.session.query(
+        ChatMessage.id, ChatMessage.sender, ChatMessage.content, ChatMessage.token_count
+    ).filter(
+        ChatMessage.consultation_id == consultation_id, ChatMessage.id > (through_id or 0)
+    ).order_by(order).limit(limit).all()
+
+def conversation_context(consultation_id):
+    """Summary and newest turns of a consultation that fit CHAT_CONTEXT_TOKENS, or None"""
+    if not consultation_id or not chat_context.enabled:
+        return None
+    
+    consultation = db.session.query(
+        Consultation.summary, Consultation.summary_tokens, Consultation.summary_through_id
+    ).filter(Consultation.id == consultation_id).first()
+    if consultation is None:
+        return None
+    
+    rows = unsummarized_messages(consultation_id, consultation.summary_through_id, chat_context.max_messages)
+    context = chat_context.select(consultation.summary, consultation.summary_tokens, rows)
+    if context.needs_summary and chat_context.claim(consultation_id):
+        job_queue.enqueue(summarize_consultation, consultation_id)
+    return context
+
+@job_queue.task
+def summarize_consultation(consultation_id):
+    """Background job: fold a consultation's older messages into its rolling summary"""
+    consultation = Consultation.query.get(consultation_id)
+    if consultation is None:
+        return
+    through_id = consultation.summary_through_id
+    
+    # Leave the newest messages for the prompt; fold up to fold_batch older ones
+    newest = unsummarized_messages(consultation_id, through_id, chat_context.max_messages)
+    keep = chat_context.keep_count(newest)
+    if keep == len(newest):
+        return
+    keep_from = newest[keep - 1].id if keep else newest[0].id + 1
+    folded = [row for row in unsummarized_messages(consultation_id, through_id, chat_context.fold_batch, False)
+              if row.id < keep_from]
+    if not folded:
+        return
+    
+    # The job does not wait on the completion; it is stored by store_consultation_summary
+    def finished(future):
+        summary = None
+        try:
+            summary = future.result()
+        except BaseException as e:
+            print(f"Chat summary error: {e}")
+        job_queue.enqueue(store_consultation_summary, consultation_id, through_id, folded[-1].id, summary)
+    
+    try:
+        llm_client.submit(
+            messages=CHAT_SUMMARY_PROMPT.render(
+                language=consultation.language or 'en',
+                max_words=chat_context.summary_budget * 3 // 4,
+                summary=consultation.summary or 'None',
+                transcript=chat_context.transcript(folded)
+            ),
+            max_tokens=chat_context.summary_budget,
+            temperature=0.2
+        ).add_done_callback(finished)
+    except Exception as e:
+        print(f"Chat summary error: {e}")
+        store_consultation_summary(consultation_id, through_id, folded[-1].id, None)
+
+@job_queue.task
+def store_consultation_summary(consultation_id, through_id, folded_through_id, summary):
+    """Background job: store a summary of a consultation's messages up to ``folded_through_id``
+
+    Without a summary from the LLM the folded messages are compacted instead.
+    """
+    consultation = Consultation.query.get(consultation_id)
+    if consultation is None:
+        return
+    folded = [row for row in unsummarized_messages(consultation_id, through_id, chat_context.fold_batch, False)
+              if row.id <= folded_through_id]
+    if not folded:
+        return
+    
+    fallback = not summary
+    if fallback:
+        summary = chat_context.compact(consultation.summary, folded)
+    summary = clip(summary, chat_context.summary_budget)
+    
+    # Another job may have folded these messages first; only one update wins
+    current = (Consultation.summary_through_id.is_(None) if through_id is None
+               else Consultation.summary_through_id == through_id)
+    updated = Consultation.query.filter(Consultation.id == consultation_id, current).update({
+        'summary': summary,
+        'summary_tokens': count_tokens(summary),
+        'summary_through_id': folded[-1].id
+    }, synchronize_session=False)
+    db.session.commit()
+    if updated:
+        chat_context.summarized(fallback)
+        if len(folded) == chat_context.fold_batch:
+            job_queue.enqueue(summarize_consultation, consultation_id)
+
+def sse_event(event, payload):
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+@api.route('/api/chat/stream', methods=['POST'])
+def stream_chat_with_doctor():
+    """Stream the virtual doctor's reply as Server-Sent Events"""
+    data = request.get_json()
+    message = data.get('message')
+    language = data.get('language', 'en')
+    patient_data = data.get('patientData', {})
+    consultation_id = data.get('consultation_id')
+    
+    if not message:
+        return jsonify({'error': 'Message is required'}), 400
+    
+    patient_data = {**patient_data, 'conversation': conversation_context(consultation_id)}
+    
+    def generate():
+        # Send a comment straight away so the client gets its first byte
+        # before the LLM has produced anything
+        yield ': connected\n\n'
+        
+        response = VirtualDoctorAI.keyword_response(message, language)
+        if response is not None:
+            yield sse_event('token', {'content': response})
+        else:
+            parts = []
+            prompt_language = translation.prompt_language(language)
+            try:
+                chunks = inference_router.stream(message, patient_data, prompt_language)
+                if prompt_language != language:
+                    # Sent a sentence at a time, as each one is translated
+                    chunks = translation.translate_stream(chunks, language, source=prompt_language)
+                for chunk in chunks:
+                    parts.append(chunk)
+                    yield sse_event('token', {'content': chunk})
+                response = ''.join(parts)
+                if not response:
+                    raise ValueError('Empty LLM response')
+            except Exception as e:
+                print(f"AI stream error: {e}")
+                # Replaces any partial text the client has already shown
+                response = (VirtualDoctorAI.in_language(
+                                inference_router.local_reply(message, patient_data, prompt_language),
+                                language, prompt_language
+                            ) or VirtualDoctorAI.fallback_response(language))
+                yield sse_event('fallback', {'content': response})
+        
+        if consultation_id:
+            try:
+                save_chat_exchange(consultation_id, message, response, language)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Chat persistence error: {e}")
+        
+        yield sse_event('done', {
             'response': response,
             'language': language,
             'timestamp': datetime.utcnow().isoformat()
         })
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@api.route('/api/translate', methods=['POST'])
+def translate_texts():
+    """Translate a batch of texts into one target language"""
+    try:
+        data = request.get_json()
+        texts = data.get('texts')
+        target = data.get('target')
+        
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            return jsonify({'error': 'texts must be a list of strings'}), 400
+        if target not in current_app.config['SUPPORTED_LANGUAGES']:
+            return jsonify({'error': 'Unsupported target language'}), 400
+        if len(texts) > current_app.config['TRANSLATION_MAX_TEXTS']:
+            return jsonify({'error': f"At most {current_app.config['TRANSLATION_MAX_TEXTS']} texts per request"}), 413
+        
+        return jsonify({
+            'target': target,
+            'translations': translation.translate_many(texts, target, source=data.get('source', 'auto'))
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/consultation/<int:consultation_id>/voice', methods=['POST'])
+def upload_voice_message(consultation_id):
+    """Accept a recording as the raw request body; it is transcribed and answered in the background"""
+    try:
+        if not voice_pipeline.enabled:
+            return jsonify({'error': 'Voice messages are disabled'}), 404
+        
+        consultation = db.session.query(
+            Consultation.id, Consultation.language, Consultation.audio_enabled
+        ).filter(Consultation.id == consultation_id).first()
+        if consultation is None:
+            return jsonify({'error': 'Consultation not found'}), 404
+        if not consultation.audio_enabled:
+            return jsonify({'error': 'Voice messages are not enabled for this consultation'}), 403
+        
+        voice_pipeline.check_capacity()
+        
+        extension = AUDIO_TYPES.get(request.mimetype)
+        if extension is None:
+            return jsonify({'error': f'Unsupported audio type: {request.mimetype or "none"}',
+                            'supported': sorted(AUDIO_TYPES)}), 415
+        
+        language = request.args.get('language') or consultation.language or 'en'
+        path = os.path.join(voice_pipeline.upload_dir, f'{secrets.token_hex(16)}.{extension}')
+        size, upload_seconds = voice_pipeline.save_upload(request.stream, path, request.content_length)
+        if not size:
+            os.remove(path)
+            return jsonify({'error': 'Empty recording'}), 400
+        
+        voice = VoiceMessage(
+            consultation_id=consultation_id, language=language, audio_path=path, size_bytes=size,
+            timings={'upload': upload_seconds}
+        )
+        db.session.add(voice)
+        db.session.commit()
+        voice_id = voice.id
+        voice_pipeline.observe({'upload': upload_seconds})
+        
+        try:
+            voice_pipeline.submit(
+                path, language, lambda outcome: job_queue.enqueue(answer_voice_message, voice_id, outcome)
+            )
+        except PipelineBusy:
+            os.remove(path)
+            finish_voice_message(voice, 'failed', error='Rejected: transcription queue full')
+            raise
+        
+        return jsonify({
+            'voice_id': voice_id,
+            'status': voice.status,
+            'status_url': f'/api/voice/{voice_id}'
+        }), 202
+        
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except PipelineBusy as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+def finish_voice_message(voice, status, **fields):
+    """Record the final state of a voice message and its total time"""
+    voice.status = status
+    for name, value in fields.items():
+        setattr(voice, name, value)
+    voice.completed_at = datetime.utcnow()
+    voice.timings = {**(voice.timings or {}), 'total': (voice.completed_at - voice.created_at).total_seconds()}
+    db.session.commit()
+    voice_pipeline.observe({'total': voice.timings['total']})
+
+@job_queue.task
+def answer_voice_message(voice_id, outcome):
+    """Background job: send a transcribed voice message through the chat flow"""
+    voice = VoiceMessage.query.get(voice_id)
+    if voice is None or voice.status != 'processing':
+        return
+    
+    timings = {**(voice.timings or {}), **outcome.get('timings', {})}
+    if 'error' in outcome:
+        finish_voice_message(voice, 'failed', error=outcome['error'][:255], timings=timings)
+        return
+    if not outcome['transcript']:
+        finish_voice_message(voice, 'failed', error='No speech recognized', timings=timings,
+                             duration_seconds=outcome['seconds'])
+        return
+    
+    voice.status = 'replying'
+    voice.transcript = outcome['transcript']
+    voice.duration_seconds = outcome['seconds']
+    voice.timings = timings
+    db.session.commit()
+    
+    try:
+        started = time.perf_counter()
+        patient = Patient.query.join(Consultation, Consultation.patient_id == Patient.id).filter(
+            Consultation.id == voice.consultation_id
+        ).first()
+        patient_data = {
+            'age': patient.age,
+            'gender': patient.gender,
+            'medical_conditions': patient.medical_conditions or [],
+            'conversation': conversation_context(voice.consultation_id)
+        }
+        reply = VirtualDoctorAI.generate_contextual_response(voice.transcript, patient_data, voice.language)
+        user_message = save_chat_exchange(
+            voice.consultation_id, voice.transcript, reply, voice.language, audio_url=f'/api/voice/{voice.id}/audio'
+        )
+        reply_seconds = time.perf_counter() - started
+        voice_pipeline.observe({'reply': reply_seconds})
+        finish_voice_message(voice, 'done', reply=reply, chat_message_id=user_message.id,
+                             timings={**timings, 'reply': reply_seconds})
+    except Exception as e:
+        db.session.rollback()
+        finish_voice_message(voice, 'failed', error=f'Reply failed: {e}'[:255])
+        raise
+
+@api.route('/api/voice/<int:voice_id>', methods=['GET'])
+def get_voice_message(voice_id):
+    """Status, transcript and reply of a voice message, optionally long-polling until it finishes"""
+    try:
+        wait = min(max(request.args.get('wait', 0, type=float), 0), current_app.config['VOICE_MAX_WAIT'])
+        deadline = time.monotonic() + wait
+        
+        while True:
+            voice = VoiceMessage.query.get(voice_id)
+            if not voice:
+                return jsonify({'error': 'Voice message not found'}), 404
+            if voice.status in ('done', 'failed') or time.monotonic() >= deadline:
+                break
+            
+            # Release the connection while the pipeline works
+            db.session.rollback()
+            time.sleep(0.25)
+        
+        return jsonify({
+            'voice_id': voice.id,
+            'consultation_id': voice.consultation_id,
+            'status': voice.status,
+            'language': voice.language,
+            'duration_seconds': voice.duration_seconds,
+            'transcript': voice.transcript,
+            'reply': voice.reply,
+            'chat_message_id': voice.chat_message_id,
+            'error': voice.error,
+            'timings_ms': {stage: round(seconds * 1000, 1) for stage, seconds in (voice.timings or {}).items()},
+            'audio_url': f'/api/voice/{voice.id}/audio'
+        })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/consultation', methods=['POST'])
+@api.route('/api/voice/<int:voice_id>/audio', methods=['GET'])
+def get_voice_audio(voice_id):
+    """The original recording"""
+    path = db.session.query(VoiceMessage.audio_path).filter(VoiceMessage.id == voice_id).scalar()
+    if path is None or not os.path.exists(path):
+        return jsonify({'error': 'Recording not found'}), 404
+    return send_file(path, conditional=True)
+
+@api.route('/api/consultation', methods=['POST'])
 def start_consultation():
     """Start a new consultation session"""
     try:
@@ -335,6 +987,7 @@ def start_consultation():
         )
         
         db.session.add(consultation)
+        increment_stats(total_consultations=1)
         db.session.commit()
         
         return jsonify({
@@ -351,31 +1004,86 @@ def start_consultation():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/consultation/<int:consultation_id>/messages', methods=['GET'])
+def encode_message_cursor(timestamp, message_id):
+    """Opaque keyset cursor for a (timestamp, id) position"""
+    raw = f"{timestamp.isoformat()}|{message_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_message_cursor(cursor):
+    """Inverse of encode_message_cursor; raises ValueError on bad input"""
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    timestamp, message_id = raw.split('|')
+    return datetime.fromisoformat(timestamp), int(message_id)
+
+@api.route('/api/consultation/<int:consultation_id>/messages', methods=['GET'])
 def get_consultation_messages(consultation_id):
-    """Get all messages for a consultation"""
-    try:
-        messages = ChatMessage.query.filter_by(
-            consultation_id=consultation_id
-        ).order_by(ChatMessage.timestamp.asc()).all()
-        
-        result = []
-        for message in messages:
-            result.append({
-                'id': message.id,
-                'sender': message.sender,
-                'content': message.content,
-                'language': message.language,
-                'timestamp': message.timestamp.isoformat()
-            })
+    """Get messages for a consultation, oldest first, a page at a time
+
+    Without ``since`` or ``limit`` the response is the bare list of every
+    message, as it was before paging, so older clients keep working.
+    """
+    try:
+        since = request.args.get('since')
+        paged = since is not None or 'limit' in request.args
+        limit = request.args.get('limit', current_app.config['MESSAGES_PAGE_SIZE'], type=int)
+        limit = max(1, min(limit, current_app.config['MESSAGES_PAGE_MAX']))
+        
+        query = db.session.query(
+            ChatMessage.id,
+            ChatMessage.sender,
+            ChatMessage.content,
+            ChatMessage.language,
+            ChatMessage.timestamp
+        ).filter(ChatMessage.consultation_id == consultation_id)
+        
+        if since:
+            try:
+                since_timestamp, since_id = decode_message_cursor(since)
+            except (ValueError, UnicodeDecodeError):
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = query.filter(db.or_(
+                ChatMessage.timestamp > since_timestamp,
+                db.and_(ChatMessage.timestamp == since_timestamp, ChatMessage.id > since_id)
+            ))
         
-        return jsonify(result)
+        query = query.order_by(ChatMessage.timestamp.asc(), ChatMessage.id.asc())
+        rows = query.limit(limit + 1).all() if paged else query.all()
+        if archive_store.has_group('chat_message', consultation_id):
+            # Older messages may have moved to the archive; merge them in cursor order
+            hot_ids = {row.id for row in rows}
+            rows.extend(
+                SimpleNamespace(**row) for row in archive_store.group_rows('chat_message', consultation_id)
+                if row['id'] not in hot_ids
+                and (not since or (row['timestamp'], row['id']) > (since_timestamp, since_id))
+            )
+            rows.sort(key=lambda row: (row.timestamp, row.id))
+            if paged:
+                rows = rows[:limit + 1]
+        
+        messages = [{
+            'id': row.id,
+            'sender': row.sender,
+            'content': row.content,
+            'language': row.language,
+            'timestamp': row.timestamp.isoformat()
+        } for row in rows]
+        if not paged:
+            return jsonify(messages)
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return jsonify({
+            'messages': messages[:limit],
+            # Pass back as ?since= to fetch the next page or poll for new messages
+            'next_cursor': encode_message_cursor(rows[-1].timestamp, rows[-1].id) if rows else since,
+            'has_more': has_more
+        })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # API Routes
-@app.route('/')
+@api.route('/')
 def index():
     return jsonify({
         "message": "Rural Health Connect API",
@@ -390,36 +1098,22 @@ def index():
         ]
     })
 
-@app.route('/api/register', methods=['POST'])
+@api.route('/api/register', methods=['POST'])
 def register_patient():
     """Register a new patient"""
     try:
         data = request.get_json()
         
-        # Validate required fields
-        required_fields = ['fullName', 'age', 'gender']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
-        
-        # Create new patient
-        patient = Patient(
-            full_name=data['fullName'],
-            age=int(data['age']),
-            gender=data['gender'],
-            phone=data.get('phone'),
-            location=data.get('location'),
-            preferred_language=data.get('language', 'en'),  # Added language preference
-            medical_conditions=json.dumps(data.get('conditions', [])),
-            medications=data.get('medications'),
-            smoking=data.get('smoking'),
-            alcohol=data.get('alcohol'),
-            exercise=data.get('exercise'),
-            pregnancy=data.get('pregnancy')
-        )
+        # Validate and create new patient
+        try:
+            patient = Patient(**validate_patient(data))
+        except PatientValidationError as e:
+            return jsonify({'error': str(e)}), 400
         
         db.session.add(patient)
+        increment_stats(total_patients=1)
         db.session.commit()
+        http_cache.invalidate(f'patient:{patient.id}')
         
         return jsonify({
             'message': 'Patient registered successfully',
@@ -430,7 +1124,59 @@ def register_patient():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/assess', methods=['POST'])
+def insert_patient_batch(rows):
+    """Insert validated patient rows in one transaction"""
+    try:
+        db.session.execute(db.insert(Patient), rows)
+        increment_stats(total_patients=len(rows))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+IMPORT_FORMATS = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'jsonl',
+    'application/jsonl': 'jsonl'
+}
+
+@api.route('/api/register/bulk', methods=['POST'])
+def register_patients_bulk():
+    """Register patients from a streamed CSV or JSONL upload"""
+    try:
+        fmt = request.args.get('format') or IMPORT_FORMATS.get(request.mimetype)
+        if fmt not in ('csv', 'jsonl'):
+            return jsonify({'error': 'Send text/csv or application/x-ndjson, or pass ?format=csv|jsonl'}), 415
+        
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+        result = import_patients(
+            read_records(stream, fmt), insert_patient_batch,
+            batch_size=current_app.config['IMPORT_BATCH_SIZE']
+        )
+        
+        return jsonify(result.to_dict()), 201 if result.imported else 400
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@api.cli.command('import-patients')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension')
+@click.option('--batch-size', default=1000, help='Rows inserted per transaction')
+def import_patients_command(path, fmt, batch_size):
+    """Register patients from a CSV or JSONL file"""
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as f:
+        result = import_patients(read_records(f, fmt), insert_patient_batch, batch_size=batch_size)
+    
+    for error in result.errors:
+        click.echo(f"line {error['line']}: {error['error']}", err=True)
+    summary = result.to_dict()
+    click.echo(f"Imported {summary['imported']} patients, {summary['failed']} failed "
+               f"in {summary['seconds']}s ({summary['rows_per_second']} rows/s)")
+
+@api.route('/api/assess', methods=['POST'])
 def create_assessment():
     """Create a new symptom assessment"""
     try:
@@ -442,12 +1188,12 @@ def create_assessment():
             if field not in data:
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
-        # Get patient data for AI recommendations
+        # Make sure the patient exists before triaging
         patient = Patient.query.get(data['patient_id'])
         if not patient:
             return jsonify({'error': 'Patient not found'}), 404
         
-        # Calculate triage level
+        # Calculate triage level on the lists as submitted
         symptom_data = {
             'primary_symptom': data['primary_symptom'],
             'symptom_onset': data['symptom_onset'],
@@ -457,42 +1203,42 @@ def create_assessment():
         }
         
         triage_level = TriageSystem.calculate_triage_level(symptom_data)
+        symptoms = {kind: symptom_codes(data.get(column)) for kind, column in SYMPTOM_KINDS.items()}
         
-        # Generate AI recommendations
-        patient_data = {
-            'age': patient.age,
-            'gender': patient.gender,
-            'conditions': json.loads(patient.medical_conditions or '[]'),
-            'medications': patient.medications,
-            'smoking': patient.smoking,
-            'alcohol': patient.alcohol
-        }
-        
-        ai_recommendations = TriageSystem.generate_ai_recommendations(
-            patient_data, symptom_data, triage_level
-        )
-        
-        # Create assessment record
+        # Create assessment record; AI recommendations are filled in by a background job
         assessment = Assessment(
             patient_id=data['patient_id'],
             primary_symptom=data['primary_symptom'],
             symptom_onset=data['symptom_onset'],
             symptom_severity=data['symptom_severity'],
-            additional_symptoms=json.dumps(data.get('additional_symptoms', [])),
+            additional_symptoms=symptoms['additional'],
             pain_description=data.get('pain_location'),
-            breathing_details=json.dumps(data.get('breathing_details', [])),
-            emergency_symptoms=json.dumps(data.get('emergency_symptoms', [])),
+            breathing_details=symptoms['breathing'],
+            # Kept as submitted, so retriage scores exactly what intake scored
+            emergency_symptoms=symptom_data['emergency_symptoms'],
             triage_level=triage_level,
-            ai_recommendations=ai_recommendations
+            recommendation_status='pending',
+            symptoms=[AssessmentSymptom(kind=kind, symptom=symptom) for kind, symptom in indexed_symptoms(symptoms)]
         )
         
         db.session.add(assessment)
+        increment_stats(**{'total_assessments': 1, triage_stat_name(triage_level): 1})
         db.session.commit()
+        http_cache.invalidate(f'assessments:{assessment.patient_id}')
+        outbreak_monitor.record(
+            assessment.id, patient.location, assessment.primary_symptom, triage_level, assessment.created_at
+        )
+        
+        job_queue.enqueue(
+            generate_assessment_recommendations, assessment.id, bool(data.get('bypass_cache', False))
+        )
         
         return jsonify({
             'assessment_id': assessment.id,
             'triage_level': triage_level,
-            'recommendations': ai_recommendations,
+            'recommendations': None,
+            'recommendations_status': 'pending',
+            'recommendations_url': f'/api/assessment/{assessment.id}/recommendations',
             'created_at': assessment.created_at.isoformat()
         }), 201
         
@@ -500,137 +1246,1261 @@ def create_assessment():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/patient/<int:patient_id>', methods=['GET'])
-def get_patient(patient_id):
-    """Get patient information"""
+@api.route('/api/assess/batch', methods=['POST'])
+def batch_triage():
+    """Score many symptom records without creating assessments"""
+    try:
+        data = request.get_json()
+        records = data.get('records') if isinstance(data, dict) else data
+        
+        if not isinstance(records, list):
+            return jsonify({'error': 'Expected a list of symptom records'}), 400
+        if len(records) > current_app.config['TRIAGE_BATCH_MAX']:
+            return jsonify({'error': f"Batch too large (max {current_app.config['TRIAGE_BATCH_MAX']} records)"}), 413
+        if not all(isinstance(record, dict) for record in records):
+            return jsonify({'error': 'Each record must be an object'}), 400
+        
+        levels = TriageSystem.calculate_triage_levels(records)
+        
+        return jsonify({
+            'count': len(levels),
+            'triage_levels': levels,
+            'summary': {level: levels.count(level) for level in ('emergency', 'urgent', 'routine')}
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/assessment/<int:assessment_id>/recommendations', methods=['GET'])
+def get_assessment_recommendations(assessment_id):
+    """Get AI recommendations for an assessment, optionally long-polling while pending"""
     try:
-        patient = Patient.query.get_or_404(patient_id)
+        wait = min(max(request.args.get('wait', 0, type=float), 0), current_app.config['RECOMMENDATION_MAX_WAIT'])
+        deadline = time.monotonic() + wait
+        
+        while True:
+            assessment = Assessment.query.get(assessment_id)
+            if not assessment:
+                archived = archive_store.find('assessment', assessment_id)
+                if archived is None:
+                    return jsonify({'error': 'Assessment not found'}), 404
+                assessment = SimpleNamespace(**archived)
+            
+            status = assessment.recommendation_status or 'ready'
+            if status != 'pending' or time.monotonic() >= deadline:
+                break
+            
+            # Release the connection while waiting for the background job
+            db.session.rollback()
+            time.sleep(0.25)
+        
+        # Generated (and cached) in English, shown in the patient's language
+        language = request.args.get('language') or db.session.query(Patient.preferred_language) \
+            .filter(Patient.id == assessment.patient_id).scalar() or 'en'
+        recommendations = assessment.ai_recommendations
+        if recommendations and status == 'ready' and language != 'en':
+            # English until the translation is cached; the job warms it when it finishes
+            recommendations = translation.translate(recommendations, language, source='en', wait=False)
         
         return jsonify({
-            'id': patient.id,
-            'full_name': patient.full_name,
-            'age': patient.age,
-            'gender': patient.gender,
-            'phone': patient.phone,
-            'location': patient.location,
-            'preferred_language': patient.preferred_language,  # Added language preference
-            'medical_conditions': json.loads(patient.medical_conditions or '[]'),
-            'medications': patient.medications,
-            'smoking': patient.smoking,
-            'alcohol': patient.alcohol,
-            'exercise': patient.exercise,
-            'pregnancy': patient.pregnancy,
-            'created_at': patient.created_at.isoformat()
+            'assessment_id': assessment.id,
+            'status': status,
+            'language': language,
+            'recommendations': recommendations
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/assessments/<int:patient_id>', methods=['GET'])
+@api.route('/api/assessment/<int:assessment_id>/recommendations/retry', methods=['POST'])
+def retry_assessment_recommendations(assessment_id):
+    """Queue recommendations again for an assessment whose background job failed or was lost
+
+    A job can be lost with the worker that ran it, so an assessment left
+    pending for RECOMMENDATION_STALE_AFTER seconds can be retried too.
+    """
+    try:
+        assessment = Assessment.query.get(assessment_id)
+        if not assessment:
+            return jsonify({'error': 'Assessment not found'}), 404
+        stale_before = datetime.utcnow() - timedelta(seconds=current_app.config['RECOMMENDATION_STALE_AFTER'])
+        stale = (assessment.recommendation_status == 'pending'
+                 and (assessment.updated_at or assessment.created_at) < stale_before)
+        if assessment.recommendation_status != 'failed' and not stale:
+            return jsonify({'error': f'Recommendations are {assessment.recommendation_status}'}), 409
+
+        assessment.recommendation_status = 'pending'
+        # Restarts the stale clock, which a pending -> pending update would not
+        assessment.updated_at = datetime.utcnow()
+        db.session.commit()
+        job_queue.enqueue(generate_assessment_recommendations, assessment.id, True)
+
+        return jsonify({
+            'assessment_id': assessment.id,
+            'recommendations_status': 'pending',
+            'recommendations_url': f'/api/assessment/{assessment.id}/recommendations'
+        }), 202
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def patient_ai_context(patient):
+    """Patient fields that are passed to the recommendation prompt"""
+    return {
+        'age': patient.age,
+        'gender': patient.gender,
+        'conditions': patient.medical_conditions or [],
+        'medications': patient.medications,
+        'smoking': patient.smoking,
+        'alcohol': patient.alcohol
+    }
+
+@job_queue.task
+def generate_assessment_recommendations(assessment_id, bypass_cache=False):
+    """Background job: fill in ai_recommendations for a new assessment"""
+    assessment = Assessment.query.get(assessment_id)
+    if not assessment or assessment.recommendation_status == 'ready':
+        return
+    
+    try:
+        symptom_data = {
+            'primary_symptom': assessment.primary_symptom,
+            'symptom_onset': assessment.symptom_onset,
+            'symptom_severity': assessment.symptom_severity,
+            'additional_symptoms': assessment.additional_symptoms or []
+        }
+        assessment.ai_recommendations = TriageSystem.generate_ai_recommendations(
+            patient_ai_context(assessment.patient), symptom_data, assessment.triage_level,
+            bypass_cache=bypass_cache, raise_errors=True
+        )
+        assessment.recommendation_status = 'ready'
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        assessment.recommendation_status = 'failed'
+        db.session.commit()
+        raise
+    
+    # Warm the translation cache so the first read in the patient's language is fast
+    language = assessment.patient.preferred_language
+    if language and language != 'en':
+        translation.translate(assessment.ai_recommendations, language, source='en')
+
+@api.route('/api/patient/<int:patient_id>', methods=['GET'])
+def get_patient(patient_id):
+    """Get patient information (conditional GET on the patient's updated_at)"""
+    try:
+        row = db.session.query(Patient.id, Patient.updated_at).filter(Patient.id == patient_id).first()
+        if row is None:
+            return jsonify({'error': 'Patient not found'}), 404
+        
+        return http_cache.respond(
+            f'patient:{patient_id}', row.updated_at.isoformat() if row.updated_at else None,
+            lambda: patient_details(Patient.query.get(patient_id)), last_modified=row.updated_at
+        )
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def patient_details(patient):
+    """Patient record as returned by /api/patient/<id>"""
+    return {
+        'id': patient.id,
+        'full_name': patient.full_name,
+        'age': patient.age,
+        'gender': patient.gender,
+        'phone': patient.phone,
+        'location': patient.location,
+        'preferred_language': patient.preferred_language,  # Added language preference
+        'medical_conditions': patient.medical_conditions or [],
+        'medications': patient.medications,
+        'smoking': patient.smoking,
+        'alcohol': patient.alcohol,
+        'exercise': patient.exercise,
+        'pregnancy': patient.pregnancy,
+        'created_at': patient.created_at.isoformat()
+    }
+
+@api.route('/api/assessments/<int:patient_id>', methods=['GET'])
 def get_patient_assessments(patient_id):
-    """Get all assessments for a patient"""
-    try:
-        assessments = Assessment.query.filter_by(patient_id=patient_id).order_by(Assessment.created_at.desc()).all()
-        
-        result = []
-        for assessment in assessments:
-            result.append({
-                'id': assessment.id,
-                'primary_symptom': assessment.primary_symptom,
-                'symptom_severity': assessment.symptom_severity,
-                'triage_level': assessment.triage_level,
-                'created_at': assessment.created_at.isoformat()
-            })
+    """Get all assessments for a patient (conditional GET on their count and latest change)"""
+    try:
+        count, updated_at = db.session.query(db.func.count(), db.func.max(Assessment.updated_at)) \
+            .filter(Assessment.patient_id == patient_id).one()
         
-        return jsonify(result)
+        def build():
+            assessments = Assessment.query.filter_by(patient_id=patient_id).order_by(Assessment.created_at.desc()).all()
+            assessments += archived_rows('assessment', patient_id, {assessment.id for assessment in assessments})
+            assessments.sort(key=lambda assessment: (assessment.created_at, assessment.id), reverse=True)
+            
+            result = []
+            for assessment in assessments:
+                result.append({
+                    'id': assessment.id,
+                    'primary_symptom': assessment.primary_symptom,
+                    'symptom_severity': assessment.symptom_severity,
+                    'triage_level': assessment.triage_level,
+                    'created_at': assessment.created_at.isoformat()
+                })
+            return result
+        
+        return http_cache.respond(
+            f'assessments:{patient_id}', f'{count}:{updated_at.isoformat() if updated_at else None}',
+            build, last_modified=updated_at
+        )
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/providers', methods=['GET'])
-def get_healthcare_providers():
-    """Get list of healthcare providers"""
+# Timeline entry types: model, fields that may be selected, fields returned by default
+TIMELINE_TYPES = {
+    'assessment': (
+        Assessment,
+        ('primary_symptom', 'symptom_onset', 'symptom_severity', 'additional_symptoms', 'pain_description',
+         'breathing_details', 'emergency_symptoms', 'triage_level', 'ai_recommendations',
+         'recommendation_status'),
+        ('primary_symptom', 'symptom_severity', 'triage_level', 'recommendation_status')
+    ),
+    'consultation': (
+        Consultation,
+        ('consultation_type', 'cost', 'language', 'audio_enabled', 'video_enabled', 'is_emergency', 'status',
+         'completed_at', 'messages'),
+        ('consultation_type', 'status', 'is_emergency', 'cost', 'messages')
+    ),
+    'emergency': (
+        EmergencyEvent,
+        ('symptoms', 'location', 'latitude', 'longitude'),
+        ('symptoms', 'location')
+    )
+}
+
+def encode_timeline_cursor(timestamp, entry_type, entry_id):
+    """Opaque keyset cursor for a (timestamp, type, id) timeline position"""
+    raw = f"{timestamp.isoformat()}|{entry_type}|{entry_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_timeline_cursor(cursor):
+    """Inverse of encode_timeline_cursor; raises ValueError on bad input"""
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    timestamp, entry_type, entry_id = raw.split('|')
+    if entry_type not in TIMELINE_TYPES:
+        raise ValueError(f'Unknown timeline type: {entry_type}')
+    return datetime.fromisoformat(timestamp), entry_type, int(entry_id)
+
+def timeline_entries(entry_type, patient_id, fields, before, limit):
+    """Up to ``limit`` entries of one type, newest first, older than the ``before`` position"""
+    model = TIMELINE_TYPES[entry_type][0]
+    columns = [getattr(model, field) for field in fields if field != 'messages']
+    query = db.session.query(model.id, model.created_at, *columns).filter(model.patient_id == patient_id)
+    
+    if before:
+        timestamp, before_type, before_id = before
+        # Entries sort by (created_at, type, id) descending; only the tie-break depends on the type
+        if entry_type < before_type:
+            query = query.filter(model.created_at <= timestamp)
+        elif entry_type > before_type:
+            query = query.filter(model.created_at < timestamp)
+        else:
+            query = query.filter(db.or_(
+                model.created_at < timestamp,
+                db.and_(model.created_at == timestamp, model.id < before_id)
+            ))
+    
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit).all()
+    if entry_type in ARCHIVED_TABLES and archive_store.has_group(entry_type, patient_id):
+        rows += [
+            row for row in archived_rows(entry_type, patient_id, {row.id for row in rows})
+            if not before or (row.created_at, entry_type, row.id) < before
+        ]
+        rows.sort(key=lambda row: (row.created_at, row.id), reverse=True)
+        rows = rows[:limit]
+    entries = []
+    for row in rows:
+        entry = {'type': entry_type, 'id': row.id, 'created_at': row.created_at}
+        for field in fields:
+            if field != 'messages':
+                value = getattr(row, field)
+                entry[field] = value.isoformat() if isinstance(value, datetime) else value
+        entries.append(entry)
+    return entries
+
+def recent_messages(consultation_ids, limit):
+    """The latest ``limit`` messages of each consultation, oldest first, in one query"""
+    if not consultation_ids:
+        return {}
+    ranked = db.session.query(
+        ChatMessage.id,
+        ChatMessage.consultation_id,
+        ChatMessage.sender,
+        ChatMessage.content,
+        ChatMessage.language,
+        ChatMessage.timestamp,
+        db.func.row_number().over(
+            partition_by=ChatMessage.consultation_id,
+            order_by=(ChatMessage.timestamp.desc(), ChatMessage.id.desc())
+        ).label('position')
+    ).filter(ChatMessage.consultation_id.in_(consultation_ids)).subquery()
+    rows = db.session.query(ranked).filter(ranked.c.position <= limit) \
+        .order_by(ranked.c.consultation_id, ranked.c.timestamp, ranked.c.id).all()
+    
+    by_consultation = {consultation_id: [] for consultation_id in consultation_ids}
+    for row in rows:
+        by_consultation[row.consultation_id].append(row)
+    
+    # Consultations with fewer hot messages than asked for are topped up from the archive
+    for consultation_id, hot in by_consultation.items():
+        if len(hot) < limit and archive_store.has_group('chat_message', consultation_id):
+            hot.extend(archived_rows('chat_message', consultation_id, {row.id for row in hot}))
+            hot.sort(key=lambda row: (row.timestamp, row.id))
+            del hot[:-limit]
+    
+    return {
+        consultation_id: [{
+            'id': row.id,
+            'sender': row.sender,
+            'content': row.content,
+            'language': row.language,
+            'timestamp': row.timestamp.isoformat()
+        } for row in hot]
+        for consultation_id, hot in by_consultation.items()
+    }
+
+@api.route('/api/patient/<int:patient_id>/timeline', methods=['GET'])
+def get_patient_timeline(patient_id):
+    """A patient's assessments, consultations and emergencies merged newest first, a page at a time"""
     try:
-        location = request.args.get('location')
-        specialization = request.args.get('specialization')
+        limit = request.args.get('limit', current_app.config['TIMELINE_PAGE_SIZE'], type=int)
+        limit = max(1, min(limit, current_app.config['TIMELINE_PAGE_MAX']))
+        messages_limit = request.args.get('messages_limit', current_app.config['TIMELINE_MESSAGES'], type=int)
+        messages_limit = max(0, min(messages_limit, current_app.config['MESSAGES_PAGE_MAX']))
         
-        query = HealthcareProvider.query
+        types = request.args.get('types')
+        types = [t.strip() for t in types.split(',') if t.strip()] if types else list(TIMELINE_TYPES)
+        unknown = [t for t in types if t not in TIMELINE_TYPES]
+        if unknown:
+            return jsonify({'error': f"Unknown types: {', '.join(unknown)}"}), 400
         
-        if location:
-            query = query.filter(HealthcareProvider.location.ilike(f'%{location}%'))
+        # ?fields= applies to every type; names a type does not have are ignored
+        fields = request.args.get('fields')
+        requested = {f.strip() for f in fields.split(',') if f.strip()} if fields else None
+        if requested is not None:
+            known = {field for _, allowed, _ in TIMELINE_TYPES.values() for field in allowed}
+            if requested - known:
+                return jsonify({'error': f"Unknown fields: {', '.join(sorted(requested - known))}"}), 400
         
-        if specialization:
-            query = query.filter(HealthcareProvider.specialization.ilike(f'%{specialization}%'))
+        before = request.args.get('before')
+        if before:
+            try:
+                before = decode_timeline_cursor(before)
+            except (ValueError, UnicodeDecodeError):
+                return jsonify({'error': 'Invalid cursor'}), 400
         
-        providers = query.all()
+        patient = db.session.query(Patient.id, Patient.full_name, Patient.age, Patient.gender) \
+            .filter(Patient.id == patient_id).first()
+        if patient is None:
+            return jsonify({'error': 'Patient not found'}), 404
         
-        result = []
-        for provider in providers:
-            result.append({
-                'id': provider.id,
-                'name': provider.name,
-                'specialization': provider.specialization,
-                'location': provider.location,
-                'phone': provider.phone,
-                'email': provider.email,
-                'availability': provider.availability
-            })
+        # One query per type, then merge; limit + 1 tells whether there is another page
+        entries = []
+        for entry_type in types:
+            _, allowed, default = TIMELINE_TYPES[entry_type]
+            selected = [f for f in allowed if f in requested] if requested is not None else list(default)
+            entries.extend(timeline_entries(entry_type, patient_id, selected, before, limit + 1))
+        entries.sort(key=lambda entry: (entry['created_at'], entry['type'], entry['id']), reverse=True)
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        
+        with_messages = [e['id'] for e in entries if e['type'] == 'consultation'
+                         and (requested is None or 'messages' in requested)]
+        messages = recent_messages(with_messages, messages_limit) if messages_limit else {}
+        for entry in entries:
+            if entry['type'] == 'consultation' and entry['id'] in messages:
+                entry['messages'] = messages[entry['id']]
+        
+        last = entries[-1] if entries else None
+        next_cursor = encode_timeline_cursor(last['created_at'], last['type'], last['id']) if has_more else None
+        for entry in entries:
+            entry['created_at'] = entry['created_at'].isoformat()
         
-        return jsonify(result)
+        return jsonify({
+            'patient': {
+                'id': patient.id,
+                'full_name': patient.full_name,
+                'age': patient.age,
+                'gender': patient.gender
+            },
+            'entries': entries,
+            # Pass back as ?before= for the next (older) page
+            'next_cursor': next_cursor,
+            'has_more': has_more
+        })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/emergency', methods=['POST'])
+PROVIDER_FIELDS = (
+    'id', 'name', 'specialization', 'location', 'phone', 'email', 'availability',
+    'latitude', 'longitude'
+)
+
+def load_provider_rows():
+    """All providers as plain dicts, for building the search index"""
+    columns = [getattr(HealthcareProvider, field) for field in PROVIDER_FIELDS]
+    rows = db.session.query(*columns).order_by(HealthcareProvider.id).all()
+    return [dict(zip(PROVIDER_FIELDS, row)) for row in rows]
+
+def search_providers(**filters):
+    """Search providers through the in-memory index, rebuilding it when stale"""
+    provider_index.refresh(load_provider_rows)
+    return provider_index.search(**filters)
+
+@api.route('/api/providers', methods=['GET'])
+def get_healthcare_providers():
+    """Get list of healthcare providers, optionally nearest first"""
+    try:
+        location = request.args.get('location')
+        specialization = request.args.get('specialization')
+        lat = request.args.get('lat', type=float)
+        lng = request.args.get('lng', type=float)
+        k = request.args.get('k', 10, type=int)
+        radius_km = request.args.get('radius_km', type=float)
+        limit = request.args.get('limit', type=int)
+        
+        if (lat is None) != (lng is None):
+            return jsonify({'error': 'lat and lng must be given together'}), 400
+        k = max(1, min(k, current_app.config['PROVIDER_SEARCH_MAX_K']))
+        filters = dict(lat=lat, lng=lng, k=k, location=location, specialization=specialization,
+                       radius_km=radius_km, limit=limit)
+        
+        def build():
+            result = []
+            for provider, distance in search_providers(**filters):
+                item = dict(provider)
+                if distance is not None:
+                    item['distance_km'] = round(distance, 2)
+                result.append(item)
+            return result
+        
+        # Results only change when the index is rebuilt with different rows
+        provider_index.refresh(load_provider_rows)
+        return http_cache.respond(
+            'providers:' + json.dumps(filters, sort_keys=True), provider_index.version, build, public=True
+        )
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.cli.command('import-providers')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=5000, help='Rows inserted per transaction')
+def import_providers(path, batch_size):
+    """Load healthcare providers from a CSV registry export"""
+    imported = 0
+    with open(path, newline='', encoding='utf-8') as f:
+        batch = []
+        for row in csv.DictReader(f):
+            batch.append({
+                'name': row['name'],
+                'specialization': row.get('specialization') or None,
+                'location': row['location'],
+                'phone': row.get('phone') or None,
+                'email': row.get('email') or None,
+                'availability': row.get('availability') or None,
+                'latitude': float(row['latitude']) if row.get('latitude') else None,
+                'longitude': float(row['longitude']) if row.get('longitude') else None
+            })
+            if len(batch) >= batch_size:
+                db.session.execute(db.insert(HealthcareProvider), batch)
+                increment_stats(providers=len(batch))
+                db.session.commit()
+                imported += len(batch)
+                batch = []
+        if batch:
+            db.session.execute(db.insert(HealthcareProvider), batch)
+            increment_stats(providers=len(batch))
+            db.session.commit()
+            imported += len(batch)
+    
+    provider_index.invalidate()
+    click.echo(f"Imported {imported} providers")
+
+@api.route('/api/emergency', methods=['POST'])
 def emergency_alert():
-    """Handle emergency alerts"""
+    """Queue an emergency alert for dispatch to providers and notifiers"""
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         
-        # Log emergency case
-        print(f"EMERGENCY ALERT: Patient {data.get('patient_id')} - {data.get('symptoms')}")
+        latitude = data.get('latitude', data.get('lat'))
+        longitude = data.get('longitude', data.get('lng'))
+        if (latitude is None) != (longitude is None):
+            return jsonify({'error': 'latitude and longitude must be given together'}), 400
+        if latitude is not None:
+            try:
+                latitude, longitude = float(latitude), float(longitude)
+            except (TypeError, ValueError):
+                return jsonify({'error': 'latitude and longitude must be numbers'}), 400
+            if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                return jsonify({'error': 'latitude and longitude are out of range'}), 400
         
-        # In a real implementation, this would:
-        # 1. Alert emergency services
-        # 2. Notify nearby healthcare providers
-        # 3. Send SMS/call to emergency contacts
-        # 4. Update patient record with emergency status
+        # An alert is never refused for a bad patient reference; it is sent without one
+        patient_id = data.get('patient_id')
+        if patient_id is not None:
+            try:
+                patient_id = db.session.query(Patient.id).filter(Patient.id == int(patient_id)).scalar()
+            except (TypeError, ValueError):
+                patient_id = None
+            if patient_id is None:
+                print(f"Emergency alert for unknown patient {data.get('patient_id')!r}; sent without it")
+        
+        # Committing the event is all the request waits for; the dispatcher does the rest
+        event = EmergencyEvent(
+            patient_id=patient_id,
+            symptoms=symptom_codes(data.get('symptoms')),
+            location=data.get('location'),
+            latitude=latitude,
+            longitude=longitude
+        )
+        db.session.add(event)
+        db.session.commit()
+        emergency_dispatcher.wake()
         
         return jsonify({
-            'message': 'Emergency alert sent successfully',
-            'emergency_number': '108',
+            'message': 'Emergency alert received; nearby providers are being notified',
+            'event_id': event.id,
+            'status_url': f'/api/emergency/{event.id}',
+            'emergency_number': current_app.config['EMERGENCY_CONTACTS']['ambulance'],
             'nearest_hospital': 'Contact local emergency services'
+        }), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/emergency/<int:event_id>', methods=['GET'])
+def get_emergency_status(event_id):
+    """Delivery status of an emergency alert"""
+    try:
+        event = EmergencyEvent.query.get_or_404(event_id)
+        deliveries = EmergencyDelivery.query.filter_by(event_id=event.id).order_by(EmergencyDelivery.id).all()
+        
+        if event.plan_error:
+            status = 'failed'
+        elif not event.planned:
+            status = 'pending'
+        elif deliveries and all(delivery.status == 'failed' for delivery in deliveries):
+            status = 'failed'
+        else:
+            status = 'planned'
+        
+        return jsonify({
+            'event_id': event.id,
+            'status': status,
+            'planned': event.planned,
+            'error': event.plan_error,
+            'created_at': event.created_at.isoformat(),
+            'deliveries': [{
+                'notifier': delivery.notifier,
+                'target': delivery.target,
+                'status': delivery.status,
+                'attempts': delivery.attempts,
+                'last_error': delivery.last_error,
+                'delivered_at': delivery.delivered_at.isoformat() if delivery.delivered_at else None
+            } for delivery in deliveries]
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/stats', methods=['GET'])
+def emergency_event_payload(event):
+    """What notifiers are told about an emergency event"""
+    return {
+        'id': event.id,
+        'patient_id': event.patient_id,
+        'symptoms': event.symptoms or [],
+        'location': event.location or (event.patient.location if event.patient else None),
+        'latitude': event.latitude,
+        'longitude': event.longitude,
+        'created_at': event.created_at.isoformat(),
+        'emergency_number': current_app.config['EMERGENCY_CONTACTS']['ambulance']
+    }
+
+def nearest_emergency_providers(event):
+    """Providers to notify: nearest by distance, else matching the location text"""
+    k = current_app.config['EMERGENCY_NOTIFY_PROVIDERS']
+    if event.latitude is not None and event.longitude is not None:
+        matches = search_providers(lat=event.latitude, lng=event.longitude, k=k)
+    else:
+        location = event.location or (event.patient.location if event.patient else None)
+        matches = search_providers(location=location, limit=k) if location else []
+    return [
+        {**provider, 'distance_km': round(distance, 2) if distance is not None else None}
+        for provider, distance in matches
+    ]
+
+class EmergencyOutbox:
+    """Database side of the emergency dispatcher (see emergency_dispatch.py)"""
+    
+    @staticmethod
+    def plan(notifiers, limit=100, skip=()):
+        """Create the deliveries for events that have none yet; returns {event_id: error} for failures"""
+        query = db.session.query(EmergencyEvent.id).filter(
+            EmergencyEvent.planned.is_(False), EmergencyEvent.plan_error.is_(None)
+        )
+        if skip:
+            query = query.filter(~EmergencyEvent.id.in_(list(skip)))
+        event_ids = [event_id for (event_id,) in query.order_by(EmergencyEvent.id).limit(limit)]
+        failures = {}
+        for event_id in event_ids:
+            try:
+                # Only one dispatcher wins the planned flag, so deliveries are created once
+                claimed = db.session.query(EmergencyEvent) \
+                    .filter(EmergencyEvent.id == event_id, EmergencyEvent.planned.is_(False)) \
+                    .update({EmergencyEvent.planned: True}, synchronize_session=False)
+                if not claimed:
+                    db.session.rollback()
+                    continue
+                
+                event = EmergencyEvent.query.get(event_id)
+                payload = emergency_event_payload(event)
+                providers = nearest_emergency_providers(event)
+                rows = [
+                    {'event_id': event_id, 'notifier': name, 'target': target}
+                    for name, notifier in notifiers.items() for target in notifier.targets(payload, providers)
+                ]
+                if rows:
+                    db.session.execute(db.insert(EmergencyDelivery), rows)
+                db.session.commit()
+            except Exception as e:
+                # The event stays unplanned; the dispatcher backs off from it and moves on
+                db.session.rollback()
+                failures[event_id] = f'{type(e).__name__}: {e}'[:255]
+        return failures
+    
+    @staticmethod
+    def give_up(event_id, error):
+        """Stop trying to plan an event; it stays unplanned and is reported as failed"""
+        db.session.query(EmergencyEvent).filter(EmergencyEvent.id == event_id) \
+            .update({EmergencyEvent.plan_error: error}, synchronize_session=False)
+        db.session.commit()
+    
+    @staticmethod
+    def claim(limit, lease_seconds):
+        """Lease up to ``limit`` due deliveries to this process"""
+        now = datetime.utcnow()
+        due = (EmergencyDelivery.status.in_(('pending', 'sending')), EmergencyDelivery.next_attempt_at <= now)
+        delivery_ids = [delivery_id for (delivery_id,) in db.session.query(EmergencyDelivery.id).filter(*due)
+                        .order_by(EmergencyDelivery.next_attempt_at, EmergencyDelivery.id).limit(limit)]
+        
+        claimed = []
+        for delivery_id in delivery_ids:
+            # Conditional update: a row another dispatcher leased in the meantime no longer matches
+            if db.session.query(EmergencyDelivery).filter(EmergencyDelivery.id == delivery_id, *due).update({
+                EmergencyDelivery.status: 'sending',
+                EmergencyDelivery.attempts: EmergencyDelivery.attempts + 1,
+                EmergencyDelivery.next_attempt_at: now + timedelta(seconds=lease_seconds)
+            }, synchronize_session=False):
+                claimed.append(delivery_id)
+        db.session.commit()
+        if not claimed:
+            return []
+        
+        deliveries = EmergencyDelivery.query.filter(EmergencyDelivery.id.in_(claimed)).all()
+        payloads = {}
+        for delivery in deliveries:
+            if delivery.event_id not in payloads:
+                payloads[delivery.event_id] = emergency_event_payload(delivery.event)
+        return [{
+            'id': delivery.id,
+            'notifier': delivery.notifier,
+            'target': delivery.target or {},
+            'attempts': delivery.attempts,
+            'event': payloads[delivery.event_id],
+            'created_at_epoch': delivery.event.created_at.replace(tzinfo=timezone.utc).timestamp()
+        } for delivery in deliveries]
+    
+    @staticmethod
+    def _update(delivery, **values):
+        db.session.query(EmergencyDelivery).filter(EmergencyDelivery.id == delivery['id']) \
+            .update(values, synchronize_session=False)
+        db.session.commit()
+    
+    @staticmethod
+    def mark_sent(delivery):
+        EmergencyOutbox._update(delivery, status='sent', delivered_at=datetime.utcnow(), last_error=None)
+    
+    @staticmethod
+    def mark_retry(delivery, error, delay):
+        EmergencyOutbox._update(delivery, status='pending', last_error=error,
+                                next_attempt_at=datetime.utcnow() + timedelta(seconds=delay))
+    
+    @staticmethod
+    def mark_failed(delivery, error):
+        EmergencyOutbox._update(delivery, status='failed', last_error=error)
+
+# Durable fan-out of /api/emergency alerts, with the database as the queue
+emergency_dispatcher = EmergencyDispatcher(EmergencyOutbox)
+
+@api.cli.command('dispatch-emergencies')
+def dispatch_emergencies():
+    """Run the emergency dispatcher in the foreground (with EMERGENCY_DISPATCH_INLINE=false)"""
+    click.echo(f"Dispatching emergencies via {', '.join(sorted(emergency_dispatcher.enabled_notifiers))}")
+    emergency_dispatcher.run_forever()
+
+STAT_NAMES = (
+    'total_patients', 'total_assessments', 'total_consultations',
+    'emergency_cases', 'urgent_cases', 'routine_cases', 'providers'
+)
+
+def compute_statistics():
+    """Count statistics from the source tables"""
+    # One GROUP BY covers every triage level instead of a COUNT per level
+    triage_counts = dict(
+        db.session.query(Assessment.triage_level, db.func.count())
+        .group_by(Assessment.triage_level).all()
+    )
+    # Archived assessments are counted from the totals kept with their part files
+    for name, count in archive_store.counts('assessment').items():
+        if name.startswith('triage:'):
+            triage_counts[name[len('triage:'):]] = triage_counts.get(name[len('triage:'):], 0) + count
+    totals = db.session.query(
+        db.session.query(db.func.count(Patient.id)).scalar_subquery(),
+        db.session.query(db.func.count(Consultation.id)).scalar_subquery(),
+        db.session.query(db.func.count(HealthcareProvider.id)).scalar_subquery()
+    ).one()
+    
+    return {
+        'total_patients': totals[0],
+        'total_assessments': sum(triage_counts.values()),
+        'total_consultations': totals[1],
+        'emergency_cases': triage_counts.get('emergency', 0),
+        'urgent_cases': triage_counts.get('urgent', 0),
+        'routine_cases': triage_counts.get('routine', 0),
+        'providers': totals[2]
+    }
+
+def seed_stat_counters(rebuild=False):
+    """Create missing stat_counter rows from a full count of the source tables
+
+    Runs at startup and from rebuild-stats, never on a request. Rows that
+    exist are left alone, so workers seeding at the same time cannot reset
+    counts incremented in between; ``rebuild`` overwrites them instead.
+    """
+    counts = compute_statistics()
+    existing = {name for (name,) in db.session.query(StatCounter.name)}
+    if rebuild:
+        for name in existing.intersection(STAT_NAMES):
+            db.session.query(StatCounter).filter(StatCounter.name == name) \
+                .update({StatCounter.value: counts[name]}, synchronize_session=False)
+    db.session.add_all(StatCounter(name=name, value=counts[name]) for name in STAT_NAMES if name not in existing)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another worker inserted the missing rows first; its counts stand
+        db.session.rollback()
+        if rebuild:
+            raise
+    return counts
+
+def increment_stats(**deltas):
+    """Add to the /api/stats counters as part of the caller's transaction"""
+    if not current_app.config['STATS_COUNTERS_ENABLED']:
+        return
+    for name, delta in deltas.items():
+        if delta:
+            db.session.query(StatCounter).filter(StatCounter.name == name) \
+                .update({StatCounter.value: StatCounter.value + delta}, synchronize_session=False)
+
+def triage_stat_name(triage_level):
+    return f'{triage_level}_cases'
+
+@api.route('/api/stats', methods=['GET'])
 def get_statistics():
     """Get system statistics"""
     try:
-        total_patients = Patient.query.count()
-        total_assessments = Assessment.query.count()
-        total_consultations = Consultation.query.count()  # Added consultation stats
-        emergency_cases = Assessment.query.filter_by(triage_level='emergency').count()
-        urgent_cases = Assessment.query.filter_by(triage_level='urgent').count()
-        routine_cases = Assessment.query.filter_by(triage_level='routine').count()
+        if not current_app.config['STATS_COUNTERS_ENABLED']:
+            return jsonify(compute_statistics())
         
+        counts = dict(db.session.query(StatCounter.name, StatCounter.value).all())
+        if any(name not in counts for name in STAT_NAMES):
+            # Not seeded yet (startup or rebuild-stats does that); count without writing
+            counts = compute_statistics()
+        
+        return jsonify({name: counts[name] for name in STAT_NAMES})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/stats/db-pool', methods=['GET'])
+def get_db_pool_statistics():
+    """Connection pool usage for this worker process"""
+    return jsonify(db_pool.stats())
+
+@api.route('/api/stats/llm', methods=['GET'])
+def get_llm_statistics():
+    """LLM client load, response cache hits and request coalescing for this worker process"""
+    return jsonify({
+        'client': llm_client.stats(),
+        'cache': response_cache.stats(),
+        'coalescing': single_flight.stats()
+    })
+
+@api.route('/api/stats/inference', methods=['GET'])
+def get_inference_statistics():
+    """Remote/local reply counts and circuit breaker state for this worker process"""
+    return jsonify(inference_router.stats())
+
+@api.route('/api/stats/http-cache', methods=['GET'])
+def get_http_cache_statistics():
+    """Conditional GET and response cache counters for this worker process"""
+    return jsonify(http_cache.stats())
+
+def load_surveillance_rows(after_id=None, since=None):
+    """(id, created_at, location, symptom, triage_level) for assessments after ``after_id`` or since ``since``"""
+    conditions = []
+    if after_id is not None:
+        conditions.append(Assessment.id > after_id)
+    if since is not None:
+        conditions.append(Assessment.created_at >= since)
+    return (
+        db.session.query(
+            Assessment.id, Assessment.created_at, Patient.location,
+            Assessment.primary_symptom, Assessment.triage_level
+        )
+        .join(Patient, Patient.id == Assessment.patient_id)
+        .filter(db.or_(*conditions))
+        .order_by(Assessment.id)
+        .yield_per(5000)
+    )
+
+@api.route('/api/surveillance', methods=['GET'])
+def get_surveillance():
+    """Assessment counts per location, symptom and triage level over the window, against the baseline"""
+    try:
+        if not outbreak_monitor.enabled:
+            return jsonify({'error': 'Surveillance is disabled'}), 404
+        
+        limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+        outbreak_monitor.sync(load_surveillance_rows)
+        signals = outbreak_monitor.signals(
+            location=request.args.get('location'),
+            symptom=request.args.get('symptom'),
+            triage_level=request.args.get('triage_level'),
+            anomalous_only=request.args.get('anomalous', '').lower() in ('1', 'true', 'yes'),
+            limit=limit
+        )
+        stats = outbreak_monitor.stats()
         return jsonify({
-            'total_patients': total_patients,
-            'total_assessments': total_assessments,
-            'total_consultations': total_consultations,
-            'emergency_cases': emergency_cases,
-            'urgent_cases': urgent_cases,
-            'routine_cases': routine_cases,
-            'providers': HealthcareProvider.query.count()
+            'signals': signals,
+            'window_hours': stats['window_hours'],
+            'baseline_days': stats['baseline_days'],
+            'generated_at': datetime.utcnow().isoformat()
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@api.route('/api/stats/surveillance', methods=['GET'])
+def get_surveillance_statistics():
+    """Outbreak monitor size and rebuild time for this worker process"""
+    return jsonify(outbreak_monitor.stats())
+
+@api.route('/api/stats/chat-context', methods=['GET'])
+def get_chat_context_statistics():
+    """Chat prompt history sizes and summaries written by this worker process"""
+    return jsonify(chat_context.stats())
+
+@api.route('/api/stats/voice', methods=['GET'])
+def get_voice_statistics():
+    """Voice messages by status, plus this worker's pipeline queue and per-stage timings"""
+    try:
+        by_status = dict(
+            db.session.query(VoiceMessage.status, db.func.count()).group_by(VoiceMessage.status).all()
+        )
+        return jsonify({'messages': by_status, 'pipeline': voice_pipeline.stats()})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/stats/translation', methods=['GET'])
+def get_translation_statistics():
+    """Translation cache hit ratio and backend batching for this worker process"""
+    return jsonify(translation.stats())
+
+def table_bytes(table):
+    """On-disk size of a table and its indexes, where the database can tell"""
+    try:
+        if db.engine.dialect.name == 'postgresql':
+            return db.session.execute(db.text("SELECT pg_total_relation_size(:table)"), {'table': table}).scalar()
+        if db.engine.dialect.name == 'sqlite':
+            # dbstat is only there when SQLite was built with it
+            return db.session.execute(db.text(
+                "SELECT SUM(pgsize) FROM dbstat WHERE name = :table OR name IN "
+                "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table)"
+            ), {'table': table}).scalar()
+    except Exception:
+        db.session.rollback()
+    return None
+
+@api.route('/api/stats/retention', methods=['GET'])
+def get_retention_statistics():
+    """Size of the hot chat message and assessment tables, and of their archive"""
+    try:
+        cutoff = archive_store.cutoff()
+        hot = {}
+        for table, (model, age_column, _) in ARCHIVED_TABLES.items():
+            rows, oldest, cold = db.session.query(
+                db.func.count(model.id), db.func.min(age_column),
+                db.func.count(model.id).filter(age_column < cutoff)
+            ).one()
+            hot[table] = {
+                'rows': rows,
+                'bytes': table_bytes(table),
+                'oldest': oldest.isoformat() if oldest else None,
+                'due_for_archive': cold
+            }
+        return jsonify({'hot': hot, 'archive': archive_store.stats()})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/stats/emergency', methods=['GET'])
+def get_emergency_statistics():
+    """Emergency deliveries by status, plus this worker's dispatcher counters and latency"""
+    try:
+        by_status = dict(
+            db.session.query(EmergencyDelivery.status, db.func.count())
+            .group_by(EmergencyDelivery.status).all()
+        )
+        return jsonify({'deliveries': by_status, 'dispatcher': emergency_dispatcher.stats()})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics for this worker process"""
+    if not metrics.enabled:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@api.route('/api/stats/symptoms', methods=['GET'])
+def get_symptom_statistics():
+    """Most reported symptoms, counted from the assessment_symptom index"""
+    try:
+        kind = request.args.get('kind')
+        limit = max(1, min(request.args.get('limit', 20, type=int), 200))
+        if kind is not None and kind not in SYMPTOM_KINDS:
+            return jsonify({'error': f"kind must be one of {', '.join(SYMPTOM_KINDS)}"}), 400
+        
+        count = db.func.count().label('count')
+        query = db.session.query(AssessmentSymptom.kind, AssessmentSymptom.symptom, count)
+        if kind is not None:
+            query = query.filter(AssessmentSymptom.kind == kind)
+        query = query.group_by(AssessmentSymptom.kind, AssessmentSymptom.symptom) \
+            .order_by(count.desc(), AssessmentSymptom.symptom)
+        
+        archived = archive_store.counts('assessment')
+        if not any(name.startswith('symptom:') for name in archived):
+            rows = [(row.kind, row.symptom, row.count) for row in query.limit(limit).all()]
+        else:
+            # Every hot count is needed to rank them together with the archived ones
+            totals = {(row.kind, row.symptom): row.count for row in query.all()}
+            for name, value in archived.items():
+                if name.startswith('symptom:'):
+                    _, symptom_kind, symptom = name.split(':', 2)
+                    if kind is None or symptom_kind == kind:
+                        totals[(symptom_kind, symptom)] = totals.get((symptom_kind, symptom), 0) + value
+            rows = sorted(((k, s, c) for (k, s), c in totals.items()), key=lambda row: (-row[2], row[1]))[:limit]
+        
+        return jsonify([{'kind': row[0], 'symptom': row[1], 'count': row[2]} for row in rows])
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.cli.command('rebuild-stats')
+def rebuild_stats():
+    """Recount /api/stats totals from the source tables"""
+    counts = seed_stat_counters(rebuild=True)
+    click.echo(json.dumps(counts, indent=2))
+
+@api.cli.command('retriage')
+@click.option('--batch-size', default=5000, help='Assessments scored per query')
+@click.option('--dry-run', is_flag=True, help='Report changes without saving them')
+def retriage_assessments(batch_size, dry_run):
+    """Re-score stored assessments with the current triage rules"""
+    columns = (Assessment.id, Assessment.primary_symptom, Assessment.symptom_severity,
+               Assessment.symptom_onset, Assessment.emergency_symptoms, Assessment.triage_level)
+    last_id, scanned, changed = 0, 0, 0
+    
+    while True:
+        rows = db.session.query(*columns).filter(Assessment.id > last_id) \
+            .order_by(Assessment.id).limit(batch_size).all()
+        if not rows:
+            break
+        
+        levels = TriageSystem.calculate_triage_levels([{
+            'primary_symptom': row.primary_symptom,
+            'symptom_severity': row.symptom_severity,
+            'symptom_onset': row.symptom_onset,
+            'emergency_symptoms': row.emergency_symptoms or []
+        } for row in rows])
+        
+        updates = []
+        deltas = {}
+        for row, level in zip(rows, levels):
+            if level != row.triage_level:
+                updates.append({'id': row.id, 'triage_level': level})
+                deltas[triage_stat_name(level)] = deltas.get(triage_stat_name(level), 0) + 1
+                deltas[triage_stat_name(row.triage_level)] = deltas.get(triage_stat_name(row.triage_level), 0) - 1
+        if updates and not dry_run:
+            db.session.bulk_update_mappings(Assessment, updates)
+            increment_stats(**deltas)
+            db.session.commit()
+        
+        scanned += len(rows)
+        changed += len(updates)
+        last_id = rows[-1].id
+    
+    click.echo(f"Scanned {scanned} assessments, {changed} triage levels {'would change' if dry_run else 'updated'}")
+
+# Columns that older databases store as json.dumps text
+JSON_TEXT_COLUMNS = {
+    'patient': ('medical_conditions',),
+    'assessment': tuple(SYMPTOM_KINDS.values())
+}
+
+@api.cli.command('migrate-symptom-storage')
+@click.option('--batch-size', default=5000, help='Assessments backfilled per transaction')
+def migrate_symptom_storage(batch_size):
+    """Convert JSON text columns to native JSON and backfill assessment_symptom"""
+    db.create_all()
+    
+    inspector = db.inspect(db.engine)
+    for table, columns in JSON_TEXT_COLUMNS.items():
+        types = {column['name']: column['type'] for column in inspector.get_columns(table)}
+        for column in columns:
+            if db.engine.dialect.name == 'postgresql':
+                if not isinstance(types[column], JSONB):
+                    db.session.execute(db.text(
+                        f"ALTER TABLE {table} ALTER COLUMN {column} TYPE jsonb USING NULLIF({column}, '')::jsonb"
+                    ))
+            else:
+                # JSON is stored as text here; only blanks fail to decode
+                db.session.execute(db.text(f"UPDATE {table} SET {column} = NULL WHERE {column} = ''"))
+    db.session.commit()
+    
+    columns = [getattr(Assessment, column) for column in SYMPTOM_KINDS.values()]
+    last_id, migrated, symptoms = 0, 0, 0
+    while True:
+        rows = db.session.query(Assessment.id, *columns).filter(Assessment.id > last_id) \
+            .order_by(Assessment.id).limit(batch_size).all()
+        if not rows:
+            break
+        
+        # Rebuild the batch's rows so the command can be re-run safely
+        symptom_rows = []
+        for row in rows:
+            symptom_rows.extend(assessment_symptom_rows(
+                row.id, {kind: symptom_codes(row[index + 1]) for index, kind in enumerate(SYMPTOM_KINDS)}
+            ))
+        db.session.query(AssessmentSymptom).filter(
+            AssessmentSymptom.assessment_id.between(rows[0].id, rows[-1].id)
+        ).delete(synchronize_session=False)
+        if symptom_rows:
+            db.session.execute(db.insert(AssessmentSymptom), symptom_rows)
+        db.session.commit()
+        
+        migrated += len(rows)
+        symptoms += len(symptom_rows)
+        last_id = rows[-1].id
+    
+    click.echo(f"Migrated {migrated} assessments, {symptoms} symptom rows indexed")
+
+# Tables that gained updated_at as an HTTP cache validator
+UPDATED_AT_TABLES = ('patient', 'assessment', 'healthcare_provider')
+
+@api.cli.command('migrate-row-versions')
+def migrate_row_versions():
+    """Add updated_at to older databases and create any missing indexes"""
+    db.create_all()
+    
+    inspector = db.inspect(db.engine)
+    for table in UPDATED_AT_TABLES:
+        if 'updated_at' not in {column['name'] for column in inspector.get_columns(table)}:
+            db.session.execute(db.text(f"ALTER TABLE {table} ADD COLUMN updated_at TIMESTAMP"))
+        db.session.execute(db.text(
+            f"UPDATE {table} SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL"
+        ))
+    db.session.commit()
+    
+    # create_all() skips indexes on tables that already exist
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    
+    click.echo(f"updated_at present on {', '.join(UPDATED_AT_TABLES)}; indexes up to date")
+
+EMERGENCY_EVENT_COLUMNS = (('plan_error', 'VARCHAR(255)'),)
+
+@api.cli.command('migrate-emergency-events')
+def migrate_emergency_events():
+    """Add the plan_error column to emergency_event tables created before it existed"""
+    existing = {column['name'] for column in db.inspect(db.engine).get_columns('emergency_event')}
+    for name, column_type in EMERGENCY_EVENT_COLUMNS:
+        if name not in existing:
+            db.session.execute(db.text(f"ALTER TABLE emergency_event ADD COLUMN {name} {column_type}"))
+    db.session.commit()
+    click.echo("emergency_event columns present")
+
+CHAT_CONTEXT_COLUMNS = {
+    'consultation': (('summary', 'TEXT'), ('summary_tokens', 'INTEGER'), ('summary_through_id', 'INTEGER')),
+    'chat_message': (('token_count', 'INTEGER'),)
+}
+
+@api.cli.command('migrate-chat-context')
+@click.option('--batch-size', default=5000, show_default=True, help='Messages per token count update')
+def migrate_chat_context(batch_size):
+    """Add chat summary and token count columns to older databases and backfill token counts"""
+    inspector = db.inspect(db.engine)
+    for table, columns in CHAT_CONTEXT_COLUMNS.items():
+        existing = {column['name'] for column in inspector.get_columns(table)}
+        for name, column_type in columns:
+            if name not in existing:
+                db.session.execute(db.text(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}"))
+    db.session.commit()
+    for index in ChatMessage.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+    
+    backfilled = 0
+    while True:
+        rows = db.session.query(ChatMessage.id, ChatMessage.content).filter(
+            ChatMessage.token_count.is_(None)
+        ).order_by(ChatMessage.id).limit(batch_size).all()
+        if not rows:
+            break
+        db.session.bulk_update_mappings(ChatMessage, [
+            {'id': row.id, 'token_count': count_tokens(row.content)} for row in rows
+        ])
+        db.session.commit()
+        backfilled += len(rows)
+    
+    click.echo(f"Chat context columns present; token counts backfilled for {backfilled} messages")
+
+@api.cli.command('warm-translations')
+@click.option('--recent-replies', default=0, show_default=True, help='Also translate this many recent doctor replies')
+def warm_translations(recent_replies):
+    """Fill the translation cache with canned responses missing from the table, and recent replies"""
+    english = localization.responses('en')
+    replies = []
+    if recent_replies:
+        replies = [row.content for row in db.session.query(ChatMessage.content).filter(
+            ChatMessage.sender == 'doctor', ChatMessage.language == 'en'
+        ).order_by(ChatMessage.id.desc()).limit(recent_replies)]
+    
+    for language in current_app.config['SUPPORTED_LANGUAGES']:
+        if language == 'en':
+            continue
+        texts = [text for key, text in english.items() if localization.is_fallback(language, key)] + replies
+        # Small groups, so that no group runs into TRANSLATION_TIMEOUT
+        for start in range(0, len(texts), 10):
+            translation.translate_many(texts[start:start + 10], language, source='en')
+        click.echo(f"{language}: {len(texts)} texts")
+    
+    stats = translation.stats()
+    click.echo(f"{stats['cached_sentences']} sentences cached, {stats['backend_errors']} backend errors")
+
+# Archived tables: model, age column, the column rows are grouped by for read-through
+ARCHIVED_TABLES = {
+    'chat_message': (ChatMessage, ChatMessage.timestamp, 'consultation_id'),
+    'assessment': (Assessment, Assessment.created_at, 'patient_id')
+}
+
+def archived_rows(table, group, exclude_ids=()):
+    """Archived rows of a consultation's messages or a patient's assessments, with attribute access"""
+    return [SimpleNamespace(**row) for row in archive_store.group_rows(table, group) if row['id'] not in exclude_ids]
+
+def archive_counts(rows):
+    """Triage and symptom totals of archived assessments, for /api/stats and /api/stats/symptoms"""
+    counts = {}
+    ids = [row['id'] for row in rows]
+    symptoms = []
+    for start in range(0, len(ids), 500):
+        symptoms += db.session.query(AssessmentSymptom.kind, AssessmentSymptom.symptom) \
+            .filter(AssessmentSymptom.assessment_id.in_(ids[start:start + 500])).all()
+    for name in [f"triage:{row['triage_level']}" for row in rows] + [f'symptom:{k}:{s}' for k, s in symptoms]:
+        counts[name] = counts.get(name, 0) + 1
+    return counts
+
+def cold_rows(table, cutoff, *columns):
+    """Query for the rows of an archived table that are older than ``cutoff``"""
+    model, age_column, _ = ARCHIVED_TABLES[table]
+    query = db.session.query(*columns).filter(age_column < cutoff)
+    if model is ChatMessage:
+        # Messages a voice message points to stay in the database with it
+        query = query.filter(~ChatMessage.id.in_(
+            db.session.query(VoiceMessage.chat_message_id).filter(VoiceMessage.chat_message_id.isnot(None))
+        ))
+    return query
+
+def copy_to_archive(table, cutoff):
+    """Write every row older than ``cutoff`` to archive parts; returns (first id, last id) of each batch"""
+    model, age_column, group_field = ARCHIVED_TABLES[table]
+    columns = list(model.__table__.columns)
+    datetime_fields = [column.name for column in columns if isinstance(column.type, db.DateTime)]
+    batches, last_id = [], 0
+    while True:
+        rows = [dict(zip((column.name for column in columns), row)) for row in cold_rows(table, cutoff, *columns)
+                .filter(model.id > last_id).order_by(model.id).limit(archive_store.batch_size).all()]
+        if not rows:
+            return batches
+        
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(month_key(row[age_column.name]), []).append(row)
+        for month, month_rows in by_month.items():
+            archive_store.write_part(
+                table, month, month_rows, group_field, datetime_fields,
+                index_ids=model is Assessment, counts=archive_counts if model is Assessment else None
+            )
+        last_id = rows[-1]['id']
+        batches.append((rows[0]['id'], last_id))
+        db.session.rollback()
+
+def delete_archived(table, cutoff, first_id, last_id):
+    """Delete one copied batch from the database"""
+    model = ARCHIVED_TABLES[table][0]
+    ids = cold_rows(table, cutoff, model.id).filter(model.id.between(first_id, last_id))
+    if model is Assessment:
+        db.session.query(AssessmentSymptom).filter(AssessmentSymptom.assessment_id.in_(ids)) \
+            .delete(synchronize_session=False)
+    deleted = db.session.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+@api.cli.command('archive-cold-rows')
+@click.option('--table', 'tables', multiple=True, type=click.Choice(list(ARCHIVED_TABLES)),
+              help='Archive only this table (repeatable)')
+@click.option('--dry-run', is_flag=True, help='Count the rows that would be archived')
+def archive_cold_rows(tables, dry_run):
+    """Move chat messages and assessments from months older than ARCHIVE_AFTER_DAYS to the archive"""
+    cutoff = archive_store.cutoff()
+    for table in tables or ARCHIVED_TABLES:
+        model = ARCHIVED_TABLES[table][0]
+        if dry_run:
+            count = cold_rows(table, cutoff, db.func.count(model.id)).scalar()
+            click.echo(f"{table}: {count} rows before {cutoff:%Y-%m-%d}")
+            continue
+        
+        started = time.perf_counter()
+        batches = copy_to_archive(table, cutoff)
+        if batches:
+            # Rows stay in the database until every worker has reloaded the catalog and can read
+            # them from the archive. A crash before the deletes writes the same parts again
+            time.sleep(archive_store.reload_interval)
+        moved = sum(delete_archived(table, cutoff, first_id, last_id) for first_id, last_id in batches)
+        click.echo(f"{table}: archived {moved} rows before {cutoff:%Y-%m-%d} in {time.perf_counter() - started:.1f}s")
+
 # Initialize database
-@app.before_first_request
 def create_tables():
     db.create_all()
     
@@ -643,6 +2513,8 @@ def create_tables():
                 location="Rural Health Center, Rajasthan",
                 phone="+91-9876543210",
                 email="dr.rajesh@rhc.gov.in",
+                latitude=26.9124,
+                longitude=75.7873,
                 availability="Mon-Fri 9AM-5PM"
             ),
             HealthcareProvider(
@@ -651,6 +2523,8 @@ def create_tables():
                 location="Community Health Center, Uttar Pradesh",
                 phone="+91-9876543211",
                 email="dr.priya@chc.gov.in",
+                latitude=26.8467,
+                longitude=80.9462,
                 availability="Mon-Sat 10AM-4PM"
             ),
             HealthcareProvider(
@@ -659,6 +2533,8 @@ def create_tables():
                 location="District Hospital, Gujarat",
                 phone="+91-9876543212",
                 email="dr.amit@dh.gov.in",
+                latitude=23.0225,
+                longitude=72.5714,
                 availability="24/7"
             )
         ]
@@ -667,6 +2543,52 @@ def create_tables():
             db.session.add(provider)
         
         db.session.commit()
+    
+    if current_app.config['STATS_COUNTERS_ENABLED'] and StatCounter.query.count() < len(STAT_NAMES):
+        seed_stat_counters()
+
+def create_app(config_name=None):
+    """Build the application for a config name from config.py (FLASK_CONFIG by default)"""
+    config_name = config_name or os.environ.get('FLASK_CONFIG') or os.environ.get('FLASK_ENV') or 'default'
+    app = Flask(__name__)
+    app.config.from_object(config[config_name])
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **engine_options(app.config),
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    }
+    
+    db.init_app(app)
+    db_pool.init_app(app)
+    CORS(app)
+    llm_client.init_app(app)
+    job_queue.init_app(app)
+    response_cache.init_app(app)
+    single_flight.init_app(app)
+    provider_index.init_app(app)
+    localization.init_app(app)
+    inference_router.init_app(app)
+    emergency_dispatcher.init_app(app)
+    metrics.init_app(app)
+    http_cache.init_app(app)
+    outbreak_monitor.init_app(app)
+    chat_context.init_app(app)
+    voice_pipeline.init_app(app)
+    translation.init_app(app)
+    archive_store.init_app(app)
+    # Multilingual chat keyword matcher, compiled once at startup
+    app.extensions['keyword_matcher'] = KeywordMatcher.from_file(app.config['KEYWORD_TABLE_PATH'])
+    app.register_blueprint(api)
+    
+    with app.app_context():
+        create_tables()
+    return app
+
+# Voice pool processes started by forkserver or spawn import the entry script again
+# as __mp_main__; under `python app.py` they must not build a second app each
+if __name__ != '__mp_main__':
+    app = create_app()
+    celery = job_queue.celery
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    emergency_dispatcher.start()
+    app.run(debug=app.config.get('DEBUG', False), host='0.0.0.0', port=5000)
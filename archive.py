@@ -0,0 +1,363 @@
+"""Month-partitioned cold storage for rows that have left the hot tables.
+
+Rows older than ARCHIVE_AFTER_DAYS are moved out of the database a whole
+calendar month at a time. The database then only holds recent history,
+and its indexes and counts stay the same size however long the service
+runs. Each batch of a month is written as one part file,
+``<ARCHIVE_DIR>/<table>/<YYYY-MM>/part-<first id>-<last id>.jsonl.gz``,
+and rows are deleted only once every worker has had time to see their parts.
+A run that dies between the two steps copies the same rows again next time.
+A part whose id range overlaps parts already in the month replaces them: it
+keeps their rows and totals and adds only the rows they lack, so no row is
+archived or counted twice.
+
+Inside a part, rows are sorted by their group (consultation or patient), and
+each group is its own gzip member. The whole file still reads with ``zcat``,
+and the part's ``.idx.json`` records the offset and length of every group.
+A historical lookup reads and decompresses only the groups it needs. Parts
+are only replaced whole, so decoded groups are cached until the next reload.
+
+Every worker keeps the indexes in memory. It re-reads them when another
+process adds a part, which it checks at most every ARCHIVE_RELOAD_INTERVAL
+seconds.
+"""
+import collections
+import gzip
+import json
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+
+
+def month_key(timestamp):
+    return timestamp.strftime('%Y-%m')
+
+
+def month_start(timestamp):
+    return timestamp.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _encode(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _id_range(index):
+    if 'first_id' in index:
+        return index['first_id'], index['last_id']
+    # Indexes written before the range was recorded: part-<first id>-<last id>.jsonl.gz
+    _, first_id, last_id = index['file'].split('.')[0].split('-')
+    return int(first_id), int(last_id)
+
+
+def _overlaps(a, b):
+    return a[0] <= b[1] and b[0] <= a[1]
+
+
+class ArchiveStore:
+    def __init__(self, app=None):
+        self.enabled = True
+        self.root = 'archive'
+        self.after_days = 180
+        self.batch_size = 20000
+        self.reload_interval = 30.0
+        self.lookups = 0
+        self.rows_read = 0
+        self.cache_hits = 0
+        self._groups = {}
+        self._ids = {}
+        self._parts = {}
+        self._counts = {}
+        self._decoded = collections.OrderedDict()
+        self._cache_size = 256
+        self._catalog_mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('ARCHIVE_ENABLED', self.enabled)
+        self.root = app.config.get('ARCHIVE_DIR') or os.path.join(app.instance_path, 'archive')
+        self.after_days = app.config.get('ARCHIVE_AFTER_DAYS', self.after_days)
+        self.batch_size = app.config.get('ARCHIVE_BATCH_SIZE', self.batch_size)
+        self.reload_interval = app.config.get('ARCHIVE_RELOAD_INTERVAL', self.reload_interval)
+        self._cache_size = app.config.get('ARCHIVE_CACHE_GROUPS', self._cache_size)
+        os.makedirs(self.root, exist_ok=True)
+        self.load()
+        app.extensions['archive'] = self
+
+    @property
+    def _catalog_path(self):
+        # Touched after every new part, so readers can tell when to reload
+        return os.path.join(self.root, 'CATALOG')
+
+    def cutoff(self, now=None):
+        """Rows older than this are archived: the start of the month ARCHIVE_AFTER_DAYS ago"""
+        return month_start((now or datetime.utcnow()) - timedelta(days=self.after_days))
+
+    def load(self):
+        """Read every part index under the archive root and swap in a new catalog"""
+        groups, ids, parts, counts = {}, {}, {}, {}
+        for directory, _, files in os.walk(self.root):
+            indexes = []
+            for name in sorted(files):
+                if name.endswith('.idx.json'):
+                    with open(os.path.join(directory, name), encoding='utf-8') as f:
+                        indexes.append(json.load(f))
+            # A replacement part and the parts it replaces overlap until those are deleted;
+            # the largest wins, so its rows and counts are not added twice
+            kept = []
+            for index in sorted(indexes, key=lambda index: -index['rows']):
+                if any(_overlaps(_id_range(index), _id_range(other)) for other in kept):
+                    continue
+                kept.append(index)
+                self._add_index(index, os.path.join(directory, index['file']), groups, ids, parts, counts)
+        try:
+            mtime = os.stat(self._catalog_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        with self._lock:
+            self._groups, self._ids, self._parts, self._counts = groups, ids, parts, counts
+            # A replaced part can be rewritten under the same name
+            self._decoded.clear()
+            self._catalog_mtime = mtime
+            self._checked_at = time.monotonic()
+
+    @staticmethod
+    def _add_index(index, path, groups, ids, parts, counts):
+        table = index['table']
+        if path in parts:
+            return
+        parts[path] = index
+        for group, (offset, length, _) in index['groups'].items():
+            groups.setdefault((table, group), []).append((path, offset, length))
+        for row_id, group in index.get('ids', {}).items():
+            ids[(table, int(row_id))] = group
+        totals = counts.setdefault(table, collections.Counter())
+        for name, value in index.get('counts', {}).items():
+            totals[name] += value
+
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if self.reload_interval <= 0 or now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            if now - self._checked_at < self.reload_interval:
+                return
+            self._checked_at = now
+        try:
+            if os.stat(self._catalog_path).st_mtime_ns != self._catalog_mtime:
+                self.load()
+        except OSError:
+            pass
+        except ValueError as e:
+            # Keep serving the last catalog read
+            print(f"Archive reload failed: {e}")
+
+    def write_part(self, table, month, rows, group_field, datetime_fields=(), index_ids=False, counts=None):
+        """Write ``rows`` (dicts with an ``id``) of one month as a part and add it to the catalog
+
+        ``index_ids`` makes single rows findable by id. ``counts(rows)`` gives
+        totals kept in the index, so aggregates can include archived rows
+        unread. Parts of the month that overlap the rows' id range are merged
+        into the new part and deleted; rows they already hold are not written
+        or counted again. Returns the index of the part holding the rows.
+        """
+        directory = os.path.join(self.root, table, month)
+        os.makedirs(directory, exist_ok=True)
+        id_range = (min(row['id'] for row in rows), max(row['id'] for row in rows))
+        replaced = self._overlapping_parts(table, month, id_range)
+        totals = collections.Counter()
+        if replaced:
+            archived = {}
+            for old_path, old_index in replaced.items():
+                archived.update((row['id'], row) for row in self._read_part(old_path, old_index))
+                totals.update(old_index.get('counts', {}))
+            rows = [row for row in rows if row['id'] not in archived]
+            if not rows and len(replaced) == 1:
+                # Every row is already in that part, as after a rerun of the same batch
+                return next(iter(replaced.values()))
+            if rows and counts:
+                totals.update(counts(rows))
+            rows = list(archived.values()) + rows
+            id_range = (min(row['id'] for row in rows), max(row['id'] for row in rows))
+        elif counts:
+            totals.update(counts(rows))
+        name = f'part-{id_range[0]}-{id_range[1]}'
+        path = os.path.join(directory, f'{name}.jsonl.gz')
+        self._delete_unindexed(directory, id_range)
+
+        by_group = collections.defaultdict(list)
+        for row in rows:
+            by_group[str(row[group_field])].append(row)
+        index = {
+            'table': table, 'month': month, 'file': os.path.basename(path), 'rows': len(rows),
+            'first_id': id_range[0], 'last_id': id_range[1],
+            'group_field': group_field, 'datetime_fields': list(datetime_fields),
+            'groups': {}, 'counts': dict(totals)
+        }
+        if index_ids:
+            index['ids'] = {str(row['id']): str(row[group_field]) for row in rows}
+
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as f:
+            for group in sorted(by_group, key=lambda key: (len(key), key)):
+                body = ''.join(
+                    json.dumps({field: _encode(value) for field, value in row.items()}, ensure_ascii=False) + '\n'
+                    for row in sorted(by_group[group], key=lambda row: row['id'])
+                ).encode('utf-8')
+                member = gzip.compress(body, compresslevel=6)
+                index['groups'][group] = [f.tell(), len(member), len(by_group[group])]
+                f.write(member)
+            index['bytes'] = f.tell()
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+
+        # The index goes last: a part without one is ignored and rewritten by the next run
+        index_path = os.path.join(directory, f'{name}.idx.json')
+        with open(f'{index_path}.{os.getpid()}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f'{index_path}.{os.getpid()}.tmp', index_path)
+        # Replaced parts go only once the new one is complete; until then load() prefers it
+        for old_path in replaced:
+            if old_path != path:
+                os.remove(old_path[:-len('.jsonl.gz')] + '.idx.json')
+                os.remove(old_path)
+        with open(self._catalog_path, 'a'):
+            os.utime(self._catalog_path)
+
+        if replaced:
+            self.load()
+        else:
+            with self._lock:
+                self._add_index(index, path, self._groups, self._ids, self._parts, self._counts)
+        return index
+
+    def _overlapping_parts(self, table, month, id_range):
+        with self._lock:
+            return {
+                path: index for path, index in self._parts.items()
+                if index['table'] == table and index['month'] == month and _overlaps(_id_range(index), id_range)
+            }
+
+    @staticmethod
+    def _delete_unindexed(directory, id_range):
+        # Left by a run that died before writing the index; their rows are still in the database
+        names = set(os.listdir(directory))
+        for name in names:
+            if name.startswith('part-') and name.endswith('.jsonl.gz'):
+                stem = name[:-len('.jsonl.gz')]
+                if f'{stem}.idx.json' not in names and _overlaps(_id_range({'file': name}), id_range):
+                    os.remove(os.path.join(directory, name))
+
+    @staticmethod
+    def _read_part(path, index):
+        """Every row of a part, decoded"""
+        rows = []
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                row = json.loads(line)
+                for field in index['datetime_fields']:
+                    if row.get(field) is not None:
+                        row[field] = datetime.fromisoformat(row[field])
+                rows.append(row)
+        return rows
+
+    def _read_group(self, path, offset, length):
+        key = (path, offset)
+        with self._lock:
+            rows = self._decoded.get(key)
+            if rows is not None:
+                self._decoded.move_to_end(key)
+                self.cache_hits += 1
+                return rows
+            datetime_fields = self._parts[path]['datetime_fields']
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            body = gzip.decompress(f.read(length)).decode('utf-8')
+        rows = []
+        for line in body.splitlines():
+            row = json.loads(line)
+            for field in datetime_fields:
+                if row.get(field) is not None:
+                    row[field] = datetime.fromisoformat(row[field])
+            rows.append(row)
+        with self._lock:
+            self.rows_read += len(rows)
+            self._decoded[key] = rows
+            while len(self._decoded) > self._cache_size:
+                self._decoded.popitem(last=False)
+        return rows
+
+    def has_group(self, table, group):
+        """True if any archived row of ``table`` belongs to ``group``; reads no files"""
+        if not self.enabled:
+            return False
+        self._reload_if_changed()
+        return (table, str(group)) in self._groups
+
+    def group_rows(self, table, group):
+        """Every archived row of ``table`` in ``group``, in id order"""
+        if not self.has_group(table, group):
+            return []
+        self._count('lookups')
+        for attempt in range(2):
+            try:
+                rows = {}
+                for path, offset, length in self._groups.get((table, str(group)), ()):
+                    rows.update((row['id'], row) for row in self._read_group(path, offset, length))
+                break
+            except (OSError, EOFError, KeyError, ValueError, zlib.error):
+                if attempt:
+                    raise
+                # Another process replaced the part; its rows are in the part that replaced it
+                self.load()
+        return [rows[row_id] for row_id in sorted(rows)]
+
+    def find(self, table, row_id):
+        """One archived row by id, for tables written with ``index_ids``; None if it is not archived"""
+        if not self.enabled:
+            return None
+        self._reload_if_changed()
+        group = self._ids.get((table, row_id))
+        if group is None:
+            return None
+        return next((row for row in self.group_rows(table, group) if row['id'] == row_id), None)
+
+    def counts(self, table):
+        """Totals kept with the archived parts of ``table``"""
+        if not self.enabled:
+            return collections.Counter()
+        self._reload_if_changed()
+        return collections.Counter(self._counts.get(table, {}))
+
+    def _count(self, attr):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def stats(self):
+        with self._lock:
+            tables = {}
+            for index in self._parts.values():
+                table = tables.setdefault(index['table'], {'parts': 0, 'rows': 0, 'bytes': 0, 'months': set()})
+                table['parts'] += 1
+                table['rows'] += index['rows']
+                table['bytes'] += index.get('bytes', 0)
+                table['months'].add(index['month'])
+            for table in tables.values():
+                table['months'] = sorted(table['months'])
+            return {
+                'enabled': self.enabled,
+                'after_days': self.after_days,
+                'cutoff': self.cutoff().isoformat(),
+                'tables': tables,
+                'lookups': self.lookups,
+                'rows_read': self.rows_read,
+                'cache_hits': self.cache_hits,
+                'cached_groups': len(self._decoded)
+            }
@@ -0,0 +1,168 @@
+"""Conversation history for chat prompts, fitted to a token budget.
+
+A prompt carries the consultation's rolling summary plus as many of the
+newest messages as fit in CHAT_CONTEXT_TOKENS. Messages already folded into
+the summary (ids up to ``Consultation.summary_through_id``) are never read
+again, so building a prompt reads at most CHAT_CONTEXT_MAX_MESSAGES rows
+however long the consultation runs.
+
+Token counts are estimated once, when a message is saved, and stored on the
+row. When recent messages no longer fit, a background job folds the older
+ones into the summary until the unsummarized tail is about half the budget.
+The request that noticed does not wait; it sends the newest turns that fit.
+"""
+import threading
+import time
+from collections import namedtuple
+
+# Role and framing tokens OpenAI adds around every chat message
+MESSAGE_OVERHEAD = 4
+
+ROLES = {'user': 'user', 'doctor': 'assistant', 'system': 'system'}
+SPEAKERS = {'user': 'Patient', 'doctor': 'Doctor', 'system': 'System'}
+
+ChatTurn = namedtuple('ChatTurn', 'id sender content token_count')
+
+
+def count_tokens(text):
+    """Estimated GPT-4 tokens: about four ASCII characters per token, one per other character"""
+    if not text:
+        return 0
+    ascii_chars = sum(1 for char in text if char < '\x80')
+    return -(-ascii_chars // 4) + len(text) - ascii_chars
+
+
+def message_tokens(row):
+    """Prompt cost of a stored message, using its cached count when it has one"""
+    tokens = row.token_count if row.token_count is not None else count_tokens(row.content)
+    return tokens + MESSAGE_OVERHEAD
+
+
+def clip(text, max_tokens):
+    """Drop whole lines, then characters, from the start of ``text`` until it fits"""
+    lines = text.strip().splitlines()
+    while len(lines) > 1 and count_tokens('\n'.join(lines)) > max_tokens:
+        lines.pop(0)
+    text = '\n'.join(lines)
+    while text and count_tokens(text) > max_tokens:
+        text = text[max(1, len(text) // 10):]
+    return text
+
+
+class ChatContext:
+    """The summary and recent turns chosen for one prompt"""
+    __slots__ = ('summary', 'turns', 'tokens', 'needs_summary')
+
+    def __init__(self, summary, turns, tokens, needs_summary):
+        self.summary = summary
+        self.turns = turns
+        self.tokens = tokens
+        self.needs_summary = needs_summary
+
+    def messages(self, summary_template):
+        """Chat messages to place between the system prompt and the new patient message"""
+        messages = []
+        if self.summary:
+            messages.append({"role": "system", "content": summary_template.format(summary=self.summary)})
+        messages.extend({"role": ROLES.get(turn.sender, 'user'), "content": turn.content} for turn in self.turns)
+        return messages
+
+
+class ChatContextBuilder:
+    def __init__(self, app=None):
+        self.enabled = True
+        self.budget = 1500
+        self.max_messages = 40
+        self.summary_budget = 300
+        self.fold_batch = 100
+        self.claim_ttl = 60.0
+        self.builds = 0
+        self.context_tokens = 0
+        self.max_context_tokens = 0
+        self.dropped = 0
+        self.summaries = 0
+        self.summary_fallbacks = 0
+        self._claims = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('CHAT_CONTEXT_ENABLED', self.enabled)
+        self.budget = app.config.get('CHAT_CONTEXT_TOKENS', self.budget)
+        self.max_messages = app.config.get('CHAT_CONTEXT_MAX_MESSAGES', self.max_messages)
+        self.summary_budget = min(app.config.get('CHAT_SUMMARY_TOKENS', self.summary_budget), self.budget // 2)
+        self.fold_batch = app.config.get('CHAT_SUMMARY_BATCH', self.fold_batch)
+        app.extensions['chat_context'] = self
+
+    def _newest_fitting(self, rows, budget, max_count):
+        """How many of ``rows`` (newest first) fit in ``budget`` tokens, and their cost"""
+        used = 0
+        for count, row in enumerate(rows):
+            cost = message_tokens(row)
+            if count >= max_count or used + cost > budget:
+                return count, used
+            used += cost
+        return len(rows), used
+
+    def select(self, summary, summary_tokens, rows):
+        """Context from the summary and unsummarized ``rows`` (newest first, at most max_messages)"""
+        summary_tokens = (summary_tokens or count_tokens(summary)) if summary else 0
+        kept, used = self._newest_fitting(rows, self.budget - summary_tokens, self.max_messages)
+        turns = [ChatTurn(*row) for row in reversed(rows[:kept])]
+        # A full page may hide older unsummarized messages
+        needs_summary = kept < len(rows) or len(rows) >= self.max_messages
+        context = ChatContext(summary, turns, summary_tokens + used, needs_summary)
+        with self._lock:
+            self.builds += 1
+            self.context_tokens += context.tokens
+            self.max_context_tokens = max(self.max_context_tokens, context.tokens)
+            self.dropped += len(rows) - kept
+        return context
+
+    def keep_count(self, rows):
+        """Newest ``rows`` to leave unsummarized when folding: half the room left by the summary"""
+        kept, _ = self._newest_fitting(rows, (self.budget - self.summary_budget) // 2, self.max_messages // 2)
+        return kept
+
+    def claim(self, consultation_id):
+        """True if no summary job was started for this consultation in the last claim_ttl seconds"""
+        now = time.monotonic()
+        with self._lock:
+            if self._claims.get(consultation_id, 0) > now:
+                return False
+            if len(self._claims) > 10000:
+                self._claims = {key: until for key, until in self._claims.items() if until > now}
+            self._claims[consultation_id] = now + self.claim_ttl
+            return True
+
+    @staticmethod
+    def transcript(rows):
+        return '\n'.join(f"{SPEAKERS.get(row.sender, 'Patient')}: {row.content}" for row in rows)
+
+    def compact(self, summary, rows):
+        """Summary without an LLM: the old summary plus each folded message's first sentence"""
+        lines = [summary] if summary else []
+        for row in rows:
+            first = row.content.strip().split('\n', 1)[0]
+            sentence = first.split('. ', 1)[0]
+            lines.append(f"{SPEAKERS.get(row.sender, 'Patient')}: {sentence[:200]}")
+        return clip('\n'.join(lines), self.summary_budget)
+
+    def summarized(self, fallback):
+        with self._lock:
+            self.summaries += 1
+            self.summary_fallbacks += fallback
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'budget_tokens': self.budget,
+            'summary_tokens': self.summary_budget,
+            'builds': self.builds,
+            'avg_context_tokens': round(self.context_tokens / self.builds, 1) if self.builds else 0.0,
+            'max_context_tokens': self.max_context_tokens,
+            'dropped_messages': self.dropped,
+            'summaries': self.summaries,
+            'summary_fallbacks': self.summary_fallbacks
+        }
@@ -3,12 +3,148 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() == 'true'
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'healthcare-ai-secret-key'
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///healthcare.db'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///rural_health.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
     
+    # Database connection pool (per worker process). pool_size + max_overflow
+    # should cover GUNICORN_THREADS, and workers x that must stay under the
+    # server's max_connections.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = env_bool('DB_POOL_PRE_PING', False)
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 0))  # Postgres; 0 disables
+    SQLITE_WAL = env_bool('SQLITE_WAL', True)
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 15000))
+    
+    # LLM access
+    OPENAI_API_BASE = os.environ.get('OPENAI_API_BASE')
+    LLM_MODEL = os.environ.get('LLM_MODEL', 'gpt-4')
+    LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 8))
+    LLM_TIMEOUT = float(os.environ.get('LLM_TIMEOUT', 20))
+    LLM_CACHE_ENABLED = env_bool('LLM_CACHE_ENABLED', True)
+    LLM_CACHE_BACKEND = os.environ.get('LLM_CACHE_BACKEND', 'memory')  # memory, redis
+    LLM_CACHE_REDIS_URL = os.environ.get('LLM_CACHE_REDIS_URL', 'redis://localhost:6379/1')
+    LLM_CACHE_TTL = int(os.environ.get('LLM_CACHE_TTL', 24 * 3600))
+    LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 2048))
+    LLM_COALESCE_ENABLED = env_bool('LLM_COALESCE_ENABLED', True)
+    LLM_COALESCE_BACKEND = os.environ.get('LLM_COALESCE_BACKEND', 'local')  # local (per worker), redis
+    LLM_COALESCE_REDIS_URL = os.environ.get('LLM_COALESCE_REDIS_URL', LLM_CACHE_REDIS_URL)
+    LLM_COALESCE_WAIT = float(os.environ.get('LLM_COALESCE_WAIT', 30))  # seconds to wait on another caller
+    
+    # Chat fallback when the LLM is slow or unreachable
+    LOCAL_INFERENCE_BACKEND = os.environ.get('LOCAL_INFERENCE_BACKEND', 'answer_bank')  # answer_bank, none
+    LLM_HEDGE_AFTER = float(os.environ.get('LLM_HEDGE_AFTER', 4))  # seconds; 0 disables
+    LLM_BREAKER_FAILURES = int(os.environ.get('LLM_BREAKER_FAILURES', 5))
+    LLM_BREAKER_RESET = float(os.environ.get('LLM_BREAKER_RESET', 30))
+    ANSWER_BANK_TTL = int(os.environ.get('ANSWER_BANK_TTL', 600))
+    ANSWER_BANK_MAX_PAIRS = int(os.environ.get('ANSWER_BANK_MAX_PAIRS', 20000))
+    ANSWER_BANK_MIN_SCORE = float(os.environ.get('ANSWER_BANK_MIN_SCORE', 0.5))
+    
+    # Background jobs
+    CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL')
+    CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND')
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))
+    RECOMMENDATION_MAX_WAIT = float(os.environ.get('RECOMMENDATION_MAX_WAIT', 25))
+    # Pending recommendations older than this can be retried (their job was lost)
+    RECOMMENDATION_STALE_AFTER = float(os.environ.get('RECOMMENDATION_STALE_AFTER', 300))
+    CHAT_MAX_WAIT = float(os.environ.get('CHAT_MAX_WAIT', 30))  # longest long-poll on /api/chat/<id>
+    
+    # Request limits and indexes
+    STATS_COUNTERS_ENABLED = env_bool('STATS_COUNTERS_ENABLED', True)
+    PROVIDER_INDEX_TTL = int(os.environ.get('PROVIDER_INDEX_TTL', 300))
+    PROVIDER_INDEX_CELL_DEGREES = float(os.environ.get('PROVIDER_INDEX_CELL_DEGREES', 0.25))
+    PROVIDER_SEARCH_MAX_K = int(os.environ.get('PROVIDER_SEARCH_MAX_K', 100))
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 1000))
+    MESSAGES_PAGE_SIZE = int(os.environ.get('MESSAGES_PAGE_SIZE', 50))
+    MESSAGES_PAGE_MAX = int(os.environ.get('MESSAGES_PAGE_MAX', 200))
+    TIMELINE_PAGE_SIZE = int(os.environ.get('TIMELINE_PAGE_SIZE', 20))
+    TIMELINE_PAGE_MAX = int(os.environ.get('TIMELINE_PAGE_MAX', 100))
+    TIMELINE_MESSAGES = int(os.environ.get('TIMELINE_MESSAGES', 10))  # latest messages per consultation
+    TRIAGE_BATCH_MAX = int(os.environ.get('TRIAGE_BATCH_MAX', 10000))
+    KEYWORD_TABLE_PATH = os.environ.get('KEYWORD_TABLE_PATH', os.path.join(BASE_DIR, 'data', 'medical_keywords.json'))
+    LOCALIZATION_PATH = os.environ.get('LOCALIZATION_PATH', os.path.join(BASE_DIR, 'data', 'language_responses.json'))
+    LOCALIZATION_RELOAD_INTERVAL = float(os.environ.get('LOCALIZATION_RELOAD_INTERVAL', 5))  # seconds; 0 disables
+    
+    # Server-side cache of read responses, revalidated with ETags
+    HTTP_CACHE_ENABLED = env_bool('HTTP_CACHE_ENABLED', True)
+    HTTP_CACHE_BACKEND = os.environ.get('HTTP_CACHE_BACKEND', 'memory')  # memory (per worker), redis
+    HTTP_CACHE_REDIS_URL = os.environ.get('HTTP_CACHE_REDIS_URL', LLM_CACHE_REDIS_URL)
+    HTTP_CACHE_TTL = int(os.environ.get('HTTP_CACHE_TTL', 3600))
+    HTTP_CACHE_MAX_ENTRIES = int(os.environ.get('HTTP_CACHE_MAX_ENTRIES', 4096))
+    
+    # Consultation history in chat prompts
+    CHAT_CONTEXT_ENABLED = env_bool('CHAT_CONTEXT_ENABLED', True)
+    CHAT_CONTEXT_TOKENS = int(os.environ.get('CHAT_CONTEXT_TOKENS', 1500))  # summary + recent turns per prompt
+    CHAT_CONTEXT_MAX_MESSAGES = int(os.environ.get('CHAT_CONTEXT_MAX_MESSAGES', 40))  # recent messages read per prompt
+    CHAT_SUMMARY_TOKENS = int(os.environ.get('CHAT_SUMMARY_TOKENS', 300))
+    CHAT_SUMMARY_BATCH = int(os.environ.get('CHAT_SUMMARY_BATCH', 100))  # messages folded per summary job
+    
+    # Voice messages (/api/consultation/<id>/voice)
+    VOICE_ENABLED = env_bool('VOICE_ENABLED', True)
+    VOICE_UPLOAD_DIR = os.environ.get('VOICE_UPLOAD_DIR')  # defaults to instance/voice
+    VOICE_MAX_UPLOAD_BYTES = int(os.environ.get('VOICE_MAX_UPLOAD_BYTES', 10 * 1024 * 1024))
+    VOICE_MAX_SECONDS = int(os.environ.get('VOICE_MAX_SECONDS', 120))  # longest recording transcribed
+    VOICE_WORKERS = int(os.environ.get('VOICE_WORKERS', 2))  # transcoding processes per API worker
+    VOICE_MAX_PENDING = int(os.environ.get('VOICE_MAX_PENDING', 32))  # queued recordings before uploads get 503
+    VOICE_MAX_UPLOADS = int(os.environ.get('VOICE_MAX_UPLOADS', 8))  # bodies being written at once
+    # forkserver starts pool processes clean instead of forking a threaded API worker;
+    # like spawn, it imports the entry script in them, which skips create_app() there
+    VOICE_POOL_START_METHOD = os.environ.get('VOICE_POOL_START_METHOD', 'forkserver')
+    VOICE_RECOGNIZER = os.environ.get('VOICE_RECOGNIZER', 'google')  # google, stub, or module:Class
+    VOICE_RECOGNIZER_TIMEOUT = float(os.environ.get('VOICE_RECOGNIZER_TIMEOUT', 30))
+    VOICE_STUB_TRANSCRIPT = os.environ.get('VOICE_STUB_TRANSCRIPT', 'I have had a fever and a headache since yesterday')
+    VOICE_STUB_CPU_MS = float(os.environ.get('VOICE_STUB_CPU_MS', 0))  # simulated work per second of audio
+    VOICE_MAX_WAIT = float(os.environ.get('VOICE_MAX_WAIT', 30))  # longest long-poll on /api/voice/<id>
+    
+    # Machine translation of responses (/api/translate)
+    TRANSLATION_ENABLED = env_bool('TRANSLATION_ENABLED', True)
+    TRANSLATION_BACKEND = os.environ.get('TRANSLATION_BACKEND', 'none')  # none, google, dictionary, stub, or module:Class
+    TRANSLATION_TIMEOUT = float(os.environ.get('TRANSLATION_TIMEOUT', 3))  # untranslated text is returned after this
+    TRANSLATION_BATCH_SIZE = int(os.environ.get('TRANSLATION_BATCH_SIZE', 64))  # sentences per backend call
+    TRANSLATION_BATCH_WAIT_MS = float(os.environ.get('TRANSLATION_BATCH_WAIT_MS', 10))
+    TRANSLATION_CONCURRENCY = int(os.environ.get('TRANSLATION_CONCURRENCY', 4))  # backend calls in flight per worker
+    TRANSLATION_CACHE_PATH = os.environ.get('TRANSLATION_CACHE_PATH')  # defaults to instance/translations.jsonl
+    TRANSLATION_CACHE_MAX_ENTRIES = int(os.environ.get('TRANSLATION_CACHE_MAX_ENTRIES', 100000))
+    TRANSLATION_DICTIONARY_PATH = os.environ.get('TRANSLATION_DICTIONARY_PATH')
+    TRANSLATION_STUB_LATENCY_MS = float(os.environ.get('TRANSLATION_STUB_LATENCY_MS', 0))
+    TRANSLATION_MAX_TEXTS = int(os.environ.get('TRANSLATION_MAX_TEXTS', 100))  # per /api/translate request
+    # Chat languages the LLM is prompted in English for, with the reply translated
+    TRANSLATION_LLM_LANGUAGES = [code.strip() for code in os.environ['TRANSLATION_LLM_LANGUAGES'].split(',')] \
+        if os.environ.get('TRANSLATION_LLM_LANGUAGES') else []
+    
+    # Cold chat messages and assessments moved to monthly archive files (flask archive-cold-rows)
+    ARCHIVE_ENABLED = env_bool('ARCHIVE_ENABLED', True)
+    ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR')  # defaults to instance/archive
+    # Whole months older than this are archived; keep it above the surveillance baseline
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 180))
+    ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 20000))  # rows per part file
+    ARCHIVE_RELOAD_INTERVAL = float(os.environ.get('ARCHIVE_RELOAD_INTERVAL', 30))  # seconds between catalog checks
+    ARCHIVE_CACHE_GROUPS = int(os.environ.get('ARCHIVE_CACHE_GROUPS', 256))  # decoded consultations/patients kept
+    
+    # Outbreak signals from sliding-window assessment counts (/api/surveillance)
+    SURVEILLANCE_ENABLED = env_bool('SURVEILLANCE_ENABLED', True)
+    SURVEILLANCE_BUCKET_MINUTES = int(os.environ.get('SURVEILLANCE_BUCKET_MINUTES', 60))
+    SURVEILLANCE_WINDOW_HOURS = int(os.environ.get('SURVEILLANCE_WINDOW_HOURS', 24))
+    SURVEILLANCE_BASELINE_DAYS = int(os.environ.get('SURVEILLANCE_BASELINE_DAYS', 14))
+    SURVEILLANCE_MIN_CASES = int(os.environ.get('SURVEILLANCE_MIN_CASES', 5))  # window cases needed to flag a spike
+    SURVEILLANCE_P_VALUE = float(os.environ.get('SURVEILLANCE_P_VALUE', 0.001))
+    SURVEILLANCE_SYNC_INTERVAL = float(os.environ.get('SURVEILLANCE_SYNC_INTERVAL', 5))  # seconds between DB tails
+    
+    # Request instrumentation exported at /metrics
+    METRICS_ENABLED = env_bool('METRICS_ENABLED', True)
+    METRICS_TRACE_SAMPLE_RATE = float(os.environ.get('METRICS_TRACE_SAMPLE_RATE', 0.01))  # requests with a query trace
+    METRICS_SLOW_REQUEST_MS = float(os.environ.get('METRICS_SLOW_REQUEST_MS', 1000))  # log traced requests this slow
+    
     # Ayushman Bharat Integration
     AYUSHMAN_BHARAT_API_URL = os.environ.get('AYUSHMAN_BHARAT_API_URL')
     AYUSHMAN_BHARAT_API_KEY = os.environ.get('AYUSHMAN_BHARAT_API_KEY')
@@ -22,6 +158,24 @@ class Config:
         'child_helpline': '1098'
     }
     
+    # Emergency dispatch. The dispatcher runs in every web worker unless
+    # EMERGENCY_DISPATCH_INLINE is false; then run `flask dispatch-emergencies`.
+    EMERGENCY_DISPATCH_INLINE = env_bool('EMERGENCY_DISPATCH_INLINE', True)
+    EMERGENCY_NOTIFIERS = [name.strip() for name in os.environ['EMERGENCY_NOTIFIERS'].split(',')] \
+        if os.environ.get('EMERGENCY_NOTIFIERS') else None  # default: every configured notifier
+    EMERGENCY_LOG_PATH = os.environ.get('EMERGENCY_LOG_PATH')  # JSON Lines; printed when unset
+    EMERGENCY_SMS_GATEWAY_URL = os.environ.get('EMERGENCY_SMS_GATEWAY_URL')
+    EMERGENCY_SMS_API_KEY = os.environ.get('EMERGENCY_SMS_API_KEY')
+    EMERGENCY_PROVIDER_WEBHOOK_URL = os.environ.get('EMERGENCY_PROVIDER_WEBHOOK_URL')
+    EMERGENCY_NOTIFY_PROVIDERS = int(os.environ.get('EMERGENCY_NOTIFY_PROVIDERS', 3))
+    EMERGENCY_NOTIFY_TIMEOUT = float(os.environ.get('EMERGENCY_NOTIFY_TIMEOUT', 5))
+    EMERGENCY_DISPATCH_WORKERS = int(os.environ.get('EMERGENCY_DISPATCH_WORKERS', 8))
+    EMERGENCY_POLL_INTERVAL = float(os.environ.get('EMERGENCY_POLL_INTERVAL', 1))
+    EMERGENCY_LEASE_SECONDS = float(os.environ.get('EMERGENCY_LEASE_SECONDS', 30))
+    EMERGENCY_MAX_ATTEMPTS = int(os.environ.get('EMERGENCY_MAX_ATTEMPTS', 8))
+    EMERGENCY_RETRY_BASE = float(os.environ.get('EMERGENCY_RETRY_BASE', 1))
+    EMERGENCY_RETRY_MAX = float(os.environ.get('EMERGENCY_RETRY_MAX', 60))
+    
     # Supported Languages
     SUPPORTED_LANGUAGES = {
         'en': 'English',
@@ -50,6 +204,16 @@ class DevelopmentConfig(Config):
 
 class ProductionConfig(Config):
     DEBUG = False
+    
+    # Sized for the default gunicorn.conf.py: 32 request threads plus the
+    # JOB_WORKERS background threads in each worker process. Waiting
+    # longer than DB_POOL_TIMEOUT for a connection fails the request instead
+    # of stacking up threads behind an exhausted pool.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 26))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+    DB_POOL_PRE_PING = env_bool('DB_POOL_PRE_PING', True)
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 15000))
 
 config = {
     'development': DevelopmentConfig,
@@ -8,13 +8,15 @@ CREATE TABLE IF NOT EXISTS patient (
     gender VARCHAR(10) NOT NULL,
     phone VARCHAR(20),
     location VARCHAR(100),
-    medical_conditions TEXT, -- JSON string
+    preferred_language VARCHAR(5) DEFAULT 'en',
+    medical_conditions JSON, -- list of condition names (JSONB on Postgres)
     medications TEXT,
     smoking VARCHAR(10),
     alcohol VARCHAR(10),
     exercise VARCHAR(20),
     pregnancy VARCHAR(10),
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP -- HTTP cache validator
 );
 
 -- Assessments table
@@ -24,16 +26,59 @@ CREATE TABLE IF NOT EXISTS assessment (
     primary_symptom VARCHAR(50) NOT NULL,
     symptom_onset VARCHAR(20) NOT NULL,
     symptom_severity VARCHAR(20) NOT NULL,
-    additional_symptoms TEXT, -- JSON string
+    additional_symptoms JSON, -- list of symptom codes (JSONB on Postgres)
     pain_description TEXT,
-    breathing_details TEXT, -- JSON string
-    emergency_symptoms TEXT, -- JSON string
+    breathing_details JSON, -- list of symptom codes
+    emergency_symptoms JSON, -- list of symptom codes
     triage_level VARCHAR(20) NOT NULL,
     ai_recommendations TEXT,
+    recommendation_status VARCHAR(10) DEFAULT 'pending', -- pending, ready, failed
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP, -- HTTP cache validator
+    FOREIGN KEY (patient_id) REFERENCES patient (id)
+);
+
+-- One row per reported symptom, for indexed symptom queries
+CREATE TABLE IF NOT EXISTS assessment_symptom (
+    assessment_id INTEGER NOT NULL,
+    kind VARCHAR(10) NOT NULL, -- additional, breathing, emergency
+    symptom VARCHAR(50) NOT NULL,
+    PRIMARY KEY (assessment_id, kind, symptom),
+    FOREIGN KEY (assessment_id) REFERENCES assessment (id)
+);
+
+-- Consultations table
+CREATE TABLE IF NOT EXISTS consultation (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    patient_id INTEGER NOT NULL,
+    consultation_type VARCHAR(20) DEFAULT 'basic', -- basic, premium, emergency
+    cost REAL NOT NULL,
+    language VARCHAR(5) DEFAULT 'en',
+    audio_enabled BOOLEAN DEFAULT 0,
+    video_enabled BOOLEAN DEFAULT 0,
+    is_emergency BOOLEAN DEFAULT 0,
+    status VARCHAR(20) DEFAULT 'active', -- active, completed, cancelled
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    completed_at DATETIME,
+    summary TEXT, -- rolling summary of messages up to summary_through_id, for chat prompts
+    summary_tokens INTEGER,
+    summary_through_id INTEGER,
     FOREIGN KEY (patient_id) REFERENCES patient (id)
 );
 
+-- Chat messages table
+CREATE TABLE IF NOT EXISTS chat_message (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    consultation_id INTEGER NOT NULL,
+    sender VARCHAR(10) NOT NULL, -- user, doctor, system
+    content TEXT NOT NULL,
+    language VARCHAR(5) DEFAULT 'en',
+    audio_url VARCHAR(255),
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    token_count INTEGER, -- estimated prompt tokens, set when saved
+    FOREIGN KEY (consultation_id) REFERENCES consultation (id)
+);
+
 -- Healthcare providers table
 CREATE TABLE IF NOT EXISTS healthcare_provider (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -43,7 +88,77 @@ CREATE TABLE IF NOT EXISTS healthcare_provider (
     phone VARCHAR(20),
     email VARCHAR(100),
     availability VARCHAR(50),
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    latitude REAL,
+    longitude REAL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Running totals behind /api/stats, kept in step with the rows they count
+CREATE TABLE IF NOT EXISTS stat_counter (
+    name VARCHAR(50) PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+
+-- Emergency alerts, appended by /api/emergency
+CREATE TABLE IF NOT EXISTS emergency_event (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    patient_id INTEGER,
+    symptoms JSON, -- list of symptom codes
+    location VARCHAR(100),
+    latitude REAL,
+    longitude REAL,
+    planned BOOLEAN NOT NULL DEFAULT 0, -- deliveries created
+    plan_error VARCHAR(255), -- set when the dispatcher gave up planning the event
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (patient_id) REFERENCES patient (id)
+);
+
+-- One notification per event and notifier target, worked off by the dispatcher
+CREATE TABLE IF NOT EXISTS emergency_delivery (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_id INTEGER NOT NULL,
+    notifier VARCHAR(30) NOT NULL,
+    target JSON,
+    status VARCHAR(10) NOT NULL DEFAULT 'pending', -- pending, sending, sent, failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_error VARCHAR(255),
+    delivered_at DATETIME,
+    FOREIGN KEY (event_id) REFERENCES emergency_event (id)
+);
+
+-- Uploaded voice recordings on their way through transcription into the chat
+CREATE TABLE IF NOT EXISTS voice_message (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    consultation_id INTEGER NOT NULL,
+    language VARCHAR(5) DEFAULT 'en',
+    audio_path VARCHAR(255) NOT NULL,
+    size_bytes INTEGER,
+    duration_seconds REAL,
+    status VARCHAR(12) NOT NULL DEFAULT 'processing', -- processing, replying, done, failed
+    transcript TEXT,
+    reply TEXT,
+    chat_message_id INTEGER,
+    error VARCHAR(255),
+    timings JSON, -- seconds per stage: upload, queue, transcode, transcribe, reply, total
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    completed_at DATETIME,
+    FOREIGN KEY (consultation_id) REFERENCES consultation (id),
+    FOREIGN KEY (chat_message_id) REFERENCES chat_message (id)
+);
+
+-- Chat messages waiting on the AI reply from a background job
+CREATE TABLE IF NOT EXISTS chat_reply (
+    id VARCHAR(32) PRIMARY KEY,
+    consultation_id INTEGER,
+    language VARCHAR(5) DEFAULT 'en',
+    message TEXT NOT NULL,
+    status VARCHAR(10) NOT NULL DEFAULT 'pending', -- pending, done, failed
+    reply TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    completed_at DATETIME,
+    FOREIGN KEY (consultation_id) REFERENCES consultation (id)
 );
 
 -- Indexes for better performance
@@ -51,13 +166,24 @@ CREATE INDEX IF NOT EXISTS idx_patient_phone ON patient(phone);
 CREATE INDEX IF NOT EXISTS idx_assessment_patient_id ON assessment(patient_id);
 CREATE INDEX IF NOT EXISTS idx_assessment_triage_level ON assessment(triage_level);
 CREATE INDEX IF NOT EXISTS idx_assessment_created_at ON assessment(created_at);
+CREATE INDEX IF NOT EXISTS idx_assessment_patient_created ON assessment(patient_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_assessment_patient_updated ON assessment(patient_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_assessment_symptom_kind_symptom ON assessment_symptom(kind, symptom, assessment_id);
+CREATE INDEX IF NOT EXISTS idx_consultation_patient_created ON consultation(patient_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_chat_message_consultation_timestamp ON chat_message(consultation_id, timestamp, id);
+CREATE INDEX IF NOT EXISTS idx_chat_message_consultation_id ON chat_message(consultation_id, id);
+CREATE INDEX IF NOT EXISTS idx_voice_message_chat_message_id ON voice_message(chat_message_id);
+CREATE INDEX IF NOT EXISTS idx_emergency_event_planned ON emergency_event(planned, id);
+CREATE INDEX IF NOT EXISTS idx_emergency_event_patient_created ON emergency_event(patient_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_emergency_delivery_due ON emergency_delivery(status, next_attempt_at);
 CREATE INDEX IF NOT EXISTS idx_provider_location ON healthcare_provider(location);
 CREATE INDEX IF NOT EXISTS idx_provider_specialization ON healthcare_provider(specialization);
+CREATE INDEX IF NOT EXISTS idx_provider_lat_lng ON healthcare_provider(latitude, longitude);
 
 -- Sample data for healthcare providers
-INSERT OR IGNORE INTO healthcare_provider (name, specialization, location, phone, email, availability) VALUES
-('Dr. Rajesh Kumar', 'General Medicine', 'Rural Health Center, Rajasthan', '+91-9876543210', 'dr.rajesh@rhc.gov.in', 'Mon-Fri 9AM-5PM'),
-('Dr. Priya Sharma', 'Pediatrics', 'Community Health Center, Uttar Pradesh', '+91-9876543211', 'dr.priya@chc.gov.in', 'Mon-Sat 10AM-4PM'),
-('Dr. Amit Patel', 'Emergency Medicine', 'District Hospital, Gujarat', '+91-9876543212', 'dr.amit@dh.gov.in', '24/7'),
-('Dr. Sunita Reddy', 'Gynecology', 'Primary Health Center, Andhra Pradesh', '+91-9876543213', 'dr.sunita@phc.gov.in', 'Mon-Fri 10AM-3PM'),
-('Dr. Vikram Singh', 'Orthopedics', 'Sub District Hospital, Punjab', '+91-9876543214', 'dr.vikram@sdh.gov.in', 'Tue-Sat 11AM-4PM');
+INSERT OR IGNORE INTO healthcare_provider (name, specialization, location, phone, email, availability, latitude, longitude) VALUES
+('Dr. Rajesh Kumar', 'General Medicine', 'Rural Health Center, Rajasthan', '+91-9876543210', 'dr.rajesh@rhc.gov.in', 'Mon-Fri 9AM-5PM', 26.9124, 75.7873),
+('Dr. Priya Sharma', 'Pediatrics', 'Community Health Center, Uttar Pradesh', '+91-9876543211', 'dr.priya@chc.gov.in', 'Mon-Sat 10AM-4PM', 26.8467, 80.9462),
+('Dr. Amit Patel', 'Emergency Medicine', 'District Hospital, Gujarat', '+91-9876543212', 'dr.amit@dh.gov.in', '24/7', 23.0225, 72.5714),
+('Dr. Sunita Reddy', 'Gynecology', 'Primary Health Center, Andhra Pradesh', '+91-9876543213', 'dr.sunita@phc.gov.in', 'Mon-Fri 10AM-3PM', 16.5062, 80.6480),
+('Dr. Vikram Singh', 'Orthopedics', 'Sub District Hospital, Punjab', '+91-9876543214', 'dr.vikram@sdh.gov.in', 'Tue-Sat 11AM-4PM', 30.9010, 75.8573);
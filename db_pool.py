@@ -0,0 +1,143 @@
+"""Database engine tuning and connection pool metrics.
+
+``engine_options`` turns the DB_* and SQLITE_* settings into SQLAlchemy
+engine options for the configured backend. Postgres gets a sized QueuePool
+with pre-ping, recycling and a server-side statement timeout. File-backed
+SQLite gets WAL journaling and a busy timeout on every new connection, so
+concurrent writers queue for the lock instead of failing with "database is
+locked".
+
+``DatabasePool`` instruments the engine's pool and reports checkouts,
+connections currently checked out, and how long requests waited for one.
+"""
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited for a connection"""
+
+    metrics = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self.metrics is not None:
+                self.metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        if self.metrics is not None:
+            self.metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep reporting to the same place
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def is_memory_sqlite(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(config):
+    """SQLAlchemy engine options for the configured database URL"""
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if is_memory_sqlite(url):
+        # One shared connection; Flask-SQLAlchemy picks the pool for this case
+        return {}
+
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING']
+    }
+    if url.get_backend_name() == 'postgresql' and config['DB_STATEMENT_TIMEOUT_MS']:
+        options['connect_args'] = {'options': f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"}
+    return options
+
+
+class DatabasePool:
+    def __init__(self, app=None):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidated = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.engine = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        db = app.extensions['sqlalchemy']
+        with app.app_context():
+            self.engine = db.engine
+        if self.engine.dialect.name == 'sqlite' and not is_memory_sqlite(self.engine.url):
+            self._configure_sqlite(app.config['SQLITE_WAL'], app.config['SQLITE_BUSY_TIMEOUT_MS'])
+
+        if isinstance(self.engine.pool, TimedQueuePool):
+            self.engine.pool.metrics = self
+        event.listen(self.engine, 'connect', self._on_connect)
+        event.listen(self.engine, 'invalidate', self._on_invalidate)
+        app.extensions['db_pool'] = self
+
+    def _configure_sqlite(self, wal, busy_timeout_ms):
+        @event.listens_for(self.engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            # busy_timeout first: switching to WAL itself needs the lock
+            cursor.execute(f'PRAGMA busy_timeout = {int(busy_timeout_ms)}')
+            if wal:
+                cursor.execute('PRAGMA journal_mode = WAL')
+                # Durable at each checkpoint rather than each commit; safe in WAL mode
+                cursor.execute('PRAGMA synchronous = NORMAL')
+            cursor.close()
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidated += 1
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def stats(self):
+        pool = self.engine.pool
+        stats = {
+            'pool': type(pool).__name__,
+            'connects': self.connects,
+            'invalidated': self.invalidated
+        }
+        if isinstance(pool, QueuePool):
+            stats.update({
+                'size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'checked_in': pool.checkedin(),
+                'overflow': max(pool.overflow(), 0),
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_ms_avg': round(self.wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'wait_ms_max': round(self.max_wait_seconds * 1000, 3)
+            })
+        return stats
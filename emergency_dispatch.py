@@ -0,0 +1,334 @@
+"""Durable, at-least-once fan-out of emergency alerts to notifiers.
+
+/api/emergency only appends an ``emergency_event`` row and wakes the
+dispatcher, so the request returns as soon as the row is committed. The
+dispatcher then works from the database, which makes the database the queue:
+
+1. plan: each new event is expanded into one ``emergency_delivery`` row per
+   notifier target (the nearest providers, a log line, ...);
+2. claim: due deliveries are leased with a conditional UPDATE, so several
+   worker processes can dispatch without sending the same row twice at once;
+3. send: claimed deliveries run concurrently on a thread pool. A failure is
+   retried with exponential backoff and jitter, up to
+   EMERGENCY_MAX_ATTEMPTS.
+
+A process that dies mid-send leaves its lease to expire, and the delivery is
+sent again. Delivery is at-least-once, so notifiers must tolerate repeats.
+
+Notifiers are pluggable: subclass ``Notifier`` and pass it to
+``EmergencyDispatcher.register_notifier``; EMERGENCY_NOTIFIERS picks which
+registered notifiers are used.
+"""
+import collections
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+class Notifier:
+    name = None
+
+    def targets(self, event, providers):
+        """Delivery targets for an event; one delivery is created per target"""
+        return [{}]
+
+    def send(self, event, target):
+        """Deliver the alert; raise to have it retried"""
+        raise NotImplementedError
+
+
+def alert_text(event):
+    symptoms = ', '.join(event['symptoms']) or 'not given'
+    place = event['location'] or (
+        f"{event['latitude']:.4f}, {event['longitude']:.4f}" if event['latitude'] is not None else 'unknown'
+    )
+    return (f"EMERGENCY: patient {event['patient_id'] or 'unknown'} needs help. "
+            f"Symptoms: {symptoms}. Location: {place}. Ambulance: {event['emergency_number']}")
+
+
+class LogNotifier(Notifier):
+    """Append each alert to a JSON Lines file, or print it when no path is set"""
+
+    name = 'log'
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, event, target):
+        if not self.path:
+            print(f"EMERGENCY ALERT: {alert_text(event)}")
+            return
+        line = json.dumps({**event, 'logged_at': time.time()}, ensure_ascii=False)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+
+class SMSNotifier(Notifier):
+    """Text the nearest providers through an HTTP SMS gateway"""
+
+    name = 'sms'
+
+    def __init__(self, url, api_key=None, timeout=5.0):
+        self.url = url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def targets(self, event, providers):
+        return [{'provider_id': provider['id'], 'phone': provider['phone']}
+                for provider in providers if provider.get('phone')]
+
+    def send(self, event, target):
+        headers = {'Authorization': f'Bearer {self.api_key}'} if self.api_key else {}
+        response = self.session.post(self.url, json={
+            'to': target['phone'],
+            'message': alert_text(event),
+            'reference': f"emergency-{event['id']}-{target['provider_id']}"
+        }, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+
+
+class ProviderWebhookNotifier(Notifier):
+    """POST the alert to a provider-facing webhook, once per nearby provider"""
+
+    name = 'provider_webhook'
+
+    def __init__(self, url, timeout=5.0):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def targets(self, event, providers):
+        return [{'provider_id': provider['id'], 'distance_km': provider.get('distance_km')}
+                for provider in providers]
+
+    def send(self, event, target):
+        response = self.session.post(self.url, json={
+            'event': event,
+            'provider_id': target['provider_id'],
+            'distance_km': target['distance_km']
+        }, headers={'Idempotency-Key': f"emergency-{event['id']}-{target['provider_id']}"},
+            timeout=self.timeout)
+        response.raise_for_status()
+
+
+def backoff_seconds(attempt, base, maximum):
+    """Delay before retry ``attempt`` (1-based): exponential with +/-25% jitter"""
+    delay = min(maximum, base * 2 ** (attempt - 1))
+    return delay * random.uniform(0.75, 1.25)
+
+
+class EmergencyDispatcher:
+    """Background loop that plans, claims and sends emergency deliveries
+
+    ``outbox`` does the database work: ``plan(notifiers, skip)`` (returns
+    ``{event_id: error}`` for events it could not plan), ``give_up(event_id, error)``,
+    ``claim(limit, lease_seconds)``, ``mark_sent(delivery)``,
+    ``mark_retry(delivery, error, delay)`` and ``mark_failed(delivery, error)``.
+
+    An event that fails to plan is retried with the same backoff as a
+    delivery; meanwhile it is skipped, so other events and due deliveries
+    keep flowing. After EMERGENCY_MAX_ATTEMPTS it is given up: the outbox
+    records it as failed, with the error, rather than as planned.
+    """
+
+    def __init__(self, outbox, app=None):
+        self.outbox = outbox
+        self.app = None
+        self.notifiers = {}
+        self.enabled_notifiers = {}
+        self.enabled_names = None
+        self.inline = True
+        self.workers = 8
+        self.poll_interval = 1.0
+        self.lease_seconds = 30.0
+        self.max_attempts = 8
+        self.retry_base = 1.0
+        self.retry_max = 60.0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.plan_failures = 0
+        self.events_failed = 0
+        self._plan_retries = {}
+        self._latencies = collections.deque(maxlen=1000)
+        self._in_flight = 0
+        self._executor = None
+        self._thread = None
+        self._pid = None
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.inline = app.config.get('EMERGENCY_DISPATCH_INLINE', self.inline)
+        self.enabled_names = app.config.get('EMERGENCY_NOTIFIERS')
+        self.workers = app.config.get('EMERGENCY_DISPATCH_WORKERS', self.workers)
+        self.poll_interval = app.config.get('EMERGENCY_POLL_INTERVAL', self.poll_interval)
+        self.lease_seconds = app.config.get('EMERGENCY_LEASE_SECONDS', self.lease_seconds)
+        self.max_attempts = app.config.get('EMERGENCY_MAX_ATTEMPTS', self.max_attempts)
+        self.retry_base = app.config.get('EMERGENCY_RETRY_BASE', self.retry_base)
+        self.retry_max = app.config.get('EMERGENCY_RETRY_MAX', self.retry_max)
+
+        self.register_notifier(LogNotifier(app.config.get('EMERGENCY_LOG_PATH')))
+        if app.config.get('EMERGENCY_SMS_GATEWAY_URL'):
+            self.register_notifier(SMSNotifier(
+                app.config['EMERGENCY_SMS_GATEWAY_URL'], app.config.get('EMERGENCY_SMS_API_KEY'),
+                timeout=app.config.get('EMERGENCY_NOTIFY_TIMEOUT', 5.0)
+            ))
+        if app.config.get('EMERGENCY_PROVIDER_WEBHOOK_URL'):
+            self.register_notifier(ProviderWebhookNotifier(
+                app.config['EMERGENCY_PROVIDER_WEBHOOK_URL'],
+                timeout=app.config.get('EMERGENCY_NOTIFY_TIMEOUT', 5.0)
+            ))
+        app.extensions['emergency_dispatcher'] = self
+
+    def register_notifier(self, notifier):
+        self.notifiers[notifier.name] = notifier
+        self._select_notifiers()
+
+    def _select_notifiers(self):
+        self.enabled_notifiers = {
+            name: notifier for name, notifier in self.notifiers.items()
+            if self.enabled_names is None or name in self.enabled_names
+        }
+
+    def start(self):
+        """Start the dispatch loop in this process if it is not running"""
+        with self._lock:
+            # Restart after a fork; threads do not survive into gunicorn workers
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='emergency')
+            self._in_flight = 0
+            self._thread = threading.Thread(target=self._run, name='emergency-dispatcher', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def wake(self):
+        """Have the loop look for work now instead of at its next poll"""
+        if self.inline:
+            self.start()
+        self._wakeup.set()
+
+    def run_forever(self):
+        """Dispatch from this process until it is stopped (for a standalone dispatcher)"""
+        self.start()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                with self.app.app_context():
+                    self.dispatch_once()
+            except Exception as e:
+                print(f"Emergency dispatch error: {e}")
+            self._wakeup.wait(self.poll_interval)
+
+    def dispatch_once(self):
+        """Plan new events and start sending whatever deliveries are due"""
+        now = time.monotonic()
+        backing_off = [event_id for event_id, (_, retry_at) in self._plan_retries.items() if retry_at > now]
+        try:
+            failures = self.outbox.plan(self.enabled_notifiers, skip=backing_off)
+        except Exception as e:
+            # Planning must never stop due deliveries from going out
+            print(f"Emergency planning error: {e}")
+            failures = {}
+        self._plan_failed(failures, now)
+        with self._lock:
+            free = self.workers - self._in_flight
+        if free <= 0:
+            return 0
+        deliveries = self.outbox.claim(free, self.lease_seconds)
+        for delivery in deliveries:
+            with self._lock:
+                self._in_flight += 1
+            self._executor.submit(self._deliver, delivery)
+        return len(deliveries)
+
+    def _plan_failed(self, failures, now):
+        for event_id, error in failures.items():
+            attempts = self._plan_retries.get(event_id, (0, 0))[0] + 1
+            self._count('plan_failures')
+            if attempts >= self.max_attempts:
+                self._plan_retries.pop(event_id, None)
+                self._count('events_failed')
+                print(f"EMERGENCY EVENT {event_id} COULD NOT BE PLANNED, NOBODY WAS NOTIFIED: {error}")
+                try:
+                    self.outbox.give_up(event_id, error)
+                except Exception as e:
+                    print(f"Emergency event {event_id} give-up error: {e}")
+            else:
+                self._plan_retries[event_id] = (
+                    attempts, now + backoff_seconds(attempts, self.retry_base, self.retry_max)
+                )
+                print(f"Emergency event {event_id} planning failed (attempt {attempts}): {error}")
+
+    def _deliver(self, delivery):
+        try:
+            with self.app.app_context():
+                self._send(delivery)
+        except Exception as e:
+            print(f"Emergency delivery {delivery['id']} bookkeeping error: {e}")
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            # A slot is free; pick up anything that queued behind this send
+            self._wakeup.set()
+
+    def _send(self, delivery):
+        notifier = self.notifiers.get(delivery['notifier'])
+        try:
+            if notifier is None:
+                raise LookupError(f"No notifier named {delivery['notifier']!r}")
+            notifier.send(delivery['event'], delivery['target'])
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'[:255]
+            if delivery['attempts'] >= self.max_attempts:
+                self.outbox.mark_failed(delivery, error)
+                self._count('failed')
+                print(f"Emergency delivery {delivery['id']} ({delivery['notifier']}) failed: {error}")
+            else:
+                self.outbox.mark_retry(delivery, error,
+                                       backoff_seconds(delivery['attempts'], self.retry_base, self.retry_max))
+                self._count('retried')
+            return
+
+        self.outbox.mark_sent(delivery)
+        self._count('sent')
+        with self._lock:
+            self._latencies.append(time.time() - delivery['created_at_epoch'])
+
+    def _count(self, attr):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            in_flight = self._in_flight
+        return {
+            'notifiers': sorted(self.enabled_notifiers),
+            'running': self._thread is not None and self._thread.is_alive() and self._pid == os.getpid(),
+            'in_flight': in_flight,
+            'sent': self.sent,
+            'retried': self.retried,
+            'failed': self.failed,
+            'plan_failures': self.plan_failures,
+            'events_failed': self.events_failed,
+            'events_backing_off': len(self._plan_retries),
+            'latency_ms_p50': round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+            'latency_ms_p95': round(latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000, 1)
+            if latencies else None,
+            'latency_ms_max': round(latencies[-1] * 1000, 1) if latencies else None
+        }
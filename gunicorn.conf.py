@@ -0,0 +1,18 @@
+import os
+
+# LLM calls run on the shared LLMClient loop. A chat request's thread blocks on
+# the result for up to LLM_TIMEOUT, but waits rather than using CPU. Threaded workers
+# let a few processes serve many concurrent chats while LLM_MAX_CONCURRENCY
+# caps how many calls actually reach the API.
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+
+
+def post_worker_init(worker):
+    # Each worker dispatches emergency alerts; they share the queue through the database
+    dispatcher = worker.wsgi.extensions.get('emergency_dispatcher')
+    if dispatcher is not None and dispatcher.inline:
+        dispatcher.start()
@@ -0,0 +1,146 @@
+"""Conditional GETs and a server-side cache for read endpoints.
+
+A cached endpoint supplies a cheap *validator*, usually an ``updated_at``
+stamp read with one indexed query, and a function that builds the full
+response. The ETag is derived from the validator, so:
+
+* a client that sends a matching If-None-Match (or an If-Modified-Since
+  no older than the stamp) gets a bodiless 304 without the response being
+  built;
+* other clients get the serialized body from the cache when it was built
+  for the same ETag, and the endpoint's full queries run only on a miss.
+
+HTTP dates have whole seconds, so Last-Modified cannot tell apart two
+writes in the same second; the ETag, which carries the full stamp, can. A
+resource stamped in the current second is therefore sent without
+Last-Modified, and If-Modified-Since is not honoured for it; only a
+matching ETag gets a 304 until the second is over.
+
+Writers call ``invalidate(key)`` so stale bodies are dropped right away.
+Because every lookup is checked against the current validator, an entry
+missed by invalidation (another worker's memory cache, a CLI write) is
+never served; it only costs a rebuild.
+"""
+import hashlib
+import threading
+from datetime import datetime, timezone
+
+from flask import current_app, request
+
+from response_cache import LRUCacheBackend, RedisCacheBackend
+
+
+class HTTPCache:
+    def __init__(self, app=None):
+        self.enabled = True
+        self.ttl = 3600
+        self.backend = LRUCacheBackend()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('HTTP_CACHE_ENABLED', True)
+        self.ttl = app.config.get('HTTP_CACHE_TTL', self.ttl)
+        if app.config.get('HTTP_CACHE_BACKEND', 'memory') == 'redis':
+            self.backend = RedisCacheBackend(app.config['HTTP_CACHE_REDIS_URL'], prefix='http-cache:')
+        else:
+            self.backend = LRUCacheBackend(app.config.get('HTTP_CACHE_MAX_ENTRIES', 4096))
+        app.extensions['http_cache'] = self
+
+    def _count(self, attr):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    @staticmethod
+    def etag(key, validator):
+        return hashlib.sha256(f'{key}|{validator}'.encode('utf-8')).hexdigest()[:32]
+
+    @staticmethod
+    def _is_not_modified(etag, last_modified):
+        if request.if_none_match:
+            # If-None-Match wins over If-Modified-Since when both are sent
+            return request.if_none_match.contains(etag)
+        if last_modified is not None and request.if_modified_since is not None:
+            return last_modified <= request.if_modified_since
+        return False
+
+    def _lookup(self, key, etag):
+        if not self.enabled:
+            return None
+        try:
+            stored = self.backend.get(key)
+        except Exception as e:
+            print(f"HTTP cache read error: {e}")
+            return None
+        if stored is None:
+            return None
+        stored_etag, _, body = stored.partition('\n')
+        return body if stored_etag == etag else None
+
+    def _store(self, key, etag, body):
+        if not self.enabled:
+            return
+        try:
+            self.backend.set(key, f'{etag}\n{body}', self.ttl)
+        except Exception as e:
+            print(f"HTTP cache write error: {e}")
+
+    def respond(self, key, validator, build, last_modified=None, public=False):
+        """JSON response for ``build()``, a 304 or a cached body, depending on ``validator``"""
+        etag = self.etag(key, validator)
+        if last_modified is not None:
+            # HTTP dates have whole seconds; stamps are naive UTC. Another write
+            # may still land in the stamp's second, so it is not a validator yet
+            last_modified = last_modified.replace(microsecond=0)
+            if last_modified >= datetime.utcnow().replace(microsecond=0):
+                last_modified = None
+            else:
+                last_modified = last_modified.replace(tzinfo=timezone.utc)
+
+        if self._is_not_modified(etag, last_modified):
+            self._count('not_modified')
+            response = current_app.response_class(status=304)
+        else:
+            body = self._lookup(key, etag)
+            if body is None:
+                self._count('misses')
+                body = current_app.json.dumps(build())
+                self._store(key, etag, body)
+            else:
+                self._count('hits')
+            response = current_app.response_class(body, mimetype='application/json')
+
+        response.set_etag(etag)
+        if last_modified is not None:
+            response.last_modified = last_modified
+        # Clients may keep the body but must revalidate before reusing it
+        response.cache_control.no_cache = True
+        if public:
+            response.cache_control.public = True
+        else:
+            response.cache_control.private = True
+        return response
+
+    def invalidate(self, key):
+        try:
+            self.backend.delete(key)
+        except Exception as e:
+            print(f"HTTP cache delete error: {e}")
+        self._count('invalidations')
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'entries': len(self.backend) if hasattr(self.backend, '__len__') else None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'invalidations': self.invalidations,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+        }
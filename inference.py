@@ -0,0 +1,336 @@
+"""Chat inference backends with hedging to a local engine and a circuit breaker.
+
+``InferenceRouter`` sends each chat prompt to the remote LLM and falls back
+to a local, CPU-only backend when the remote one is slow or failing:
+
+* if no reply has arrived after LLM_HEDGE_AFTER seconds it asks the local
+  backend, and answers from it when it has a confident match;
+* an error or timeout is answered from the local backend when it can be;
+* after LLM_BREAKER_FAILURES consecutive failures the circuit opens and
+  requests skip the remote call for LLM_BREAKER_RESET seconds. Then one
+  trial request decides whether to close it again.
+
+Local backends implement ``InferenceBackend.generate`` and are picked by
+name with LOCAL_INFERENCE_BACKEND. The shipped one, ``AnswerBankBackend``,
+returns the doctor's reply to the most similar earlier patient message.
+"""
+import math
+import re
+import threading
+import time
+from concurrent.futures import wait
+
+from keyword_matcher import normalize_text
+
+# Split on whitespace and punctuation only; \W would also split Indic words
+# at their vowel signs
+TOKEN_SPLIT = re.compile(r"[\s!\"#$%&'()*+,\-./:;<=>?@\[\\\]^_`{|}~।॥“”‘’]+")
+
+
+def tokenize(text):
+    return [token for token in TOKEN_SPLIT.split(normalize_text(text or '')) if token]
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose circuit is open"""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.trips = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go ahead; in half-open state only one trial call may"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def _open(self):
+        if self.state != 'open':
+            self.trips += 1
+        self.state = 'open'
+        self._opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self._open()
+
+    def record_abandoned(self):
+        """A call was given up before it finished; a trial that slow reopens the circuit"""
+        with self._lock:
+            if self.state == 'half_open':
+                self._open()
+
+    def stats(self):
+        return {'state': self.state, 'consecutive_failures': self.failures, 'trips': self.trips}
+
+
+class InferenceBackend:
+    name = None
+
+    def generate(self, message, patient_data, language='en'):
+        """Reply text for a patient message, or None when there is no good answer"""
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+
+class RemoteLLMBackend(InferenceBackend):
+    """The shared LLMClient, with prompts built by ``build_messages``"""
+
+    name = 'remote'
+
+    def __init__(self, llm_client, build_messages, max_tokens=500, temperature=0.7):
+        self.llm_client = llm_client
+        self.build_messages = build_messages
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+
+    @property
+    def timeout(self):
+        return self.llm_client.default_timeout
+
+    def submit(self, message, patient_data, language='en'):
+        return self.llm_client.submit(
+            self.build_messages(message, patient_data, language),
+            max_tokens=self.max_tokens, temperature=self.temperature
+        )
+
+    def generate(self, message, patient_data, language='en'):
+        return self.llm_client.complete(
+            self.build_messages(message, patient_data, language),
+            max_tokens=self.max_tokens, temperature=self.temperature
+        )
+
+    def stream(self, message, patient_data, language='en'):
+        return self.llm_client.stream(
+            self.build_messages(message, patient_data, language),
+            max_tokens=self.max_tokens, temperature=self.temperature
+        )
+
+
+class _AnswerIndex:
+    """Inverted index over past patient messages, scored by IDF-weighted cosine"""
+
+    def __init__(self, pairs):
+        self.answers = []
+        self.postings = {}
+        questions = []
+        for language, question, answer in pairs:
+            tokens = set(tokenize(question))
+            if not tokens or not answer:
+                continue
+            answer_id = len(self.answers)
+            self.answers.append(answer)
+            questions.append(tokens)
+            for token in tokens:
+                self.postings.setdefault((language, token), []).append(answer_id)
+
+        document_frequency = {}
+        for tokens in questions:
+            for token in tokens:
+                document_frequency[token] = document_frequency.get(token, 0) + 1
+        count = len(questions)
+        self.idf = {token: math.log((1 + count) / (1 + n)) + 1 for token, n in document_frequency.items()}
+        # Weight for words never seen in a question
+        self.unseen_idf = math.log(1 + count) + 1
+        self.norms = [math.sqrt(sum(self.idf[token] ** 2 for token in tokens)) for tokens in questions]
+
+    def __len__(self):
+        return len(self.answers)
+
+    def best(self, text, language):
+        """(answer, similarity) for the closest question in the same language"""
+        tokens = set(tokenize(text))
+        if not tokens:
+            return None, 0.0
+        query_norm = math.sqrt(sum(self.idf.get(token, self.unseen_idf) ** 2 for token in tokens))
+
+        scores = {}
+        for token in tokens:
+            weight = self.idf.get(token)
+            if weight is None:
+                continue
+            for answer_id in self.postings.get((language, token), ()):
+                scores[answer_id] = scores.get(answer_id, 0.0) + weight * weight
+        if not scores:
+            return None, 0.0
+
+        answer_id = max(scores, key=lambda candidate: scores[candidate] / self.norms[candidate])
+        return self.answers[answer_id], scores[answer_id] / (self.norms[answer_id] * query_norm)
+
+
+class AnswerBankBackend(InferenceBackend):
+    """Retrieval over earlier doctor replies; CPU-only and needs no network
+
+    ``load_pairs(limit)`` returns recent (language, patient message, reply)
+    tuples. The index is rebuilt from it every ANSWER_BANK_TTL seconds.
+    """
+
+    name = 'answer_bank'
+
+    def __init__(self, load_pairs, app=None):
+        self.load_pairs = load_pairs
+        self.ttl = 600
+        self.max_pairs = 20000
+        self.min_score = 0.5
+        self.hits = 0
+        self.misses = 0
+        self._index = None
+        self._built_at = 0.0
+        self._rebuild_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('ANSWER_BANK_TTL', self.ttl)
+        self.max_pairs = app.config.get('ANSWER_BANK_MAX_PAIRS', self.max_pairs)
+        self.min_score = app.config.get('ANSWER_BANK_MIN_SCORE', self.min_score)
+        self._index = None
+
+    def refresh(self):
+        """Rebuild the index if it is missing or past its TTL"""
+        if self._index is not None and time.monotonic() - self._built_at <= self.ttl:
+            return self._index
+        with self._rebuild_lock:
+            if self._index is None or time.monotonic() - self._built_at > self.ttl:
+                self._index = _AnswerIndex(self.load_pairs(self.max_pairs))
+                self._built_at = time.monotonic()
+        return self._index
+
+    def generate(self, message, patient_data, language='en'):
+        answer, score = self.refresh().best(message, language)
+        if answer is None or score < self.min_score:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return answer
+
+    def stats(self):
+        index = self._index
+        return {'answers': len(index) if index else 0, 'hits': self.hits, 'misses': self.misses}
+
+
+class InferenceRouter:
+    def __init__(self, remote, local_backends=(), app=None):
+        self.remote = remote
+        self.local_backends = {backend.name: backend for backend in local_backends}
+        self.local = None
+        self.hedge_after = 4.0
+        self.breaker = CircuitBreaker()
+        self.counts = {'remote': 0, 'hedged': 0, 'local': 0, 'unanswered': 0, 'remote_failures': 0}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.hedge_after = app.config.get('LLM_HEDGE_AFTER', self.hedge_after)
+        self.breaker = CircuitBreaker(
+            app.config.get('LLM_BREAKER_FAILURES', 5), app.config.get('LLM_BREAKER_RESET', 30.0)
+        )
+        name = app.config.get('LOCAL_INFERENCE_BACKEND', 'none')
+        if name != 'none' and name not in self.local_backends:
+            raise ValueError(f'Unknown LOCAL_INFERENCE_BACKEND: {name}')
+        self.local = self.local_backends.get(name)
+        if hasattr(self.local, 'init_app'):
+            self.local.init_app(app)
+        app.extensions['inference_router'] = self
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _local_generate(self, message, patient_data, language):
+        try:
+            return self.local.generate(message, patient_data, language)
+        except Exception as e:
+            print(f"Local inference error: {e}")
+            return None
+
+    def local_reply(self, message, patient_data, language='en'):
+        """Answer from the local backend, or None"""
+        reply = self._local_generate(message, patient_data, language) if self.local else None
+        self._count('local' if reply is not None else 'unanswered')
+        return reply
+
+    def _remote_failed(self, error):
+        self.breaker.record_failure()
+        self._count('remote_failures')
+        print(f"Remote inference failed: {error}")
+
+    def generate(self, message, patient_data, language='en'):
+        """Reply text from the remote or local backend, or None if neither has one"""
+        if not self.breaker.allow():
+            return self.local_reply(message, patient_data, language)
+
+        timeout = self.remote.timeout
+        started = time.monotonic()
+        try:
+            future = self.remote.submit(message, patient_data, language)
+            if self.local is not None and 0 < self.hedge_after < timeout:
+                wait([future], timeout=self.hedge_after)
+                if not future.done():
+                    reply = self._local_generate(message, patient_data, language)
+                    if reply is not None:
+                        future.cancel()
+                        self.breaker.record_abandoned()
+                        self._count('hedged')
+                        return reply
+            reply = self.remote.llm_client.result(future, max(timeout - (time.monotonic() - started), 0.01))
+        except Exception as e:
+            self._remote_failed(e)
+            return self.local_reply(message, patient_data, language)
+
+        self.breaker.record_success()
+        self._count('remote')
+        return reply
+
+    def stream(self, message, patient_data, language='en'):
+        """Yield remote reply text as it arrives
+
+        Raises CircuitOpenError without calling the API while the circuit is
+        open. Callers fall back to ``local_reply`` on any error.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError('Remote inference circuit is open')
+        try:
+            yield from self.remote.stream(message, patient_data, language)
+        except GeneratorExit:
+            self.breaker.record_abandoned()
+            raise
+        except Exception as e:
+            self._remote_failed(e)
+            raise
+        self.breaker.record_success()
+        self._count('remote')
+
+    def stats(self):
+        return {
+            'hedge_after': self.hedge_after,
+            'breaker': self.breaker.stats(),
+            'replies': dict(self.counts),
+            'local_backend': {'name': self.local.name, **self.local.stats()} if self.local else None
+        }
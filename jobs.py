@@ -0,0 +1,73 @@
+"""Background job queue for work that should not hold up a request.
+
+When CELERY_BROKER_URL is configured, jobs are sent to Celery (run a worker
+with ``celery -A app:celery worker``). Otherwise they run on an in-process
+thread pool, which is enough for local development and single-node setups.
+Either way a job runs inside an application context.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueue:
+    def __init__(self, app=None):
+        self.app = None
+        self.celery = None
+        self._functions = {}
+        self._celery_tasks = {}
+        self._executor = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        broker_url = app.config.get('CELERY_BROKER_URL')
+        if broker_url:
+            from celery import Celery
+
+            self.celery = Celery(
+                app.import_name,
+                broker=broker_url,
+                backend=app.config.get('CELERY_RESULT_BACKEND')
+            )
+
+            class AppContextTask(self.celery.Task):
+                def __call__(self, *args, **kwargs):
+                    with app.app_context():
+                        return self.run(*args, **kwargs)
+
+            self.celery.Task = AppContextTask
+            for name, func in self._functions.items():
+                self._register_celery_task(name, func)
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=app.config.get('JOB_WORKERS', 4),
+                thread_name_prefix='jobs'
+            )
+        app.extensions['job_queue'] = self
+
+    def _register_celery_task(self, name, func):
+        self._celery_tasks[name] = self.celery.task(name=name, acks_late=True)(func)
+
+    def task(self, func):
+        """Register a function so it can be passed to enqueue()"""
+        name = f'{func.__module__}.{func.__name__}'
+        self._functions[name] = func
+        if self.celery is not None:
+            self._register_celery_task(name, func)
+        func.job_name = name
+        return func
+
+    def enqueue(self, func, *args):
+        """Run a registered task in the background"""
+        name = func.job_name
+        if self.celery is not None:
+            return self._celery_tasks[name].delay(*args)
+        return self._executor.submit(self._run_local, name, *args)
+
+    def _run_local(self, name, *args):
+        try:
+            with self.app.app_context():
+                return self._functions[name](*args)
+        except Exception as e:
+            print(f"Background job {name} failed: {e}")
+            raise
@@ -0,0 +1,98 @@
+"""Compiled multi-pattern matcher for chat keyword detection.
+
+Every phrase in the keyword table, across all supported languages, is folded
+into a single trie and compiled to one regular expression. Scanning a message
+is then a single pass in the regex engine, and the cost per message depends
+on the message length rather than on how many phrases the table holds.
+"""
+import json
+import re
+import unicodedata
+
+
+def normalize_text(text):
+    return unicodedata.normalize('NFC', text).casefold()
+
+
+def _trie_to_pattern(node):
+    # A trie node is a dict of next character -> child, with '' marking the
+    # end of a phrase. Alternatives at each node start with distinct
+    # characters, so the regex engine never backtracks across branches.
+    is_end = '' in node
+    branches = [re.escape(char) + _trie_to_pattern(child)
+                for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ''
+    if len(branches) == 1 and not is_end:
+        return branches[0]
+    pattern = '(?:' + '|'.join(branches) + ')'
+    return pattern + '?' if is_end else pattern
+
+
+class KeywordMatcher:
+    def __init__(self, table, categories=None):
+        """Build from {language: {category: [phrases]}}
+
+        ``categories`` gives the precedence order used by ``first_category``.
+        """
+        self.categories = list(categories or [])
+        self.languages = sorted(table)
+        self._categories_by_phrase = {}
+
+        for language_table in table.values():
+            for category, phrases in language_table.items():
+                if category not in self.categories:
+                    self.categories.append(category)
+                for phrase in phrases:
+                    phrase = normalize_text(phrase)
+                    if phrase:
+                        self._categories_by_phrase.setdefault(phrase, set()).add(category)
+
+        # At each position the regex returns only the longest phrase, so a
+        # phrase also carries the categories of any phrase that prefixes it.
+        for phrase, phrase_categories in self._categories_by_phrase.items():
+            for end in range(1, len(phrase)):
+                phrase_categories |= self._categories_by_phrase.get(phrase[:end], set())
+        self._categories_by_phrase = {
+            phrase: frozenset(found) for phrase, found in self._categories_by_phrase.items()
+        }
+
+        trie = {}
+        for phrase in self._categories_by_phrase:
+            node = trie
+            for char in phrase:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        # The lookahead lets matches overlap, so 'chest pain' reports both
+        # the emergency phrase and the nested 'pain'.
+        self._regex = re.compile('(?=(' + _trie_to_pattern(trie) + '))') if trie else None
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['keywords'], data.get('categories'))
+
+    def __len__(self):
+        return len(self._categories_by_phrase)
+
+    def find(self, text):
+        """All phrases found in the text, in order of position"""
+        if self._regex is None or not text:
+            return []
+        return [match.group(1) for match in self._regex.finditer(normalize_text(text))]
+
+    def match(self, text):
+        """Set of every category matched anywhere in the text"""
+        found = set()
+        for phrase in self.find(text):
+            found |= self._categories_by_phrase[phrase]
+        return frozenset(found)
+
+    def first_category(self, text):
+        """Highest-precedence category matched in the text, or None"""
+        found = self.match(text)
+        for category in self.categories:
+            if category in found:
+                return category
+        return None
@@ -0,0 +1,223 @@
+"""Asynchronous OpenAI client shared by the chat and triage code paths.
+
+All completions run on a single background asyncio loop. A semaphore bounds
+how many requests are in flight against the API at once, and every call has
+a deadline after which it is cancelled. Request handlers that call
+``complete`` still block their thread on the result, but for no longer than
+the timeout, and threads waiting on the API do not hold a connection slot.
+With threaded workers, a request waiting on GPT-4 costs an idle thread, so
+size GUNICORN_THREADS for the chats that can be waiting at once.
+"""
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import openai
+
+
+class LLMTimeoutError(Exception):
+    """Raised when a completion does not finish before its deadline"""
+
+
+class LLMClient:
+    def __init__(self, app=None):
+        self.model = 'gpt-4'
+        self.max_concurrency = 8
+        self.default_timeout = 30.0
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._semaphore = None
+        self._session = None
+        self._pid = None
+        self._in_flight = 0
+        self._observers = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.model = app.config.get('LLM_MODEL', self.model)
+        self.max_concurrency = app.config.get('LLM_MAX_CONCURRENCY', self.max_concurrency)
+        self.default_timeout = app.config.get('LLM_TIMEOUT', self.default_timeout)
+        if app.config.get('OPENAI_API_BASE'):
+            openai.api_base = app.config['OPENAI_API_BASE']
+        app.extensions['llm_client'] = self
+
+    def add_observer(self, observer):
+        """Register ``observer()``, called on the submitting thread for each call
+
+        It returns a callback that is run with ``(elapsed, usage, outcome)``
+        when the call ends; ``outcome`` is ok, error, timeout or cancelled.
+        """
+        if observer not in self._observers:
+            self._observers.append(observer)
+
+    def _observe(self):
+        return [observer() for observer in self._observers]
+
+    @staticmethod
+    async def _observed(call, callbacks):
+        started = time.perf_counter()
+        outcome, usage = 'error', None
+        try:
+            result, usage = await call
+            outcome = 'ok'
+            return result
+        except asyncio.TimeoutError:
+            outcome = 'timeout'
+            raise
+        except asyncio.CancelledError:
+            outcome = 'cancelled'
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            for callback in callbacks:
+                callback(elapsed, usage, outcome)
+
+    def _ensure_loop(self):
+        # The loop is started lazily and restarted after a fork so that
+        # gunicorn --preload workers do not share a dead thread.
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                return self._loop
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='llm-client', daemon=True)
+            thread.start()
+            asyncio.run_coroutine_threadsafe(self._setup(), loop).result()
+            self._loop, self._thread, self._pid = loop, thread, os.getpid()
+            return loop
+
+    async def _setup(self):
+        import aiohttp
+
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency)
+        )
+
+    async def _complete(self, messages, max_tokens, temperature, timeout):
+        openai.aiosession.set(self._session)
+        async with self._semaphore:
+            self._in_flight += 1
+            try:
+                response = await openai.ChatCompletion.acreate(
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    request_timeout=timeout
+                )
+            finally:
+                self._in_flight -= 1
+        return response.choices[0].message.content, response.get('usage')
+
+    async def _complete_with_deadline(self, messages, max_tokens, temperature, timeout, callbacks=()):
+        # The deadline covers time spent queued for a slot as well as the call
+        return await self._observed(asyncio.wait_for(
+            self._complete(messages, max_tokens, temperature, timeout), timeout
+        ), callbacks)
+
+    def submit(self, messages, max_tokens=500, temperature=0.7, timeout=None):
+        """Schedule a chat completion and return a concurrent.futures.Future
+
+        Cancelling the returned future cancels the underlying API call.
+        """
+        timeout = timeout or self.default_timeout
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(
+            self._complete_with_deadline(messages, max_tokens, temperature, timeout, self._observe()), loop
+        )
+
+    def complete(self, messages, max_tokens=500, temperature=0.7, timeout=None):
+        """Run a chat completion and wait for its text, up to the timeout"""
+        timeout = timeout or self.default_timeout
+        future = self.submit(messages, max_tokens, temperature, timeout)
+        return self.result(future, timeout)
+
+    @staticmethod
+    def result(future, timeout):
+        """Wait for a submitted completion, cancelling it on timeout"""
+        try:
+            return future.result(timeout)
+        except (FutureTimeoutError, asyncio.TimeoutError):
+            future.cancel()
+            raise LLMTimeoutError(f'LLM call exceeded {timeout}s')
+
+    async def _stream(self, messages, max_tokens, temperature, timeout, put):
+        openai.aiosession.set(self._session)
+        async with self._semaphore:
+            self._in_flight += 1
+            try:
+                chunks = await openai.ChatCompletion.acreate(
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    request_timeout=timeout,
+                    stream=True
+                )
+                produced = 0
+                async for chunk in chunks:
+                    content = chunk.choices[0].delta.get('content')
+                    if content:
+                        produced += 1
+                        put(content)
+            finally:
+                self._in_flight -= 1
+        # Streamed responses carry no usage block; each chunk is about one token
+        return None, {'completion_tokens': produced}
+
+    def stream(self, messages, max_tokens=500, temperature=0.7, timeout=None):
+        """Yield completion text as it arrives
+
+        ``timeout`` bounds the wait for the first chunk and the gap between
+        chunks. Closing the generator early cancels the API call.
+        """
+        timeout = timeout or self.default_timeout
+        loop = self._ensure_loop()
+        chunks = queue.Queue()
+        finished = object()
+        callbacks = self._observe()
+
+        async def run():
+            try:
+                await self._observed(self._stream(messages, max_tokens, temperature, timeout, chunks.put), callbacks)
+            except BaseException as e:
+                chunks.put(e)
+                raise
+            chunks.put(finished)
+
+        future = asyncio.run_coroutine_threadsafe(run(), loop)
+        try:
+            while True:
+                try:
+                    item = chunks.get(timeout=timeout)
+                except queue.Empty:
+                    raise LLMTimeoutError(f'No LLM output for {timeout}s')
+                if item is finished:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            future.cancel()
+
+    def stats(self):
+        return {
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self._in_flight,
+            'timeout': self.default_timeout
+        }
+
+    def close(self):
+        with self._lock:
+            if self._loop is None:
+                return
+            if self._session is not None:
+                asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop = self._thread = self._session = self._semaphore = None
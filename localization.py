@@ -0,0 +1,90 @@
+"""Localized canned responses, loaded once and reloaded when the file changes.
+
+The response table is a JSON file of {language: {key: text}}. It is read into
+an immutable snapshot in which every supported language has every key, with
+English filling any gaps, so a lookup on the request path is two dict reads.
+The file's mtime is checked at most every LOCALIZATION_RELOAD_INTERVAL
+seconds and an edited table is swapped in without a restart.
+"""
+import json
+import os
+import threading
+import time
+from types import MappingProxyType
+
+DEFAULT_LANGUAGE = 'en'
+
+
+class LocalizationRegistry:
+    def __init__(self, app=None):
+        self.path = None
+        self.languages = (DEFAULT_LANGUAGE,)
+        self.reload_interval = 5.0
+        self._table = MappingProxyType({})
+        self._fallbacks = frozenset()
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.path = app.config['LOCALIZATION_PATH']
+        self.languages = tuple(app.config.get('SUPPORTED_LANGUAGES', self.languages))
+        self.reload_interval = app.config.get('LOCALIZATION_RELOAD_INTERVAL', self.reload_interval)
+        self.load()
+        app.extensions['localization'] = self
+
+    def load(self):
+        """Read the table file and swap in a new snapshot"""
+        mtime = os.stat(self.path).st_mtime_ns
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+
+        default = data[DEFAULT_LANGUAGE]
+        table = {}
+        fallbacks = set()
+        for language in dict.fromkeys(self.languages + tuple(data)):
+            own = data.get(language, {})
+            table[language] = MappingProxyType({**default, **own})
+            fallbacks.update((language, key) for key in default if key not in own)
+        self._table = MappingProxyType(table)
+        self._fallbacks = frozenset(fallbacks)
+        self._mtime = mtime
+        self._checked_at = time.monotonic()
+
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if self.reload_interval <= 0 or now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            if now - self._checked_at < self.reload_interval:
+                return
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                if mtime != self._mtime:
+                    self.load()
+            except (OSError, ValueError, KeyError) as e:
+                # Keep serving the last good table until the file is fixed
+                print(f"Localization reload failed: {e}")
+
+    def responses(self, language):
+        """All responses for a language, or the English ones if it is unknown"""
+        self._reload_if_changed()
+        table = self._table
+        return table.get(language) or table[DEFAULT_LANGUAGE]
+
+    def all_texts(self):
+        """Every response text in every language"""
+        return {text for responses in self._table.values() for text in responses.values()}
+
+    def get(self, language, key):
+        return self.responses(language)[key]
+
+    def is_fallback(self, language, key):
+        """True if ``get(language, key)`` returns English standing in for a missing translation"""
+        if language == DEFAULT_LANGUAGE:
+            return False
+        self._reload_if_changed()
+        return language not in self._table or (language, key) in self._fallbacks
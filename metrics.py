@@ -0,0 +1,252 @@
+"""Per-request timing broken down by phase, exported in Prometheus format.
+
+Every request gets a ``RequestTiming`` that collects:
+
+* database queries, counted and timed by SQLAlchemy cursor events;
+* LLM calls made on the request's behalf, timed by an ``LLMClient``
+  observer, with token counts from the API's ``usage`` block;
+* JSON serialization, timed by the app's JSON provider.
+
+When the request ends, these go into histograms labelled by route (the URL
+rule, not the path, so label cardinality stays fixed), and ``/metrics``
+renders them. A sample of requests (METRICS_TRACE_SAMPLE_RATE) also records
+each SQL statement. A sampled request slower than METRICS_SLOW_REQUEST_MS is
+logged with that trace.
+
+Metrics are per worker process, like the other /api/stats endpoints.
+"""
+import contextvars
+import json
+import random
+import threading
+import time
+
+from flask import g, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+MAX_TRACE_QUERIES = 50
+
+_current = contextvars.ContextVar('request_timing', default=None)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield self.name, _format_labels(self.labels, label_values), value
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            series = {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+        for label_values, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield (f'{self.name}_bucket',
+                       _format_labels(self.labels, label_values, [('le', _format_number(float(bound)))]), cumulative)
+            yield f'{self.name}_bucket', _format_labels(self.labels, label_values, [('le', '+Inf')]), count
+            yield f'{self.name}_sum', _format_labels(self.labels, label_values), total
+            yield f'{self.name}_count', _format_labels(self.labels, label_values), count
+
+
+class RequestTiming:
+    __slots__ = ('started', 'db_queries', 'db_seconds', 'llm_calls', 'llm_seconds',
+                 'serialize_seconds', 'trace')
+
+    def __init__(self, trace):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.trace = [] if trace else None
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, adding serialization time to the current request"""
+
+    def response(self, *args, **kwargs):
+        timing = _current.get()
+        if timing is None:
+            return super().response(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return super().response(*args, **kwargs)
+        finally:
+            timing.serialize_seconds += time.perf_counter() - started
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timing = _current.get()
+    started = conn.info.get('query_started')
+    if timing is None or not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    timing.db_queries += 1
+    timing.db_seconds += elapsed
+    if timing.trace is not None and len(timing.trace) < MAX_TRACE_QUERIES:
+        timing.trace.append({'sql': ' '.join(statement.split())[:500], 'ms': round(elapsed * 1000, 2)})
+
+
+class Metrics:
+    def __init__(self, app=None):
+        self.enabled = True
+        self.trace_sample_rate = 0.01
+        self.slow_request_seconds = 1.0
+        self.slow_requests = 0
+        self.requests = Counter('http_requests_total', 'HTTP requests', ('route', 'method', 'status'))
+        self.request_seconds = Histogram('http_request_duration_seconds', 'Time to build the response',
+                                         ('route', 'method'))
+        self.phase_seconds = Histogram('http_request_phase_seconds', 'Time per request spent in each phase',
+                                       ('route', 'phase'))
+        self.db_queries = Histogram('http_request_db_queries', 'Database queries per request',
+                                    ('route',), buckets=COUNT_BUCKETS)
+        self.llm_seconds = Histogram('llm_call_duration_seconds', 'LLM API call latency', ('outcome',))
+        self.llm_tokens = Counter('llm_tokens_total', 'LLM tokens used', ('kind',))
+        self.registry = [self.requests, self.request_seconds, self.phase_seconds, self.db_queries,
+                         self.llm_seconds, self.llm_tokens]
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', self.enabled)
+        self.trace_sample_rate = app.config.get('METRICS_TRACE_SAMPLE_RATE', self.trace_sample_rate)
+        self.slow_request_seconds = app.config.get('METRICS_SLOW_REQUEST_MS', self.slow_request_seconds * 1000) / 1000
+        app.extensions['metrics'] = self
+        if not self.enabled:
+            return
+
+        app.json = TimedJSONProvider(app)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        llm_client = app.extensions.get('llm_client')
+        if llm_client is not None:
+            llm_client.add_observer(self.llm_call)
+
+    def _start_request(self):
+        g.metrics_token = _current.set(RequestTiming(random.random() < self.trace_sample_rate))
+
+    def _finish_request(self, response):
+        timing = _current.get()
+        if timing is None:
+            return response
+        elapsed = time.perf_counter() - timing.started
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+        self.requests.inc(1, route, request.method, str(response.status_code))
+        self.request_seconds.observe(elapsed, route, request.method)
+        self.phase_seconds.observe(timing.db_seconds, route, 'db')
+        self.phase_seconds.observe(timing.serialize_seconds, route, 'serialize')
+        if timing.llm_calls:
+            self.phase_seconds.observe(timing.llm_seconds, route, 'llm')
+        self.db_queries.observe(timing.db_queries, route)
+
+        if timing.trace is not None and elapsed >= self.slow_request_seconds:
+            self.slow_requests += 1
+            print("Slow request: " + json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'ms': round(elapsed * 1000, 1),
+                'db_ms': round(timing.db_seconds * 1000, 1),
+                'llm_ms': round(timing.llm_seconds * 1000, 1),
+                'serialize_ms': round(timing.serialize_seconds * 1000, 1),
+                'queries': timing.trace
+            }))
+        return response
+
+    def _teardown_request(self, exc):
+        token = g.pop('metrics_token', None)
+        if token is not None:
+            _current.reset(token)
+
+    def llm_call(self):
+        """LLMClient observer: called on the submitting thread, returns the completion callback"""
+        timing = _current.get()
+
+        def finished(elapsed, usage, outcome):
+            self.llm_seconds.observe(elapsed, outcome)
+            if usage:
+                self.llm_tokens.inc(usage.get('prompt_tokens', 0), 'prompt')
+                self.llm_tokens.inc(usage.get('completion_tokens', 0), 'completion')
+            if timing is not None:
+                timing.llm_calls += 1
+                timing.llm_seconds += elapsed
+        return finished
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.registry:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {_format_number(value)}')
+        return '\n'.join(lines) + '\n'
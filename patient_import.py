@@ -0,0 +1,149 @@
+"""Validation and streaming bulk import for patient registrations.
+
+``validate_patient`` holds the registration rules shared by /api/register,
+/api/register/bulk and the ``flask import-patients`` command. The importer
+reads CSV or JSONL one record at a time, so memory use does not grow with
+the file. It inserts valid rows in batches and collects per-row errors
+instead of aborting the whole import.
+"""
+import csv
+import json
+import time
+
+REQUIRED_FIELDS = ('fullName', 'age', 'gender')
+
+
+class PatientValidationError(ValueError):
+    pass
+
+
+def _conditions(value):
+    # CSV exports carry conditions as 'diabetes;hypertension' or a JSON list
+    if value in (None, ''):
+        return []
+    if isinstance(value, list):
+        return value
+    value = str(value).strip()
+    if value.startswith('['):
+        return json.loads(value)
+    return [item.strip() for item in value.split(';') if item.strip()]
+
+
+def validate_patient(data):
+    """Check a registration payload and return Patient column values"""
+    if not isinstance(data, dict):
+        raise PatientValidationError('Patient record must be an object')
+    for field in REQUIRED_FIELDS:
+        if data.get(field) in (None, ''):
+            raise PatientValidationError(f'Missing required field: {field}')
+
+    try:
+        age = int(data['age'])
+    except (TypeError, ValueError):
+        raise PatientValidationError(f"Invalid age: {data['age']!r}")
+    if not 0 <= age <= 150:
+        raise PatientValidationError(f'Invalid age: {age}')
+
+    try:
+        conditions = _conditions(data.get('conditions'))
+    except ValueError:
+        raise PatientValidationError('Invalid conditions list')
+
+    return {
+        'full_name': data['fullName'],
+        'age': age,
+        'gender': data['gender'],
+        'phone': data.get('phone') or None,
+        'location': data.get('location') or None,
+        'preferred_language': data.get('language') or 'en',
+        'medical_conditions': conditions,
+        'medications': data.get('medications') or None,
+        'smoking': data.get('smoking') or None,
+        'alcohol': data.get('alcohol') or None,
+        'exercise': data.get('exercise') or None,
+        'pregnancy': data.get('pregnancy') or None
+    }
+
+
+def read_records(stream, fmt):
+    """Yield (line_number, record) pairs from a CSV or JSONL text stream"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError as e:
+                yield line_number, PatientValidationError(f'Invalid JSON: {e}')
+    else:
+        raise ValueError(f'Unsupported import format: {fmt}')
+
+
+class ImportResult:
+    def __init__(self, max_errors=1000):
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self.max_errors = max_errors
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add_error(self, line, error):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'error': str(error)})
+
+    def to_dict(self):
+        return {
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+            'seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.imported / self.elapsed, 1) if self.elapsed else None
+        }
+
+
+def import_patients(records, insert_batch, batch_size=1000, max_errors=1000):
+    """Validate records and insert them in batches
+
+    ``insert_batch(rows)`` must insert and commit a list of Patient column
+    dicts, raising if the batch fails. A failed batch is retried row by row
+    so that one bad row only costs itself.
+    """
+    result = ImportResult(max_errors)
+    batch = []
+
+    def flush():
+        try:
+            insert_batch([row for _, row in batch])
+            result.imported += len(batch)
+        except Exception:
+            for line, row in batch:
+                try:
+                    insert_batch([row])
+                    result.imported += 1
+                except Exception as e:
+                    result.add_error(line, e)
+        batch.clear()
+
+    for line, record in records:
+        try:
+            if isinstance(record, Exception):
+                raise record
+            batch.append((line, validate_patient(record)))
+        except PatientValidationError as e:
+            result.add_error(line, e)
+            continue
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    result.elapsed = time.perf_counter() - result.started
+    return result
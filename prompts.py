@@ -0,0 +1,114 @@
+"""Prompt templates for the LLM calls, compiled once at import.
+
+A PromptTemplate is a system message and a user message with ``str.format``
+fields. The text is dedented and its fields are parsed when the template is
+created, so building a prompt per request is one format call per message.
+Each template has a stable ``id`` derived from its name and text. Caches key
+on it, so editing a prompt never serves responses written for the old one.
+"""
+import hashlib
+import string
+import textwrap
+
+
+class PromptTemplate:
+    __slots__ = ('name', 'system', 'user', 'fields', 'id')
+
+    def __init__(self, name, system, user):
+        self.name = name
+        self.system = textwrap.dedent(system).strip()
+        self.user = textwrap.dedent(user).strip()
+        self.fields = frozenset(
+            field for text in (self.system, self.user)
+            for _, field, _, _ in string.Formatter().parse(text) if field
+        )
+        digest = hashlib.sha256('\0'.join((name, self.system, self.user)).encode('utf-8')).hexdigest()
+        self.id = f'{name}:{digest[:16]}'
+
+    def __eq__(self, other):
+        return isinstance(other, PromptTemplate) and self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f'PromptTemplate({self.id!r})'
+
+    def render(self, **values):
+        """Chat messages with the fields filled in"""
+        return [
+            {"role": "system", "content": self.system.format(**values)},
+            {"role": "user", "content": self.user.format(**values)}
+        ]
+
+
+CHAT_PROMPT = PromptTemplate(
+    'chat',
+    system="You are a compassionate AI doctor assistant. Respond in {language} language with culturally "
+           "appropriate medical guidance for rural India.",
+    user="""
+        You are an AI doctor assistant helping rural patients in India.
+        Respond in {language} language.
+
+        Patient context:
+        - Age: {age}
+        - Gender: {gender}
+        - Medical history: {medical_conditions}
+
+        Patient message: {message}
+
+        Provide a helpful, empathetic medical response. Keep it simple and practical for rural settings.
+        """
+)
+
+RECOMMENDATIONS_PROMPT = PromptTemplate(
+    'recommendations',
+    system="You are a medical AI assistant specializing in rural healthcare in India. Provide practical, "
+           "culturally appropriate medical guidance.",
+    user="""
+        As a medical AI assistant, provide personalized healthcare recommendations for a patient with the following information:
+
+        Patient Information:
+        - Age: {age}
+        - Gender: {gender}
+        - Medical Conditions: {conditions}
+        - Medications: {medications}
+        - Lifestyle: Smoking: {smoking}, Alcohol: {alcohol}
+
+        Symptoms:
+        - Primary Symptom: {primary_symptom}
+        - Severity: {symptom_severity}
+        - Onset: {symptom_onset}
+        - Additional Symptoms: {additional_symptoms}
+
+        Triage Level: {triage_level}
+
+        Please provide:
+        1. Specific self-care recommendations
+        2. Warning signs to watch for
+        3. When to seek immediate medical attention
+        4. Lifestyle modifications if applicable
+        5. Follow-up recommendations
+
+        Keep recommendations practical for rural healthcare settings in India.
+        """
+)
+
+# Rolling consultation summary, placed before the recent turns of a chat prompt
+CONVERSATION_SUMMARY = "Summary of the earlier conversation with this patient: {summary}"
+
+CHAT_SUMMARY_PROMPT = PromptTemplate(
+    'chat_summary',
+    system="You keep concise running notes of doctor-patient chat consultations for the doctor who "
+           "continues them.",
+    user="""
+        Update the consultation notes with the new messages below. Keep symptoms, their duration and
+        severity, medications, advice already given and open questions. Drop greetings and repetition.
+        Write plain sentences in {language} language, at most {max_words} words.
+
+        Notes so far: {summary}
+
+        New messages:
+        {transcript}
+        """
+)
@@ -0,0 +1,245 @@
+"""In-memory search index over healthcare providers.
+
+Two structures are built from the provider table in one pass:
+
+* a uniform lat/lng grid, searched ring by ring outwards from the query
+  point for k-nearest-neighbour queries;
+* an inverted index of normalized location tokens, with a sorted token list
+  so a query word can match any token it prefixes ("raj" -> "rajasthan").
+
+Specialization filters keep the substring semantics of the old ILIKE query,
+but run over the handful of distinct specializations rather than every row.
+The index is rebuilt wholesale and swapped in atomically, so readers never
+see a half-built index. Each build carries a ``version`` hashed from its
+contents, which is the same in every worker that loaded the same rows.
+"""
+import bisect
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+import unicodedata
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.19
+
+
+def tokenize(text):
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    return re.findall(r'\w+', text)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _ring_cells(row, col, ring):
+    """Grid cells on the square ring at Chebyshev distance ``ring``"""
+    if ring == 0:
+        yield row, col
+        return
+    for c in range(col - ring, col + ring + 1):
+        yield row - ring, c
+        yield row + ring, c
+    for r in range(row - ring + 1, row + ring):
+        yield r, col - ring
+        yield r, col + ring
+
+
+class _Snapshot:
+    def __init__(self, providers, cell_degrees):
+        self.cell_degrees = cell_degrees
+        self.providers = {}
+        self.order = []
+        self.grid = {}
+        self.tokens = {}
+        self.specializations = {}
+        digest = hashlib.sha256()
+
+        for provider in providers:
+            digest.update(json.dumps(provider, sort_keys=True, default=str).encode('utf-8'))
+            provider_id = provider['id']
+            self.providers[provider_id] = provider
+            self.order.append(provider_id)
+
+            lat, lng = provider.get('latitude'), provider.get('longitude')
+            if lat is not None and lng is not None:
+                self.grid.setdefault(self.cell(lat, lng), []).append(provider_id)
+
+            for token in tokenize(provider.get('location')):
+                self.tokens.setdefault(token, set()).add(provider_id)
+
+            specialization = ' '.join(tokenize(provider.get('specialization')))
+            self.specializations.setdefault(specialization, set()).add(provider_id)
+
+        self.version = digest.hexdigest()[:16]
+        self.sorted_tokens = sorted(self.tokens)
+        if self.grid:
+            rows = [cell[0] for cell in self.grid]
+            cols = [cell[1] for cell in self.grid]
+            self.bounds = (min(rows), max(rows), min(cols), max(cols))
+        else:
+            self.bounds = None
+
+    def cell(self, lat, lng):
+        return int(math.floor(lat / self.cell_degrees)), int(math.floor(lng / self.cell_degrees))
+
+
+class ProviderIndex:
+    brute_force_limit = 512
+
+    def __init__(self, cell_degrees=0.25, ttl=300, app=None):
+        self.cell_degrees = cell_degrees
+        self.ttl = ttl
+        self._snapshot = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.cell_degrees = app.config.get('PROVIDER_INDEX_CELL_DEGREES', self.cell_degrees)
+        self.ttl = app.config.get('PROVIDER_INDEX_TTL', self.ttl)
+        self.invalidate()
+        app.extensions['provider_index'] = self
+
+    def build(self, providers):
+        """Replace the index contents with an iterable of provider dicts"""
+        snapshot = _Snapshot(providers, self.cell_degrees)
+        with self._lock:
+            self._snapshot = snapshot
+            self._built_at = time.monotonic()
+        return snapshot
+
+    def refresh(self, load_providers):
+        """Rebuild from ``load_providers()`` if the index is missing or past its TTL"""
+        if not self.is_stale():
+            return
+        with self._rebuild_lock:
+            if self.is_stale():
+                self.build(load_providers())
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def is_stale(self):
+        return self._snapshot is None or time.monotonic() - self._built_at > self.ttl
+
+    @property
+    def version(self):
+        """Content hash of the current index, or None before the first build"""
+        snapshot = self._snapshot
+        return snapshot.version if snapshot else None
+
+    def __len__(self):
+        snapshot = self._snapshot
+        return len(snapshot.providers) if snapshot else 0
+
+    def _location_ids(self, snapshot, location):
+        ids = None
+        for word in tokenize(location):
+            matches = set()
+            tokens = snapshot.sorted_tokens
+            position = bisect.bisect_left(tokens, word)
+            while position < len(tokens) and tokens[position].startswith(word):
+                matches |= snapshot.tokens[tokens[position]]
+                position += 1
+            ids = matches if ids is None else ids & matches
+            if not ids:
+                return set()
+        return ids
+
+    def _specialization_ids(self, snapshot, specialization):
+        wanted = ' '.join(tokenize(specialization))
+        ids = set()
+        for name, provider_ids in snapshot.specializations.items():
+            if wanted in name:
+                ids |= provider_ids
+        return ids
+
+    def _candidates(self, snapshot, location, specialization):
+        """Ids allowed by the text filters, or None when there are no filters"""
+        allowed = None
+        if location:
+            allowed = self._location_ids(snapshot, location)
+        if specialization:
+            matches = self._specialization_ids(snapshot, specialization)
+            allowed = matches if allowed is None else allowed & matches
+        return allowed
+
+    def _nearest(self, snapshot, lat, lng, k, allowed, radius_km):
+        if snapshot.bounds is None:
+            return []
+        if allowed is not None and len(allowed) <= self.brute_force_limit:
+            return self._nearest_brute_force(snapshot, lat, lng, k, allowed, radius_km)
+        origin_row, origin_col = snapshot.cell(lat, lng)
+        min_row, max_row, min_col, max_col = snapshot.bounds
+        max_ring = max(abs(origin_row - min_row), abs(origin_row - max_row),
+                       abs(origin_col - min_col), abs(origin_col - max_col))
+
+        found = []
+        for ring in range(max_ring + 1):
+            for cell in _ring_cells(origin_row, origin_col, ring):
+                for provider_id in snapshot.grid.get(cell, ()):
+                    if allowed is not None and provider_id not in allowed:
+                        continue
+                    provider = snapshot.providers[provider_id]
+                    distance = haversine_km(lat, lng, provider['latitude'], provider['longitude'])
+                    if radius_km is None or distance <= radius_km:
+                        found.append((distance, provider_id))
+
+            # Anything in ring + 1 or beyond is at least this far away. Longitude
+            # degrees shrink towards the poles, so use the widest latitude reached.
+            edge_lat = min(89.0, abs(lat) + (ring + 1) * self.cell_degrees)
+            reach_km = ring * self.cell_degrees * KM_PER_DEGREE * math.cos(math.radians(edge_lat))
+            if radius_km is not None and reach_km > radius_km:
+                break
+            if len(found) >= k:
+                found.sort()
+                if found[k - 1][0] <= reach_km:
+                    break
+
+        found.sort()
+        return found[:k]
+
+    def _nearest_brute_force(self, snapshot, lat, lng, k, allowed, radius_km):
+        # A selective text filter leaves few candidates; measuring them all is
+        # cheaper than walking rings of mostly non-matching cells
+        found = []
+        for provider_id in allowed:
+            provider = snapshot.providers[provider_id]
+            if provider.get('latitude') is None or provider.get('longitude') is None:
+                continue
+            distance = haversine_km(lat, lng, provider['latitude'], provider['longitude'])
+            if radius_km is None or distance <= radius_km:
+                found.append((distance, provider_id))
+        found.sort()
+        return found[:k]
+
+    def search(self, lat=None, lng=None, k=10, location=None, specialization=None, radius_km=None,
+               limit=None):
+        """Providers matching the filters as (provider, distance_km) pairs
+
+        With coordinates, returns the k nearest providers that have
+        coordinates; otherwise every match in id order, up to ``limit``.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return []
+        allowed = self._candidates(snapshot, location, specialization)
+
+        if lat is not None and lng is not None:
+            return [(snapshot.providers[provider_id], distance) for distance, provider_id
+                    in self._nearest(snapshot, lat, lng, k, allowed, radius_km)]
+
+        ids = snapshot.order if allowed is None else sorted(allowed)
+        if limit is not None:
+            ids = ids[:limit]
+        return [(snapshot.providers[provider_id], None) for provider_id in ids]
@@ -0,0 +1,143 @@
+"""Keyed cache for LLM responses.
+
+Keys are hashes of a normalized form of the prompt inputs, so requests that
+would produce the same prompt share one cached completion. The storage
+backend is pluggable: a size-bounded in-memory LRU for single-node runs, or
+Redis so that every worker shares the same entries.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCacheBackend:
+    """In-process LRU with per-entry expiry"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """Redis-backed cache shared by all workers"""
+
+    def __init__(self, url, prefix='llm-cache:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return value.decode('utf-8') if value is not None else None
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value, ex=int(ttl) if ttl else None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+
+def normalize(value):
+    """Canonical form of a prompt input: case, whitespace and list order are ignored"""
+    if isinstance(value, str):
+        return ' '.join(value.lower().split())
+    if isinstance(value, (list, tuple, set)):
+        items = (normalize(item) for item in value if item not in (None, ''))
+        return sorted({json.dumps(item, sort_keys=True) for item in items})
+    if isinstance(value, dict):
+        return {str(k): normalize(v) for k, v in value.items()}
+    return value
+
+
+class ResponseCache:
+    def __init__(self, app=None):
+        self.enabled = True
+        self.ttl = 24 * 3600
+        self.backend = LRUCacheBackend()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('LLM_CACHE_ENABLED', True)
+        self.ttl = app.config.get('LLM_CACHE_TTL', self.ttl)
+        backend = app.config.get('LLM_CACHE_BACKEND', 'memory')
+        if backend == 'redis':
+            self.backend = RedisCacheBackend(app.config['LLM_CACHE_REDIS_URL'])
+        else:
+            self.backend = LRUCacheBackend(app.config.get('LLM_CACHE_MAX_ENTRIES', 1024))
+        app.extensions['response_cache'] = self
+
+    @staticmethod
+    def make_key(namespace, fields):
+        """Stable key for a namespace and a dict of prompt inputs"""
+        canonical = json.dumps(normalize(fields), sort_keys=True, separators=(',', ':'), default=str)
+        return f'{namespace}:' + hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _count(self, attr):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def get(self, key, bypass=False):
+        if bypass or not self.enabled:
+            self._count('bypassed')
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            print(f"Response cache read error: {e}")
+            value = None
+        self._count('hits' if value is not None else 'misses')
+        return value
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        try:
+            self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            print(f"Response cache write error: {e}")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+        }
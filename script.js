@@ -485,7 +485,14 @@ class HealthcareAI {
         }),
       })
 
-      const data = await response.json()
+      let data = await response.json()
+      // AI replies are generated in the background; wait for them on status_url
+      const statusUrl = data.status_url
+      while (data.status === "pending") {
+        const poll = await fetch(`${statusUrl}?wait=25`)
+        data = await poll.json()
+        if (!poll.ok) throw new Error(data.error)
+      }
       return data.response
     } catch (error) {
       console.error("Error communicating with AI:", error)
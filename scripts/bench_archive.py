@@ -0,0 +1,123 @@
+"""Hot table size and read latency before and after archiving cold months.
+
+Fills a scratch SQLite database with --months months of history: --patients
+patients, each with one assessment and one consultation of --messages chat
+messages per month. Times these reads before and after `archive-cold-rows`
+moves everything older than ARCHIVE_AFTER_DAYS to the archive:
+
+  recent     messages of a consultation from this month (served from the database)
+  stats      /api/stats counted from the tables (STATS_COUNTERS_ENABLED=false)
+  symptoms   /api/stats/symptoms
+  archived   messages of the oldest consultation (read through the archive)
+
+Also reports hot row counts, the database file size after VACUUM and the
+archive size on disk.
+
+    python scripts/bench_archive.py --months 24 --patients 500 --messages 20
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SYMPTOMS = ['fever', 'cough', 'headache', 'diarrhoea', 'rash', 'body_ache']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--patients', type=int, default=500)
+    parser.add_argument('--messages', type=int, default=20, help='per consultation')
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp()
+    database = os.path.join(scratch, 'bench_archive.db')
+    os.environ.update({
+        'DATABASE_URL': f'sqlite:///{database}', 'ARCHIVE_DIR': os.path.join(scratch, 'archive'),
+        'ARCHIVE_RELOAD_INTERVAL': '0', 'STATS_COUNTERS_ENABLED': 'false', 'METRICS_ENABLED': 'false'
+    })
+    from app import (app, db, archive_store, copy_to_archive, delete_archived, ARCHIVED_TABLES,
+                     Assessment, AssessmentSymptom, ChatMessage, Consultation, Patient)
+
+    rng = random.Random(25)
+    now = datetime.utcnow()
+    with app.app_context():
+        db.session.execute(db.insert(Patient), [
+            {'full_name': f'Patient {i}', 'age': 20 + i % 60, 'gender': 'female'} for i in range(args.patients)
+        ])
+        patient_ids = [row.id for row in db.session.query(Patient.id)]
+        for month in range(args.months, -1, -1):
+            created = now - timedelta(days=30 * month)
+            db.session.execute(db.insert(Assessment), [{
+                'patient_id': patient_id, 'primary_symptom': rng.choice(SYMPTOMS), 'symptom_onset': 'today',
+                'symptom_severity': 'moderate', 'triage_level': rng.choice(['routine', 'urgent']),
+                'recommendation_status': 'ready', 'ai_recommendations': 'Rest and drink fluids. ' * 20,
+                'created_at': created
+            } for patient_id in patient_ids])
+            db.session.execute(db.insert(Consultation), [
+                {'patient_id': patient_id, 'cost': 50, 'created_at': created} for patient_id in patient_ids
+            ])
+            db.session.flush()
+            consultations = db.session.query(Consultation.id).filter(Consultation.created_at == created).all()
+            assessments = db.session.query(Assessment.id).filter(Assessment.created_at == created).all()
+            db.session.execute(db.insert(AssessmentSymptom), [
+                {'assessment_id': row.id, 'kind': 'additional', 'symptom': rng.choice(SYMPTOMS)} for row in assessments
+            ])
+            db.session.execute(db.insert(ChatMessage), [{
+                'consultation_id': row.id, 'sender': 'user' if i % 2 == 0 else 'doctor',
+                'content': f'Message {i} about the fever and what to eat while it lasts.',
+                'timestamp': created + timedelta(minutes=i)
+            } for row in consultations for i in range(args.messages)])
+        db.session.commit()
+        oldest = db.session.query(db.func.min(Consultation.id)).scalar()
+        newest = db.session.query(db.func.max(Consultation.id)).scalar()
+
+    client = app.test_client()
+    reads = {
+        'recent': f'/api/consultation/{newest}/messages',
+        'stats': '/api/stats',
+        'symptoms': '/api/stats/symptoms',
+        'archived': f'/api/consultation/{oldest}/messages'
+    }
+
+    def report(phase):
+        timings = {}
+        for name, url in reads.items():
+            latencies = []
+            for _ in range(args.requests):
+                started = time.perf_counter()
+                assert client.get(url).status_code == 200
+                latencies.append((time.perf_counter() - started) * 1000)
+            timings[name] = statistics.median(latencies)
+        with sqlite3.connect(database) as connection:
+            connection.execute('VACUUM')
+        with app.app_context():
+            hot = {table: db.session.query(db.func.count(model.id)).scalar()
+                   for table, (model, _, _) in ARCHIVED_TABLES.items()}
+        print(f"{phase:<8} " + '  '.join(f"{name} {ms:6.2f}ms" for name, ms in timings.items()))
+        print(f"         hot rows {hot}  database {os.path.getsize(database) / 1e6:.1f} MB")
+
+    report('before')
+    started = time.perf_counter()
+    with app.app_context():
+        cutoff = archive_store.cutoff()
+        for table in ARCHIVED_TABLES:
+            for first_id, last_id in copy_to_archive(table, cutoff):
+                delete_archived(table, cutoff, first_id, last_id)
+    archived_bytes = sum(os.path.getsize(os.path.join(directory, name))
+                         for directory, _, files in os.walk(archive_store.root) for name in files)
+    print(f"archived in {time.perf_counter() - started:.1f}s, archive {archived_bytes / 1e6:.1f} MB on disk")
+    report('after')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Prompt size and /api/chat latency against consultation length, with and without the token budget.
+
+Creates consultations of each --lengths size in a scratch SQLite database
+and sends --requests chat messages to each through the test client, with
+the stub LLM server charging --prompt-ms per prompt word:
+
+  full      every stored message is sent (what naively adding history costs)
+  budgeted  rolling summary plus the newest turns within CHAT_CONTEXT_TOKENS;
+            the summary jobs run before timing starts
+
+    python scripts/bench_chat_context.py --lengths 10,100,1000,5000 --prompt-ms 0.2
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+from stub_llm_server import serve
+
+MESSAGE = 'What food should my mother eat after an operation?'
+PATIENT_LINES = [
+    'My mother had a hernia operation last week and still feels weak in the mornings',
+    'She takes her blood pressure tablets after breakfast, is that fine with the antibiotics',
+    'मुझे तीन दिन से बुखार है और सिर में दर्द हो रहा है',
+    'The wound looks clean but it itches at night and she cannot sleep well',
+]
+DOCTOR_LINES = [
+    'Keep the wound dry and clean, and watch for redness, swelling or discharge.',
+    'Light, soft food such as dal, rice and curd is easy to digest while she recovers.',
+    'Please continue the blood pressure tablets unless the surgeon told you otherwise.',
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lengths', default='10,100,1000,5000', help='messages per consultation')
+    parser.add_argument('--requests', type=int, default=10)
+    parser.add_argument('--latency-ms', type=float, default=100)
+    parser.add_argument('--prompt-ms', type=float, default=0.2)
+    parser.add_argument('--llm-port', type=int, default=8771)
+    args = parser.parse_args()
+    lengths = [int(length) for length in args.lengths.split(',')]
+
+    llm = serve(port=args.llm_port, latency_ms=args.latency_ms, token_ms=0, prompt_ms=args.prompt_ms)
+    threading.Thread(target=llm.serve_forever, daemon=True).start()
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_chat_context.db')}"
+    os.environ.update({
+        'OPENAI_API_KEY': 'stub', 'OPENAI_API_BASE': f'http://127.0.0.1:{args.llm_port}/v1',
+        'LLM_HEDGE_AFTER': '0', 'METRICS_ENABLED': 'false'
+    })
+    from app import (app, db, chat_context, count_tokens, conversation_context, summarize_consultation,
+                     ChatMessage, Consultation, Patient, VirtualDoctorAI)
+
+    rng = random.Random(22)
+    with app.app_context():
+        patient = Patient(full_name='Bench Patient', age=61, gender='female')
+        db.session.add(patient)
+        db.session.flush()
+        consultations = {}
+        for length in lengths:
+            consultation = Consultation(patient_id=patient.id, cost=50)
+            db.session.add(consultation)
+            db.session.flush()
+            consultations[length] = consultation.id
+            rows = []
+            for i in range(length):
+                content = rng.choice(PATIENT_LINES if i % 2 == 0 else DOCTOR_LINES)
+                rows.append({'consultation_id': consultation.id, 'sender': 'user' if i % 2 == 0 else 'doctor',
+                             'content': content, 'token_count': count_tokens(content)})
+            db.session.execute(db.insert(ChatMessage), rows)
+        db.session.commit()
+
+    budget, max_messages = chat_context.budget, chat_context.max_messages
+    client = app.test_client()
+    for mode in ('full', 'budgeted'):
+        if mode == 'full':
+            chat_context.budget = chat_context.max_messages = 10 ** 9
+        else:
+            chat_context.budget, chat_context.max_messages = budget, max_messages
+        for length, consultation_id in consultations.items():
+            with app.app_context():
+                if mode == 'budgeted':
+                    for _ in range(length // chat_context.fold_batch + 2):
+                        summarize_consultation(consultation_id)
+                messages = VirtualDoctorAI.build_chat_messages(
+                    MESSAGE, {'conversation': conversation_context(consultation_id)}
+                )
+                prompt_tokens = sum(count_tokens(message['content']) for message in messages)
+
+            latencies = []
+            for _ in range(args.requests):
+                started = time.perf_counter()
+                client.post('/api/chat', json={'message': MESSAGE, 'consultation_id': consultation_id})
+                latencies.append((time.perf_counter() - started) * 1000)
+            print(f"{mode:<9} {length:6d} messages  prompt {prompt_tokens:7d} tokens  "
+                  f"median /api/chat {statistics.median(latencies):8.1f}ms")
+
+    llm.shutdown()
+
+
+if __name__ == '__main__':
+    main()
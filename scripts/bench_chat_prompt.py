@@ -0,0 +1,111 @@
+"""Latency and allocation per chat call for canned replies and prompt building.
+
+Times the per-request work of /api/chat outside the LLM call, before and
+after the localization registry and precompiled prompt templates:
+
+  legacy   the nested response dict rebuilt on every lookup and the prompt
+           assembled with inline f-strings (copied from the original code)
+  current  LocalizationRegistry lookups and PromptTemplate.render()
+
+Allocation is the peak traced memory during one call, from tracemalloc.
+
+    python scripts/bench_chat_prompt.py --repeat 20000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PATIENT = {'age': 54, 'gender': 'female', 'medical_conditions': ['diabetes', 'hypertension']}
+MESSAGES = [
+    ('en', 'I have had a fever and a bad cough since yesterday'),
+    ('hi', 'मुझे तीन दिन से बुखार है और सिर में दर्द हो रहा है'),
+    ('en', 'What food should my mother eat after an operation?'),
+]
+
+
+def legacy_language_responses():
+    return {
+        'en': {
+            'greeting': "Hello! I'm your AI doctor assistant. How can I help you today?",
+            'symptom_inquiry': "Can you describe your symptoms in detail?",
+            'pain_scale': "On a scale of 1-10, how would you rate your pain?",
+            'duration': "How long have you been experiencing these symptoms?",
+            'emergency': "This sounds like it could be an emergency. Please seek immediate medical attention.",
+            'followup': "I recommend following up with a healthcare provider within 24-48 hours."
+        },
+        'hi': {
+            'greeting': "नमस्ते! मैं आपका AI डॉक्टर सहायक हूं। आज मैं आपकी कैसे मदद कर सकता हूं?",
+            'symptom_inquiry': "कृपया अपने लक्षणों का विस्तार से वर्णन करें?",
+            'pain_scale': "1-10 के पैमाने पर, आप अपने दर्द को कैसे रेट करेंगे?",
+            'duration': "आप कितने समय से इन लक्षणों का अनुभव कर रहे हैं?",
+            'emergency': "यह एक आपातकाल हो सकता है। कृपया तुरंत चिकित्सा सहायता लें।",
+            'followup': "मैं सुझाता हूं कि 24-48 घंटों के भीतर किसी स्वास्थ्य सेवा प्रदाता से संपर्क करें।"
+        }
+    }
+
+
+def legacy_chat_call(message, patient_data, language):
+    language_responses = legacy_language_responses()
+    responses = language_responses.get(language, language_responses['en'])
+    canned = responses['symptom_inquiry']
+    prompt = f"""
+            You are an AI doctor assistant helping rural patients in India.
+            Respond in {language} language.
+
+            Patient context:
+            - Age: {patient_data.get('age', 'Unknown')}
+            - Gender: {patient_data.get('gender', 'Unknown')}
+            - Medical history: {patient_data.get('medical_conditions', 'None')}
+
+            Patient message: {message}
+
+            Provide a helpful, empathetic medical response. Keep it simple and practical for rural settings.
+            """
+    return canned, [
+        {"role": "system", "content": f"You are a compassionate AI doctor assistant. Respond in {language} language with culturally appropriate medical guidance for rural India."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def measure(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for language, message in MESSAGES:
+            func(message, PATIENT, language)
+    micros = (time.perf_counter() - started) / (repeat * len(MESSAGES)) * 1e6
+
+    tracemalloc.start()
+    peaks = []
+    for language, message in MESSAGES:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        func(message, PATIENT, language)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+    return micros, max(peaks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20000)
+    args = parser.parse_args()
+
+    from app import app, localization, VirtualDoctorAI
+
+    def current_chat_call(message, patient_data, language):
+        return (localization.get(language, 'symptom_inquiry'),
+                VirtualDoctorAI.build_chat_messages(message, patient_data, language))
+
+    with app.app_context():
+        for label, func in (('legacy', legacy_chat_call), ('current', current_chat_call)):
+            micros, peak = measure(func, args.repeat)
+            print(f"{label:<8} {micros:7.2f}us per call  peak {peak:6d} bytes allocated per call")
+
+
+if __name__ == '__main__':
+    main()
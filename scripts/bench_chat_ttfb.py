@@ -0,0 +1,84 @@
+"""Time to first byte, first token and full reply for /api/chat vs /api/chat/stream.
+
+Starts the stub LLM server and the Flask app in-process, then times both
+endpoints over real HTTP connections.
+
+    python scripts/bench_chat_ttfb.py --latency-ms 600 --token-ms 40 --requests 20
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+from stub_llm_server import serve
+
+BODY = json.dumps({'message': 'What food should my mother eat after an operation?', 'language': 'en'})
+
+
+def timed_post(port, path):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    started = time.perf_counter()
+    conn.request('POST', path, body=BODY, headers={'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    response.read(1)
+    first_byte = time.perf_counter() - started
+    first_token = None
+    if response.getheader('Content-Type', '').startswith('text/event-stream'):
+        for line in response:
+            if line.startswith((b'event: token', b'event: fallback')):
+                first_token = time.perf_counter() - started
+                break
+    response.read()
+    total = time.perf_counter() - started
+    conn.close()
+    return first_byte, first_token or total, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=600)
+    parser.add_argument('--token-ms', type=float, default=40)
+    parser.add_argument('--llm-port', type=int, default=8769)
+    parser.add_argument('--app-port', type=int, default=5099)
+    args = parser.parse_args()
+
+    llm = serve(port=args.llm_port, latency_ms=args.latency_ms, token_ms=args.token_ms)
+    threading.Thread(target=llm.serve_forever, daemon=True).start()
+
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+    os.environ['OPENAI_API_KEY'] = 'stub'
+    os.environ['OPENAI_API_BASE'] = f'http://127.0.0.1:{args.llm_port}/v1'
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    import app as app_module
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', args.app_port, app_module.app, threaded=True,
+                         request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    for path in ('/api/chat', '/api/chat/stream'):
+        samples = [timed_post(args.app_port, path) for _ in range(args.requests)]
+        first_byte, first_token, total = (
+            statistics.median(sample[i] * 1000 for sample in samples) for i in range(3)
+        )
+        print(f"{path:<18} median TTFB {first_byte:7.1f}ms  first token {first_token:7.1f}ms  "
+              f"full reply {total:7.1f}ms")
+
+    server.shutdown()
+    llm.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Upstream LLM calls during a burst of identical recommendation requests.
+
+Sends waves of concurrent ``generate_ai_recommendations`` calls against the
+stub LLM server. Every call in a wave has the same symptom profile, and each
+wave uses a new one, so the response cache always misses. Runs once with
+single-flight coalescing off and once with it on, and reports upstream
+calls, the coalescing ratio and wall time.
+
+    python scripts/bench_coalescing.py --threads 50 --waves 5 --latency-ms 800
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=50)
+    parser.add_argument('--waves', type=int, default=5)
+    parser.add_argument('--latency-ms', type=float, default=800)
+    parser.add_argument('--port', type=int, default=8773)
+    args = parser.parse_args()
+
+    from stub_llm_server import serve
+
+    llm = serve(port=args.port, latency_ms=args.latency_ms, token_ms=0)
+    threading.Thread(target=llm.serve_forever, daemon=True).start()
+    os.environ.update(OPENAI_API_KEY='stub', OPENAI_API_BASE=f'http://127.0.0.1:{args.port}/v1',
+                      LLM_MAX_CONCURRENCY=str(args.threads))
+
+    import app as app_module
+    from app import TriageSystem
+    from single_flight import SingleFlight
+
+    patient = {'age': 34, 'gender': 'female', 'conditions': [], 'smoking': 'no', 'alcohol': 'no'}
+    run = 0
+    for enabled in (False, True):
+        single_flight = app_module.single_flight = SingleFlight()
+        single_flight.enabled = enabled
+        started = time.perf_counter()
+        for _ in range(args.waves):
+            run += 1
+            symptoms = {'primary_symptom': f'fever-{run}', 'symptom_severity': 'moderate',
+                        'symptom_onset': 'today', 'additional_symptoms': ['cough']}
+            wave = [threading.Thread(target=TriageSystem.generate_ai_recommendations,
+                                     args=(patient, symptoms, 'urgent')) for _ in range(args.threads)]
+            for thread in wave:
+                thread.start()
+            for thread in wave:
+                thread.join()
+        elapsed = time.perf_counter() - started
+        stats = single_flight.stats()
+        print(f"coalescing {'on ' if enabled else 'off'}  upstream calls {stats['upstream_calls']:5d} "
+              f"of {stats['calls']:5d}  ratio {stats['coalescing_ratio']:.2f}  {elapsed:6.2f}s")
+
+    app_module.llm_client.close()
+    llm.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Concurrent write load against the database with and without pool tuning.
+
+Runs the same workload twice, in a fresh process each time:
+
+  untuned  rollback journal, 5s busy timeout, default 5+10 pool
+  tuned    the DB_* / SQLITE_* settings from config.py (WAL, busy timeout,
+           pool sized for the thread count)
+
+Each worker thread registers a patient, assesses them, posts a chat exchange
+and reads /api/stats. Recommendation jobs go to the stub LLM server, so they
+add background writes too. The script reports errors by kind ("database is
+locked", pool timeouts), throughput, and the pool metrics from
+/api/stats/db-pool.
+
+    python scripts/bench_db_pool.py --threads 32 --iterations 40
+    DATABASE_URL=postgresql://... python scripts/bench_db_pool.py
+"""
+import argparse
+import collections
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+VARIANTS = {
+    'untuned': {'SQLITE_WAL': 'false', 'SQLITE_BUSY_TIMEOUT_MS': '5000',
+                'DB_POOL_SIZE': '5', 'DB_MAX_OVERFLOW': '10', 'DB_POOL_TIMEOUT': '30'},
+    'tuned': {}
+}
+
+
+def run_workload(threads, iterations, llm_port):
+    from stub_llm_server import serve
+
+    llm = serve(port=llm_port, latency_ms=50, token_ms=0)
+    threading.Thread(target=llm.serve_forever, daemon=True).start()
+
+    import app as app_module
+    errors = collections.Counter()
+    completed = [0]
+    lock = threading.Lock()
+
+    def classify(response):
+        text = response.get_data(as_text=True)
+        if 'database is locked' in text:
+            return 'database is locked'
+        if 'QueuePool limit' in text:
+            return 'pool timeout'
+        return f'HTTP {response.status_code}'
+
+    def worker(worker_id):
+        client = app_module.app.test_client()
+        for i in range(iterations):
+            steps = []
+            response = client.post('/api/register', json={
+                'fullName': f'Load {worker_id}-{i}', 'age': 40, 'gender': 'female'})
+            steps.append(response)
+            if response.status_code == 201:
+                patient_id = response.get_json()['patient_id']
+                steps.append(client.post('/api/assess', json={
+                    'patient_id': patient_id, 'primary_symptom': 'fever', 'symptom_onset': 'today',
+                    'symptom_severity': 'moderate', 'additional_symptoms': ['cough'],
+                    'emergency_symptoms': ['none']}))
+                response = client.post('/api/consultation', json={'patient_id': patient_id})
+                steps.append(response)
+                if response.status_code in (200, 201):
+                    steps.append(client.post('/api/chat', json={
+                        'message': 'I have a mild cough', 'patientData': {'age': 40},
+                        'consultation_id': response.get_json()['consultation_id']}))
+            steps.append(client.get('/api/stats'))
+            with lock:
+                for step in steps:
+                    if step.status_code >= 400:
+                        errors[classify(step)] += 1
+                    else:
+                        completed[0] += 1
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    pool_stats = app_module.app.test_client().get('/api/stats/db-pool').get_json()
+    llm.shutdown()
+    return {'ok': completed[0], 'errors': dict(errors), 'requests_per_second': completed[0] / elapsed,
+            'pool': pool_stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--iterations', type=int, default=40)
+    parser.add_argument('--llm-port', type=int, default=8771)
+    parser.add_argument('--variant', choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        result = run_workload(args.threads, args.iterations, args.llm_port)
+        print(json.dumps(result))
+        return
+
+    for name, overrides in VARIANTS.items():
+        env = dict(os.environ, **overrides, FLASK_CONFIG='production', OPENAI_API_KEY='stub',
+                   OPENAI_API_BASE=f'http://127.0.0.1:{args.llm_port}/v1')
+        if 'DATABASE_URL' not in os.environ:
+            env['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_pool.db')}"
+        output = subprocess.run(
+            [sys.executable, __file__, '--variant', name, '--threads', str(args.threads),
+             '--iterations', str(args.iterations), '--llm-port', str(args.llm_port)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        pool = result['pool']
+        print(f"{name:<8} {result['requests_per_second']:7.0f} req/s  ok {result['ok']:6d}  "
+              f"errors {result['errors'] or 'none'}")
+        print(f"         pool size {pool.get('size')}, overflow {pool.get('overflow')}, "
+              f"checkouts {pool.get('checkouts')}, wait avg {pool.get('wait_ms_avg')}ms "
+              f"max {pool.get('wait_ms_max')}ms, timeouts {pool.get('timeouts')}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Emergency alert latency: time to enqueue and time until every notifier is done.
+
+Points the SMS and provider webhook notifiers at the stub notifier server,
+posts a burst of /api/emergency alerts at random coordinates and waits for
+the dispatcher to deliver them. Reports how long the HTTP call took (the
+enqueue), the end-to-end dispatch latency from the dispatcher's stats, and
+whether its p95 meets --target-ms.
+
+    python scripts/bench_emergency_dispatch.py --alerts 200 --latency-ms 150 --failure-rate 0.05
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--alerts', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=150, help='stub notifier latency')
+    parser.add_argument('--failure-rate', type=float, default=0.05)
+    parser.add_argument('--workers', type=int, default=16, help='EMERGENCY_DISPATCH_WORKERS')
+    parser.add_argument('--target-ms', type=float, default=2000, help='end-to-end p95 target')
+    parser.add_argument('--port', type=int, default=8774)
+    args = parser.parse_args()
+
+    from stub_notifier_server import StubNotifierHandler, serve
+
+    notifier = serve(port=args.port, latency_ms=args.latency_ms, failure_rate=args.failure_rate)
+    threading.Thread(target=notifier.serve_forever, daemon=True).start()
+    os.environ.update(
+        EMERGENCY_SMS_GATEWAY_URL=f'http://127.0.0.1:{args.port}/sms',
+        EMERGENCY_PROVIDER_WEBHOOK_URL=f'http://127.0.0.1:{args.port}/webhook',
+        EMERGENCY_LOG_PATH=os.path.join(tempfile.mkdtemp(), 'emergency.jsonl'),
+        EMERGENCY_DISPATCH_WORKERS=str(args.workers), EMERGENCY_RETRY_BASE='0.2', EMERGENCY_RETRY_MAX='2'
+    )
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_emergency.db')}"
+
+    from app import app, emergency_dispatcher
+
+    client = app.test_client()
+    rng = random.Random(7)
+    enqueue = []
+    for i in range(args.alerts):
+        started = time.perf_counter()
+        response = client.post('/api/emergency', json={
+            'patient_id': None, 'symptoms': ['chest_pain', 'breathing_difficulty'],
+            'latitude': rng.uniform(20, 30), 'longitude': rng.uniform(70, 82)
+        })
+        enqueue.append(time.perf_counter() - started)
+        assert response.status_code == 202, response.get_json()
+
+    started = time.perf_counter()
+    while True:
+        deliveries = client.get('/api/stats/emergency').get_json()['deliveries']
+        if not deliveries.get('pending') and not deliveries.get('sending'):
+            break
+        time.sleep(0.1)
+    drained = time.perf_counter() - started
+
+    stats = emergency_dispatcher.stats()
+    enqueue.sort()
+    print(f"enqueue   p50 {enqueue[len(enqueue) // 2] * 1000:7.1f}ms  "
+          f"p95 {enqueue[int(len(enqueue) * 0.95) - 1] * 1000:7.1f}ms")
+    print(f"dispatch  p50 {stats['latency_ms_p50']:7.1f}ms  p95 {stats['latency_ms_p95']:7.1f}ms  "
+          f"max {stats['latency_ms_max']:7.1f}ms  (queue drained {drained:.2f}s after the last alert)")
+    print(f"deliveries {deliveries}  retried {stats['retried']}  "
+          f"stub received {dict(StubNotifierHandler.received)}")
+    met = stats['latency_ms_p95'] <= args.target_ms
+    print(f"p95 target {args.target_ms:.0f}ms {'met' if met else 'MISSED'}")
+
+    notifier.shutdown()
+    sys.exit(0 if met else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Bytes, SQL statements and time for repeat reads of cached endpoints.
+
+Fills a scratch SQLite database with patients, assessments and providers,
+then has a client re-read /api/patient/<id>, /api/assessments/<id> and
+/api/providers in three ways:
+
+  uncached      HTTP_CACHE_ENABLED=false and no validators (the old behaviour)
+  cached        server-side response cache, client sends no validators
+  revalidating  server-side cache, client sends If-None-Match and gets 304s
+
+    python scripts/bench_http_cache.py --patients 200 --rounds 20
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=200)
+    parser.add_argument('--assessments', type=int, default=30, help='per patient')
+    parser.add_argument('--providers', type=int, default=5000)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_http_cache.db')}"
+    os.environ['METRICS_ENABLED'] = 'false'
+
+    from sqlalchemy import event
+    from app import app, db, http_cache, Assessment, HealthcareProvider, Patient
+
+    rng = random.Random(11)
+    with app.app_context():
+        db.session.execute(db.insert(Patient), [
+            {'full_name': f'Patient {i}', 'age': rng.randint(1, 90), 'gender': 'female', 'medical_conditions': []}
+            for i in range(args.patients)
+        ])
+        patient_ids = [row.id for row in db.session.query(Patient.id)]
+        db.session.execute(db.insert(Assessment), [{
+            'patient_id': patient_id, 'primary_symptom': 'fever', 'symptom_onset': 'today',
+            'symptom_severity': 'mild', 'triage_level': 'routine'
+        } for patient_id in patient_ids for _ in range(args.assessments)])
+        db.session.execute(db.insert(HealthcareProvider), [{
+            'name': f'Dr. Provider {i}', 'specialization': 'General Medicine',
+            'location': f'PHC Block {i % 300}, Gujarat', 'latitude': rng.uniform(20, 24), 'longitude': rng.uniform(69, 74)
+        } for i in range(args.providers)])
+        db.session.commit()
+        engine = db.engine
+
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda *a: statements.append(1))
+    client = app.test_client()
+    paths = [path for patient_id in patient_ids[:50]
+             for path in (f'/api/patient/{patient_id}', f'/api/assessments/{patient_id}')]
+    paths += ['/api/providers?location=Gujarat&limit=50', '/api/providers?lat=22.3&lng=71.2&k=20']
+
+    for mode in ('uncached', 'cached', 'revalidating'):
+        http_cache.enabled = mode != 'uncached'
+        etags = {}
+        for path in paths:
+            etags[path] = client.get(path).headers.get('ETag')
+
+        statements.clear()
+        transferred, not_modified = 0, 0
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            for path in paths:
+                headers = {'If-None-Match': etags[path]} if mode == 'revalidating' and etags[path] else {}
+                response = client.get(path, headers=headers)
+                transferred += len(response.get_data())
+                not_modified += response.status_code == 304
+        elapsed = time.perf_counter() - started
+        requests = args.rounds * len(paths)
+        print(f"{mode:<13} {elapsed / requests * 1e6:8.1f}us/request  "
+              f"{transferred / requests:9.1f} bytes/request  {len(statements) / requests:5.2f} SQL/request  "
+              f"{not_modified:6d} x 304")
+
+
+if __name__ == '__main__':
+    main()
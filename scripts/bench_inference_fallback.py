@@ -0,0 +1,114 @@
+"""/api/chat latency while the LLM API is slow, with and without fallbacks.
+
+Points the app at the stub LLM server with a latency above LLM_TIMEOUT, so
+every remote call times out, and sends chat messages that partly repeat
+earlier questions in the chat history. Each variant runs in a fresh process:
+
+  timeout  no local engine, no hedging, breaker effectively off: every
+           request waits out the full LLM_TIMEOUT (the original behaviour)
+  hedged   answer bank with hedging; breaker effectively off
+  breaker  answer bank, hedging and the circuit breaker (the defaults)
+
+    python scripts/bench_inference_fallback.py --requests 60 --timeout 2
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+HISTORY = [
+    ('I have had a fever and cough for two days', 'Rest, drink plenty of fluids and take paracetamol for the fever.'),
+    ('My child has loose motions since morning', 'Give ORS after every loose motion and keep breastfeeding or feeding.'),
+    ('What should I eat when I have diabetes', 'Eat whole grains, vegetables and dal, and avoid sweets and sugary drinks.'),
+    ('My knee joint hurts when I climb stairs', 'Apply a warm compress, avoid heavy lifting and try gentle stretching.'),
+]
+QUESTIONS = [
+    'fever and cough for two days, what to do?',
+    'my child has loose motions',
+    'what should a diabetes patient eat',
+    'is it safe to travel by bus after an operation',
+]
+
+VARIANTS = {
+    'timeout': {'LOCAL_INFERENCE_BACKEND': 'none', 'LLM_HEDGE_AFTER': '0', 'LLM_BREAKER_FAILURES': '1000000'},
+    'hedged': {'LLM_BREAKER_FAILURES': '1000000'},
+    'breaker': {}
+}
+
+
+def run_workload(requests, llm_port):
+    from stub_llm_server import serve
+
+    llm = serve(port=llm_port, latency_ms=60000, token_ms=0)
+    threading.Thread(target=llm.serve_forever, daemon=True).start()
+
+    from app import app, db, ChatMessage, Consultation, Patient
+
+    with app.app_context():
+        patient = Patient(full_name='Bench Patient', age=40, gender='female')
+        db.session.add(patient)
+        db.session.flush()
+        consultation = Consultation(patient_id=patient.id, cost=50)
+        db.session.add(consultation)
+        db.session.flush()
+        for question, reply in HISTORY:
+            db.session.add(ChatMessage(consultation_id=consultation.id, sender='user', content=question))
+            db.session.add(ChatMessage(consultation_id=consultation.id, sender='doctor', content=reply))
+        db.session.commit()
+
+    client = app.test_client()
+    latencies = []
+    for i in range(requests):
+        started = time.perf_counter()
+        client.post('/api/chat', json={'message': QUESTIONS[i % len(QUESTIONS)], 'language': 'en'})
+        latencies.append(time.perf_counter() - started)
+
+    stats = client.get('/api/stats/inference').get_json()
+    latencies.sort()
+    return {
+        'mean_ms': sum(latencies) / len(latencies) * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'total_s': sum(latencies),
+        'replies': stats['replies']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=60)
+    parser.add_argument('--timeout', type=float, default=2.0, help='LLM_TIMEOUT in seconds')
+    parser.add_argument('--llm-port', type=int, default=8772)
+    parser.add_argument('--variant', choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_workload(args.requests, args.llm_port)))
+        return
+
+    for name, overrides in VARIANTS.items():
+        env = dict(
+            os.environ, OPENAI_API_KEY='stub', OPENAI_API_BASE=f'http://127.0.0.1:{args.llm_port}/v1',
+            LLM_TIMEOUT=str(args.timeout), LLM_HEDGE_AFTER=str(args.timeout / 4), LLM_BREAKER_RESET='3600',
+            DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_inference.db')}"
+        )
+        env.update(overrides)
+        output = subprocess.run(
+            [sys.executable, __file__, '--variant', name, '--requests', str(args.requests),
+             '--llm-port', str(args.llm_port)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{name:<8} mean {result['mean_ms']:8.1f}ms  p95 {result['p95_ms']:8.1f}ms  "
+              f"total {result['total_s']:6.1f}s  replies {result['replies']}")
+
+
+if __name__ == '__main__':
+    main()
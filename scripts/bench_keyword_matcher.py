@@ -0,0 +1,84 @@
+"""Per-message cost of keyword detection as the keyword table grows.
+
+Pads the shipped multilingual table with synthetic phrases and times the
+compiled KeywordMatcher against the old linear ``any(k in message)`` scan.
+
+    python scripts/bench_keyword_matcher.py --sizes 100 1000 5000 20000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from keyword_matcher import KeywordMatcher
+
+MESSAGES = [
+    "I have had a fever and a bad cough since yesterday, what should I do?",
+    "My father says he has chest pain and his left arm feels heavy",
+    "मुझे तीन दिन से बुखार है और सिर में दर्द हो रहा है",
+    "எனக்கு இரண்டு நாட்களாக காய்ச்சல் மற்றும் தலைவலி உள்ளது",
+    "Can you tell me what food is good for a child recovering from diarrhea?",
+]
+
+ALPHABETS = [
+    'abcdefghijklmnopqrstuvwxyz',
+    'कखगघचछजझटठडढणतथदधनपफबभमयरलवशसह',
+    'அஆஇஈஉஊஎஏஐஒஓகஙசஞடணதநபமயரலவழளறன',
+]
+
+
+def synthetic_table(base, size, seed=7):
+    rng = random.Random(seed)
+    table = {lang: {cat: list(phrases) for cat, phrases in cats.items()} for lang, cats in base.items()}
+    categories = ['emergency', 'pain', 'symptom', 'duration']
+    for i in range(size):
+        alphabet = ALPHABETS[i % len(ALPHABETS)]
+        words = [''.join(rng.choice(alphabet) for _ in range(rng.randint(3, 9)))
+                 for _ in range(rng.randint(1, 3))]
+        table.setdefault('synthetic', {}).setdefault(rng.choice(categories), []).append(' '.join(words))
+    return table
+
+
+def time_per_message(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in MESSAGES:
+            func(message)
+    return (time.perf_counter() - start) / (repeat * len(MESSAGES)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[0, 100, 1000, 5000, 20000])
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, 'data', 'medical_keywords.json'), encoding='utf-8') as f:
+        data = json.load(f)
+    base_table, categories = data['keywords'], data['categories']
+
+    print(f"{'phrases':>8} {'build ms':>9} {'compiled us/msg':>16} {'linear us/msg':>14}")
+    for size in args.sizes:
+        table = synthetic_table(base_table, size)
+        started = time.perf_counter()
+        matcher = KeywordMatcher(table, categories)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        phrases = [(p.casefold(), c) for cats in table.values() for c, ps in cats.items() for p in ps]
+
+        def linear(message):
+            message = message.lower()
+            return {category for phrase, category in phrases if phrase in message}
+
+        compiled_us = time_per_message(matcher.match, args.repeat)
+        linear_us = time_per_message(linear, max(1, args.repeat // 20))
+        print(f"{len(matcher):>8} {build_ms:>9.1f} {compiled_us:>16.2f} {linear_us:>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
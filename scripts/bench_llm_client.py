@@ -0,0 +1,96 @@
+"""Throughput of the pooled LLM client against the local stub server.
+
+Compares the old pattern (blocking openai.ChatCompletion.create, one call per
+sync worker) with LLMClient, where request threads only wait on futures and
+the number of in-flight API calls is capped by the client's semaphore.
+
+    python scripts/bench_llm_client.py --requests 200 --workers 4 --threads 64
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openai
+
+from llm_client import LLMClient
+from stub_llm_server import serve
+
+MESSAGES = [{"role": "user", "content": "I have had a fever since yesterday."}]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+def run(label, call, requests, concurrency):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def one(_):
+        start = time.perf_counter()
+        try:
+            call()
+        except Exception as e:
+            with lock:
+                errors.append(type(e).__name__)
+            return
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    print(f"{label:<28} {requests / elapsed:8.1f} req/s  "
+          f"p50={percentile(latencies, 50) * 1000:7.1f}ms  "
+          f"p95={percentile(latencies, 95) * 1000:7.1f}ms  "
+          f"p99={percentile(latencies, 99) * 1000:7.1f}ms  "
+          f"errors={len(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=4, help='sync gunicorn workers being modelled')
+    parser.add_argument('--threads', type=int, default=64, help='request threads waiting on the client')
+    parser.add_argument('--max-concurrency', type=int, default=32)
+    parser.add_argument('--latency-ms', type=float, default=500)
+    parser.add_argument('--jitter-ms', type=float, default=200)
+    parser.add_argument('--timeout', type=float, default=5)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    server = serve(port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    openai.api_key = 'stub'
+    openai.api_base = f'http://127.0.0.1:{args.port}/v1'
+
+    run(f'blocking x{args.workers} workers',
+        lambda: openai.ChatCompletion.create(model='gpt-4', messages=MESSAGES, request_timeout=args.timeout),
+        args.requests, args.workers)
+
+    client = LLMClient()
+    client.max_concurrency = args.max_concurrency
+    client.default_timeout = args.timeout
+    run(f'LLMClient x{args.threads} threads',
+        lambda: client.complete(MESSAGES),
+        args.requests, args.threads)
+
+    client.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
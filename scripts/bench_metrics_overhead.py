@@ -0,0 +1,73 @@
+"""Per-request cost of the /metrics instrumentation.
+
+Times a mix of cheap, database-bound requests (stats, provider search,
+patient lookup) through the test client, with no LLM calls. Each variant
+runs in a fresh process:
+
+  off      METRICS_ENABLED=false
+  on       instrumentation with the default 1% query-trace sampling
+  traced   every request records a query trace (the worst case)
+
+    python scripts/bench_metrics_overhead.py --requests 5000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+VARIANTS = {
+    'off': {'METRICS_ENABLED': 'false'},
+    'on': {},
+    'traced': {'METRICS_TRACE_SAMPLE_RATE': '1', 'METRICS_SLOW_REQUEST_MS': '1000000'}
+}
+PATHS = ['/api/stats', '/api/providers?location=Gujarat', '/api/patient/1']
+
+
+def run_workload(requests):
+    from app import app
+
+    client = app.test_client()
+    client.post('/api/register', json={'fullName': 'Bench Patient', 'age': 40, 'gender': 'female'})
+    for path in PATHS:
+        client.get(path)
+
+    started = time.perf_counter()
+    for i in range(requests):
+        client.get(PATHS[i % len(PATHS)])
+    elapsed = time.perf_counter() - started
+    return {'us_per_request': elapsed / requests * 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--variant', choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_workload(args.requests)))
+        return
+
+    baseline = None
+    for name, overrides in VARIANTS.items():
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_metrics.db')}")
+        env.update(overrides)
+        output = subprocess.run(
+            [sys.executable, __file__, '--variant', name, '--requests', str(args.requests)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        baseline = baseline or result['us_per_request']
+        overhead = result['us_per_request'] - baseline
+        print(f"{name:<7} {result['us_per_request']:8.1f}us/request  "
+              f"overhead {overhead:+7.1f}us ({overhead / baseline:+6.1%})")
+
+
+if __name__ == '__main__':
+    main()
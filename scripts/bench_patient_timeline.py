@@ -0,0 +1,95 @@
+"""Queries and time to show a patient's history: per-resource calls vs /api/patient/<id>/timeline.
+
+Creates one patient with --visits assessments and --visits consultations
+(each with --messages chat messages) in a scratch SQLite database. The old
+client pattern fetches /api/patient, /api/assessments and every
+consultation's messages separately. The timeline fetches one merged page
+(or, with --all-pages, every page). Reports requests, SQL statements and
+elapsed time for each.
+
+    python scripts/bench_patient_timeline.py --visits 300 --messages 12
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--visits', type=int, default=300)
+    parser.add_argument('--messages', type=int, default=12)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--all-pages', action='store_true', help='walk the whole timeline, not just page one')
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_timeline.db')}"
+    os.environ['METRICS_ENABLED'] = 'false'
+
+    from sqlalchemy import event
+    from app import app, db, Assessment, ChatMessage, Consultation, Patient
+
+    rng = random.Random(3)
+    start = datetime(2024, 1, 1)
+    with app.app_context():
+        patient = Patient(full_name='Bench Patient', age=52, gender='male')
+        db.session.add(patient)
+        db.session.flush()
+        patient_id = patient.id
+        db.session.execute(db.insert(Assessment), [{
+            'patient_id': patient_id, 'primary_symptom': rng.choice(['fever', 'cough', 'headache']),
+            'symptom_onset': 'today', 'symptom_severity': 'moderate', 'triage_level': 'routine',
+            'recommendation_status': 'ready', 'created_at': start + timedelta(hours=rng.randrange(24 * 365))
+        } for _ in range(args.visits)])
+        db.session.execute(db.insert(Consultation), [{
+            'patient_id': patient_id, 'cost': 50, 'created_at': start + timedelta(hours=rng.randrange(24 * 365))
+        } for _ in range(args.visits)])
+        consultation_ids = [c.id for c in Consultation.query.filter_by(patient_id=patient_id)]
+        db.session.execute(db.insert(ChatMessage), [{
+            'consultation_id': consultation_id, 'sender': 'user' if i % 2 == 0 else 'doctor',
+            'content': f'message {i}', 'timestamp': start + timedelta(minutes=i)
+        } for consultation_id in consultation_ids for i in range(args.messages)])
+        db.session.commit()
+        engine = db.engine
+
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda *a: statements.append(1))
+    client = app.test_client()
+
+    def measure(fetch):
+        statements.clear()
+        started = time.perf_counter()
+        requests = fetch()
+        return requests, len(statements), (time.perf_counter() - started) * 1000
+
+    def per_resource():
+        client.get(f'/api/patient/{patient_id}')
+        client.get(f'/api/assessments/{patient_id}')
+        for consultation_id in consultation_ids:
+            client.get(f'/api/consultation/{consultation_id}/messages')
+        return 2 + len(consultation_ids)
+
+    def timeline():
+        requests, cursor = 0, None
+        while True:
+            query = f'limit={args.page_size}' + (f'&before={cursor}' if cursor else '')
+            page = client.get(f'/api/patient/{patient_id}/timeline?{query}').get_json()
+            requests += 1
+            cursor = page['next_cursor']
+            if not args.all_pages or not page['has_more']:
+                return requests
+
+    for name, fetch in (('per-resource', per_resource), ('timeline', timeline)):
+        requests, queries, elapsed = measure(fetch)
+        print(f"{name:<13} {requests:5d} requests  {queries:6d} SQL statements  {elapsed:8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
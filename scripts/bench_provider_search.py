@@ -0,0 +1,79 @@
+"""Provider search latency: ILIKE table scans vs the in-memory ProviderIndex.
+
+Loads a synthetic district registry into a scratch SQLite database and times
+the old ILIKE filters against location, specialization and nearest-provider
+queries served by the index.
+
+    python scripts/bench_provider_search.py --providers 50000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STATES = ['Rajasthan', 'Uttar Pradesh', 'Gujarat', 'Punjab', 'Kerala', 'Tamil Nadu', 'Bihar', 'Odisha']
+SPECIALIZATIONS = ['General Medicine', 'Pediatrics', 'Emergency Medicine', 'Gynecology', 'Orthopedics']
+
+
+def timed(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--providers', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        path = os.path.join(tempfile.mkdtemp(), 'bench_providers.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+
+    import app as app_module
+    from app import app, db, HealthcareProvider
+
+    rng = random.Random(5)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.execute(db.insert(HealthcareProvider), [{
+            'name': f'Dr. Provider {i}',
+            'specialization': rng.choice(SPECIALIZATIONS),
+            'location': f'PHC Block {i % 700}, {rng.choice(STATES)}',
+            'latitude': rng.uniform(8, 35),
+            'longitude': rng.uniform(68, 95)
+        } for i in range(args.providers)])
+        db.session.commit()
+
+        def ilike():
+            return HealthcareProvider.query \
+                .filter(HealthcareProvider.location.ilike('%odisha%')) \
+                .filter(HealthcareProvider.specialization.ilike('%pedia%')).all()
+
+        build_ms, _ = timed(lambda: app_module.provider_index.build(app_module.load_provider_rows()), 1)
+        print(f"index build for {args.providers} providers: {build_ms:.0f}ms")
+
+        cases = [
+            ('ILIKE location+specialization', ilike),
+            ('index location+specialization',
+             lambda: app_module.search_providers(location='odisha', specialization='pedia')),
+            ('index 10 nearest',
+             lambda: app_module.search_providers(lat=21.5, lng=84.0, k=10)),
+            ('index 10 nearest pediatrics',
+             lambda: app_module.search_providers(lat=21.5, lng=84.0, k=10, specialization='pedia')),
+        ]
+        for label, func in cases:
+            ms, result = timed(func, args.repeat)
+            print(f"{label:<32} {ms:8.2f}ms  ({len(result)} results)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Latency of /api/stats as the assessment table grows.
+
+Fills a scratch SQLite database with synthetic assessments and times three
+ways of producing the statistics:
+
+  legacy     seven separate COUNT queries (the original implementation)
+  aggregated compute_statistics(): one GROUP BY plus one scalar-subquery select
+  counters   the stat_counter table read by /api/stats
+
+    python scripts/bench_stats.py --rows 1000000
+    DATABASE_URL=postgresql://... python scripts/bench_stats.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--chunk', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        path = os.path.join(tempfile.mkdtemp(), 'bench_stats.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+
+    import app as app_module
+    from app import app, db, Assessment, Patient, Consultation, HealthcareProvider, StatCounter
+
+    with app.app_context():
+        db.drop_all()
+        app_module.create_tables()
+        db.session.add(Patient(full_name='Bench Patient', age=40, gender='female'))
+        db.session.commit()
+
+        print(f"Inserting {args.rows} assessments...")
+        rng = random.Random(1)
+        levels = ['routine'] * 6 + ['urgent'] * 3 + ['emergency']
+        for start in range(0, args.rows, args.chunk):
+            db.session.execute(db.insert(Assessment), [{
+                'patient_id': 1,
+                'primary_symptom': 'fever',
+                'symptom_onset': 'today',
+                'symptom_severity': 'mild',
+                'triage_level': rng.choice(levels)
+            } for _ in range(min(args.chunk, args.rows - start))])
+            db.session.commit()
+        app_module.seed_stat_counters()
+
+        def legacy():
+            return {
+                'total_patients': Patient.query.count(),
+                'total_assessments': Assessment.query.count(),
+                'total_consultations': Consultation.query.count(),
+                'emergency_cases': Assessment.query.filter_by(triage_level='emergency').count(),
+                'urgent_cases': Assessment.query.filter_by(triage_level='urgent').count(),
+                'routine_cases': Assessment.query.filter_by(triage_level='routine').count(),
+                'providers': HealthcareProvider.query.count()
+            }
+
+        def counters():
+            return dict(db.session.query(StatCounter.name, StatCounter.value).all())
+
+        results = {}
+        for label, func in (('legacy', legacy), ('aggregated', app_module.compute_statistics),
+                            ('counters', counters)):
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                results[label] = func()
+                timings.append(time.perf_counter() - started)
+                db.session.rollback()
+            print(f"{label:<11} best {min(timings) * 1000:9.2f}ms  worst {max(timings) * 1000:9.2f}ms")
+
+        assert results['legacy'] == results['aggregated'] == results['counters'], results
+
+        client = app.test_client()
+        started = time.perf_counter()
+        for _ in range(100):
+            client.get('/api/stats')
+        print(f"GET /api/stats mean {(time.perf_counter() - started) * 10:.2f}ms over 100 requests")
+
+
+if __name__ == '__main__':
+    main()
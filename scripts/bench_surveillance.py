@@ -0,0 +1,95 @@
+"""Rebuild time, update cost and spike detection for the outbreak monitor.
+
+Fills a scratch SQLite database with --assessments assessments spread over
+the baseline period across --locations villages and a handful of symptoms,
+then injects --spike fever cases into one village within the last day.
+Reports:
+
+  rebuild    time to recount everything from the database (a worker restart)
+  record     per-assessment cost of counting a newly committed assessment
+  read       latency of GET /api/surveillance?anomalous=true
+  detection  whether the injected spike is flagged, and any false alarms
+
+    python scripts/bench_surveillance.py --assessments 200000 --spike 25
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SYMPTOMS = ['fever', 'cough', 'headache', 'diarrhea', 'body_ache', 'rash']
+TRIAGE_LEVELS = ['routine', 'routine', 'routine', 'urgent']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--assessments', type=int, default=200000)
+    parser.add_argument('--locations', type=int, default=200)
+    parser.add_argument('--spike', type=int, default=25, help='extra fever cases in one village today')
+    parser.add_argument('--records', type=int, default=100000)
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_surveillance.db')}"
+    os.environ['METRICS_ENABLED'] = 'false'
+
+    from app import app, db, load_surveillance_rows, outbreak_monitor, Assessment, Patient
+
+    rng = random.Random(21)
+    now = datetime.utcnow()
+    horizon = timedelta(seconds=outbreak_monitor.horizon_seconds)
+    with app.app_context():
+        db.session.execute(db.insert(Patient), [
+            {'full_name': f'Patient {i}', 'age': rng.randint(1, 90), 'gender': 'female',
+             'location': f'Village {i % args.locations}', 'medical_conditions': []}
+            for i in range(args.locations * 5)
+        ])
+        patients = db.session.query(Patient.id, Patient.location).all()
+        spike_patients = [patient_id for patient_id, location in patients if location == 'Village 0']
+        rows = [{
+            'patient_id': rng.choice(patients)[0], 'primary_symptom': rng.choice(SYMPTOMS),
+            'symptom_onset': 'today', 'symptom_severity': 'mild', 'triage_level': rng.choice(TRIAGE_LEVELS),
+            'created_at': now - horizon * rng.random()
+        } for _ in range(args.assessments)]
+        rows += [{
+            'patient_id': rng.choice(spike_patients), 'primary_symptom': 'fever',
+            'symptom_onset': 'today', 'symptom_severity': 'moderate', 'triage_level': 'routine',
+            'created_at': now - timedelta(hours=20 * rng.random())
+        } for _ in range(args.spike)]
+        for start in range(0, len(rows), 10000):
+            db.session.execute(db.insert(Assessment), rows[start:start + 10000])
+        db.session.commit()
+
+        started = time.perf_counter()
+        outbreak_monitor.rebuild(load_surveillance_rows)
+        print(f"rebuild    {(time.perf_counter() - started) * 1000:8.1f}ms for {len(rows)} assessments, "
+              f"{outbreak_monitor.stats()['keys']} keys")
+
+    client = app.test_client()
+    started = time.perf_counter()
+    response = client.get('/api/surveillance?anomalous=true&limit=1000').get_json()
+    print(f"read       {(time.perf_counter() - started) * 1000:8.1f}ms")
+
+    flagged = {(s['location'], s['symptom'], s['triage_level']) for s in response['signals']}
+    spike_key = ('village 0', 'fever', 'routine')
+    print(f"detection  spike {'flagged' if spike_key in flagged else 'MISSED'}, "
+          f"{len(flagged - {spike_key})} other keys flagged")
+
+    start_id = 10 ** 9
+    started = time.perf_counter()
+    for i in range(args.records):
+        outbreak_monitor.record(
+            start_id + i, f'Village {i % args.locations}', SYMPTOMS[i % len(SYMPTOMS)], 'routine', now
+        )
+    elapsed = time.perf_counter() - started
+    print(f"record     {elapsed / args.records * 1e6:8.2f}us/assessment")
+
+
+if __name__ == '__main__':
+    main()
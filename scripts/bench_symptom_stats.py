@@ -0,0 +1,100 @@
+"""Symptom frequency queries: decoding JSON per row vs the assessment_symptom index.
+
+Fills a scratch SQLite database with synthetic assessments, each reporting a
+few additional and emergency symptoms, and times two ways of counting the
+most reported symptoms:
+
+  decode   read every assessment's symptom lists and count them in Python
+           (the only option while the lists were json.dumps text)
+  indexed  the GROUP BY over assessment_symptom behind /api/stats/symptoms
+
+    python scripts/bench_symptom_stats.py --rows 200000
+    DATABASE_URL=postgresql://... python scripts/bench_symptom_stats.py
+"""
+import argparse
+import collections
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ADDITIONAL = ['cough', 'headache', 'nausea', 'fatigue', 'dizziness', 'rash', 'body_ache', 'chills']
+EMERGENCY = ['none'] * 20 + ['chest_pain', 'unconscious', 'severe_bleeding']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--chunk', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        path = os.path.join(tempfile.mkdtemp(), 'bench_symptoms.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+
+    import app as app_module
+    from app import app, db, Assessment, AssessmentSymptom, Patient
+
+    with app.app_context():
+        db.drop_all()
+        app_module.create_tables()
+        db.session.add(Patient(full_name='Bench Patient', age=40, gender='female'))
+        db.session.commit()
+
+        print(f"Inserting {args.rows} assessments...")
+        rng = random.Random(1)
+        next_id = 1
+        for start in range(0, args.rows, args.chunk):
+            assessments, symptoms = [], []
+            for _ in range(min(args.chunk, args.rows - start)):
+                lists = {'additional': rng.sample(ADDITIONAL, rng.randint(0, 3)),
+                         'emergency': [rng.choice(EMERGENCY)]}
+                assessments.append({
+                    'id': next_id, 'patient_id': 1, 'primary_symptom': 'fever', 'symptom_onset': 'today',
+                    'symptom_severity': 'mild', 'triage_level': 'routine',
+                    'additional_symptoms': lists['additional'], 'emergency_symptoms': lists['emergency']
+                })
+                symptoms.extend(app_module.assessment_symptom_rows(next_id, lists))
+                next_id += 1
+            db.session.execute(db.insert(Assessment), assessments)
+            db.session.execute(db.insert(AssessmentSymptom), symptoms)
+            db.session.commit()
+
+        def decode():
+            counts = collections.Counter()
+            for row in db.session.query(Assessment.additional_symptoms, Assessment.emergency_symptoms):
+                counts.update(('additional', symptom) for symptom in row.additional_symptoms or [])
+                counts.update(('emergency', symptom) for symptom in row.emergency_symptoms or [])
+            return dict(counts)
+
+        def indexed():
+            return {(row.kind, row.symptom): row[2] for row in db.session.query(
+                AssessmentSymptom.kind, AssessmentSymptom.symptom, db.func.count()
+            ).group_by(AssessmentSymptom.kind, AssessmentSymptom.symptom)}
+
+        results = {}
+        for label, func in (('decode', decode), ('indexed', indexed)):
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                results[label] = func()
+                timings.append(time.perf_counter() - started)
+                db.session.rollback()
+            print(f"{label:<8} best {min(timings) * 1000:9.2f}ms  worst {max(timings) * 1000:9.2f}ms")
+
+        assert results['decode'] == results['indexed']
+
+        client = app.test_client()
+        started = time.perf_counter()
+        for _ in range(100):
+            client.get('/api/stats/symptoms?kind=emergency')
+        print(f"GET /api/stats/symptoms mean {(time.perf_counter() - started) * 10:.2f}ms over 100 requests")
+
+
+if __name__ == '__main__':
+    main()
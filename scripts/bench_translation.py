@@ -0,0 +1,95 @@
+"""Translation throughput and backend calls, one call per message vs batched and cached.
+
+Translates --messages doctor replies built from a pool of --phrases
+sentences (replies repeat phrases, as canned and LLM advice does) from
+--concurrency threads, with the stub backend taking --latency-ms per call:
+
+  per-message  one backend call per reply, nothing cached
+  batched      TranslationService: sentence cache plus the shared batcher
+  warm         the same service again, with the cache reloaded from disk
+
+    python scripts/bench_translation.py --messages 2000 --latency-ms 150
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from translation import StubBackend, TranslationCache, TranslationService
+
+LANGUAGES = ('hi', 'bn', 'ta', 'te', 'mr')
+
+
+def replies(count, phrases, rng):
+    pool = [f'Advice number {i} is to rest, drink fluids and watch the fever.' for i in range(phrases)]
+    return [(' '.join(rng.sample(pool, 3)), rng.choice(LANGUAGES)) for _ in range(count)]
+
+
+def run(translate, messages, concurrency):
+    latencies = []
+
+    def one(item):
+        started = time.perf_counter()
+        translate(*item)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, messages))
+    return time.perf_counter() - started, statistics.median(latencies)
+
+
+def service(backend, cache_path, args):
+    translation = TranslationService()
+    translation.backend = backend
+    translation.batch_size = args.batch_size
+    translation.concurrency = args.backend_concurrency
+    translation.timeout = 30.0
+    translation.cache = TranslationCache(cache_path)
+    translation.cache.load()
+    return translation
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--phrases', type=int, default=200, help='distinct sentences replies are built from')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--latency-ms', type=float, default=150, help='stub backend time per call')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--backend-concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    messages = replies(args.messages, args.phrases, random.Random(24))
+    cache_path = os.path.join(tempfile.mkdtemp(), 'translations.jsonl')
+
+    class CountingBackend(StubBackend):
+        calls = 0
+
+        def translate_batch(self, texts, target, source='auto'):
+            CountingBackend.calls += 1
+            return super().translate_batch(texts, target, source)
+
+    backend = CountingBackend(args.latency_ms)
+    for name in ('per-message', 'batched', 'warm'):
+        if name == 'per-message':
+            def translate(text, target):
+                return backend.translate_batch([text], target, 'en')[0]
+        else:
+            # warm reloads the file the batched run wrote, like a restarted worker
+            translate = service(backend, cache_path, args).translate
+        CountingBackend.calls = 0
+        elapsed, median_ms = run(translate, messages, args.concurrency)
+        print(f"{name:<12} {len(messages) / elapsed:8.1f} replies/s  median {median_ms:7.1f}ms  "
+              f"backend calls {CountingBackend.calls:5d}")
+
+
+if __name__ == '__main__':
+    main()
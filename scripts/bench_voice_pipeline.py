@@ -0,0 +1,167 @@
+"""API latency while voice messages are processed, with audio work in-process vs on the pool.
+
+Runs the app on a local threaded server with the offline stub recognizer
+(--cpu-ms of busy work per second of audio) and the stub LLM server. It
+uploads --messages recordings from --concurrency clients, and meanwhile a
+probe client times GET /api/stats. Each variant runs in a fresh process:
+
+  inline  transcoding and transcription run on the request thread (no pool)
+  pool    the default: VOICE_WORKERS pool processes
+
+Reports probe p50/p95 during the load, voice end-to-end p50/p95 and the
+per-stage timings from /api/stats/voice. Needs pydub installed.
+
+    python scripts/bench_voice_pipeline.py --messages 40 --seconds 5 --cpu-ms 300
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+VARIANTS = ('inline', 'pool')
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[max(int(len(ordered) * fraction) - 1, 0)] if ordered else None
+
+
+def recording(seconds):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as audio:
+        audio.setnchannels(1)
+        audio.setsampwidth(2)
+        audio.setframerate(16000)
+        audio.writeframes(b'\0\0' * 16000 * seconds)
+    return buffer.getvalue()
+
+
+def run_variant(variant, args):
+    from stub_llm_server import serve
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    llm = serve(port=args.llm_port, latency_ms=50, token_ms=0)
+    threading.Thread(target=llm.serve_forever, daemon=True).start()
+
+    import app as app_module
+    from voice_pipeline import process_audio
+
+    if variant == 'inline':
+        pipeline = app_module.voice_pipeline
+
+        def submit_inline(path, language, on_done):
+            transcript, seconds, timings = process_audio(
+                path, language, pipeline.recognizer, pipeline.recognizer_options, pipeline.max_seconds, time.time()
+            )
+            pipeline.observe(timings)
+            on_done({'transcript': transcript, 'seconds': seconds, 'timings': timings})
+
+        pipeline.submit = submit_inline
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', args.app_port, app_module.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{args.app_port}'
+
+    patient_id = requests.post(f'{base}/api/register', json={
+        'fullName': 'Bench Patient', 'age': 45, 'gender': 'male'
+    }).json()['patient_id']
+    consultation_id = requests.post(f'{base}/api/consultation', json={
+        'patient_id': patient_id, 'audio_enabled': True
+    }).json()['consultation_id']
+    body = recording(args.seconds)
+
+    def send_voice(_):
+        started = time.perf_counter()
+        while True:
+            response = requests.post(f'{base}/api/consultation/{consultation_id}/voice', data=body,
+                                     headers={'Content-Type': 'audio/wav'})
+            if response.status_code != 503:
+                break
+            time.sleep(0.2)
+        voice_id = response.json()['voice_id']
+        while requests.get(f'{base}/api/voice/{voice_id}?wait=10').json()['status'] not in ('done', 'failed'):
+            pass
+        return time.perf_counter() - started
+
+    probes, stop = [], threading.Event()
+
+    def probe():
+        while not stop.is_set():
+            started = time.perf_counter()
+            requests.get(f'{base}/api/stats')
+            probes.append(time.perf_counter() - started)
+            time.sleep(0.02)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    with ThreadPoolExecutor(args.concurrency) as clients:
+        voice_latencies = list(clients.map(send_voice, range(args.messages)))
+    stop.set()
+    prober.join()
+
+    stages = requests.get(f'{base}/api/stats/voice').json()['pipeline']['stages']
+    server.shutdown()
+    llm.shutdown()
+    return {
+        'probe_p50_ms': percentile(probes, 0.5) * 1000,
+        'probe_p95_ms': percentile(probes, 0.95) * 1000,
+        'voice_p50_ms': percentile(voice_latencies, 0.5) * 1000,
+        'voice_p95_ms': percentile(voice_latencies, 0.95) * 1000,
+        'stages': {stage: values['p50_ms'] for stage, values in stages.items()}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--seconds', type=int, default=5, help='length of each recording')
+    parser.add_argument('--cpu-ms', type=float, default=300, help='stub recognizer work per second of audio')
+    parser.add_argument('--llm-port', type=int, default=8772)
+    parser.add_argument('--app-port', type=int, default=5098)
+    parser.add_argument('--variant', choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args)))
+        return
+
+    for variant in VARIANTS:
+        scratch = tempfile.mkdtemp()
+        env = dict(
+            os.environ, DATABASE_URL=f"sqlite:///{os.path.join(scratch, 'bench_voice.db')}",
+            VOICE_UPLOAD_DIR=os.path.join(scratch, 'voice'), VOICE_RECOGNIZER='stub',
+            VOICE_STUB_CPU_MS=str(args.cpu_ms), OPENAI_API_KEY='stub',
+            OPENAI_API_BASE=f'http://127.0.0.1:{args.llm_port}/v1', METRICS_ENABLED='false'
+        )
+        output = subprocess.run(
+            [sys.executable, __file__, '--variant', variant, '--messages', str(args.messages),
+             '--concurrency', str(args.concurrency), '--seconds', str(args.seconds), '--cpu-ms', str(args.cpu_ms),
+             '--llm-port', str(args.llm_port), '--app-port', str(args.app_port)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{variant:<7} /api/stats p50 {result['probe_p50_ms']:7.1f}ms p95 {result['probe_p95_ms']:7.1f}ms  "
+              f"voice p50 {result['voice_p50_ms']:8.1f}ms p95 {result['voice_p95_ms']:8.1f}ms")
+        print(f"        stage p50 ms: {result['stages']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Exhaustive equivalence check between the triage rule table and the legacy logic.
+
+``legacy_triage_level`` is a verbatim copy of the hand-written
+TriageSystem.calculate_triage_level that the rule table replaced. Every
+combination of the values below is scored by the legacy function, by
+TriageEngine.score and by TriageEngine.score_batch, and all three must agree.
+Each record is also triaged the way the service does it: at intake on the
+emergency symptom list as submitted and on retriage from the stored list,
+and both must give the legacy level. Exits non-zero on any mismatch. ``find_mismatches()`` runs the same checks from a test.
+
+    python scripts/check_triage_equivalence.py
+"""
+import itertools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from triage_engine import TriageEngine
+
+
+def legacy_triage_level(symptom_data):
+    # Emergency conditions
+    emergency_symptoms = symptom_data.get('emergency_symptoms', [])
+    if emergency_symptoms and 'none' not in emergency_symptoms:
+        return 'emergency'
+
+    # Very severe symptoms
+    if symptom_data.get('symptom_severity') == 'very_severe':
+        return 'emergency'
+
+    # Urgent conditions
+    primary_symptom = symptom_data.get('primary_symptom')
+    severity = symptom_data.get('symptom_severity')
+    onset = symptom_data.get('symptom_onset')
+
+    urgent_conditions = [
+        primary_symptom == 'chest_pain' and severity == 'severe',
+        primary_symptom == 'breathing_difficulty',
+        severity == 'severe' and primary_symptom in ['fever', 'abdominal_pain'],
+        onset == 'today' and severity == 'severe'
+    ]
+
+    if any(urgent_conditions):
+        return 'urgent'
+
+    # Moderate severity conditions
+    if (severity == 'severe' or
+            (severity == 'moderate' and primary_symptom in ['fever', 'chest_pain', 'abdominal_pain'])):
+        return 'urgent'
+
+    return 'routine'
+
+
+MISSING = object()
+
+# Every value the symptom checker can send, plus missing, null and unknown values
+PRIMARY_SYMPTOMS = [
+    'fever', 'cough', 'headache', 'chest_pain', 'abdominal_pain', 'breathing_difficulty',
+    'nausea_vomiting', 'diarrhea', 'fatigue', 'dizziness', 'rash', 'other',
+    'Fever', '', None, MISSING
+]
+SEVERITIES = ['mild', 'moderate', 'severe', 'very_severe', 'Severe', '', None, MISSING]
+ONSETS = ['today', '1-2_days', '3-7_days', '1-2_weeks', 'more_than_2_weeks', 'Today', '', None, MISSING]
+EMERGENCY_SYMPTOMS = [
+    [], ['none'], ['None'], [' NONE '], ['severe_chest_pain'], ['Seizures', 'seizures'],
+    ['difficulty_breathing', 'seizures'], ['None', 'Seizures'], ['NONE', 'severe_bleeding'],
+    ['none ', 'paralysis'],
+    ['none', 'seizures'], ['loss_of_consciousness', 'severe_bleeding', 'severe_abdominal_pain',
+                           'high_fever', 'severe_headache', 'paralysis'],
+    'none', 'seizures', '', None, MISSING
+]
+
+
+def records():
+    for values in itertools.product(PRIMARY_SYMPTOMS, SEVERITIES, ONSETS, EMERGENCY_SYMPTOMS):
+        fields = ('primary_symptom', 'symptom_severity', 'symptom_onset', 'emergency_symptoms')
+        yield {field: value for field, value in zip(fields, values) if value is not MISSING}
+
+
+def intake_record(record):
+    """The record as create_assessment triages it: emergency symptoms as submitted"""
+    return {**record, 'emergency_symptoms': record.get('emergency_symptoms', [])}
+
+
+def retriage_record(record):
+    """The record as the retriage command reads it back from the assessment row"""
+    return {**record, 'emergency_symptoms': record.get('emergency_symptoms', []) or []}
+
+
+def find_mismatches(engine=None, all_records=None):
+    """[(record, {path: level})] for every record on which the triage paths disagree"""
+    engine = engine or TriageEngine()
+    all_records = list(records()) if all_records is None else all_records
+    paths = {
+        'legacy': [legacy_triage_level(record) for record in all_records],
+        'score': [engine.score(record) for record in all_records],
+        'batch': engine.score_batch(all_records),
+        'intake': [engine.score(intake_record(record)) for record in all_records],
+        'retriage': engine.score_batch([retriage_record(record) for record in all_records])
+    }
+    mismatches = []
+    for i, record in enumerate(all_records):
+        levels = {path: values[i] for path, values in paths.items()}
+        if not levels['legacy'] == levels['score'] == levels['batch'] == levels['intake'] == levels['retriage']:
+            mismatches.append((record, levels))
+    return mismatches
+
+
+def main():
+    engine = TriageEngine()
+    all_records = list(records())
+
+    started = time.perf_counter()
+    [legacy_triage_level(record) for record in all_records]
+    legacy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    [engine.score(record) for record in all_records]
+    scalar_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    engine.score_batch(all_records)
+    batch_seconds = time.perf_counter() - started
+
+    mismatches = find_mismatches(engine, all_records)
+    for record, levels in mismatches[:20]:
+        print(f"MISMATCH {record}: " + ' '.join(f"{path}={level}" for path, level in levels.items()))
+
+    print(f"{len(all_records)} combinations checked, {len(mismatches)} mismatches")
+    print(f"legacy {legacy_seconds * 1000:.1f}ms, score {scalar_seconds * 1000:.1f}ms, "
+          f"score_batch {batch_seconds * 1000:.1f}ms")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,355 @@
+"""Load test of the main API routes with a realistic request mix and a stub LLM.
+
+Starts the stub LLM server and the app against a scratch SQLite database (or
+targets --url), then runs --users virtual users for --duration seconds. Each
+user registers a patient, opens a consultation and then picks routes by
+weight from --mix: registrations, assessments, chat messages,
+consultations, provider searches and stats. Reports throughput, errors and
+p50/p95/p99 latency per route.
+
+--server gunicorn runs gunicorn.conf.py with --gunicorn-workers and
+--gunicorn-threads, to size a deployment. --save-baseline NAME stores the
+results in scripts/baselines/NAME.json. --compare NAME reports the change
+against that baseline and exits non-zero if any route's p95 rose, or its
+throughput fell, by more than --tolerance.
+
+    python scripts/load_test.py --users 32 --duration 30 --llm-latency-ms 800 --llm-distribution lognormal
+    python scripts/load_test.py --server gunicorn --gunicorn-workers 4 --save-baseline gunicorn-4x32
+    python scripts/load_test.py --server gunicorn --gunicorn-workers 4 --compare gunicorn-4x32
+"""
+import argparse
+import collections
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(ROOT, 'scripts', 'baselines')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+ROUTES = ('register', 'assess', 'chat', 'consultation', 'providers', 'stats')
+DEFAULT_MIX = 'register=10,assess=20,chat=25,consultation=10,providers=25,stats=10'
+LOCATIONS = ['Rajasthan', 'Uttar Pradesh', 'Gujarat', 'Punjab', 'Andhra Pradesh']
+SYMPTOMS = ['fever', 'cough', 'headache', 'abdominal_pain', 'chest_pain', 'breathing_difficulty']
+SEVERITIES = ['mild', 'moderate', 'severe']
+ONSETS = ['today', 'yesterday', 'few_days', 'week']
+MESSAGES = [
+    'I have had a fever and cough for two days',
+    'My child has loose motions since morning',
+    'What should I eat when I have diabetes?',
+    'My knee joint hurts when I climb stairs',
+    'I feel dizzy when I stand up quickly',
+]
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of sorted values"""
+    if not values:
+        return None
+    return values[max(int(round(p / 100 * len(values))) - 1, 0)]
+
+
+class VirtualUser:
+    """One simulated patient session, with its own connection and RNG"""
+
+    def __init__(self, host, port, rng, record):
+        self.host = host
+        self.port = port
+        self.rng = rng
+        self.record = record
+        self.conn = None
+        self.patient_id = None
+        self.consultation_id = None
+
+    def request(self, route, method, path, body=None):
+        payload = json.dumps(body) if body is not None else None
+        started = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+            self.conn.request(method, path, body=payload, headers={'Content-Type': 'application/json'})
+            response = self.conn.getresponse()
+            data = response.read()
+            status = response.status
+            if response.getheader('Connection', '').lower() == 'close' or response.version == 10:
+                self.conn.close()
+                self.conn = None
+        except (OSError, http.client.HTTPException):
+            if self.conn is not None:
+                self.conn.close()
+            self.conn = None
+            data, status = b'', 0
+        self.record(route, time.perf_counter() - started, status)
+        try:
+            return json.loads(data) if 200 <= status < 300 else None
+        except ValueError:
+            return None
+
+    def patient(self):
+        rng = self.rng
+        return {
+            'fullName': f'Load Test {rng.randrange(10 ** 6)}',
+            'age': rng.randint(1, 90),
+            'gender': rng.choice(['male', 'female']),
+            'location': f'PHC, {rng.choice(LOCATIONS)}',
+            'conditions': rng.sample(['diabetes', 'hypertension', 'asthma'], rng.randint(0, 2))
+        }
+
+    def register(self):
+        result = self.request('register', 'POST', '/api/register', self.patient())
+        if result:
+            self.patient_id = result['patient_id']
+
+    def consultation(self):
+        result = self.request('consultation', 'POST', '/api/consultation', {
+            'patient_id': self.patient_id, 'type': self.rng.choice(['basic', 'premium']), 'language': 'en'
+        })
+        if result:
+            self.consultation_id = result['consultation_id']
+
+    def assess(self):
+        rng = self.rng
+        self.request('assess', 'POST', '/api/assess', {
+            'patient_id': self.patient_id,
+            'primary_symptom': rng.choice(SYMPTOMS),
+            'symptom_onset': rng.choice(ONSETS),
+            'symptom_severity': rng.choice(SEVERITIES),
+            'additional_symptoms': rng.sample(SYMPTOMS, rng.randint(0, 2))
+        })
+
+    def chat(self):
+        self.request('chat', 'POST', '/api/chat', {
+            'message': self.rng.choice(MESSAGES), 'language': 'en',
+            'consultation_id': self.consultation_id
+        })
+
+    def providers(self):
+        rng = self.rng
+        if rng.random() < 0.5:
+            path = f'/api/providers?lat={rng.uniform(20, 30):.4f}&lng={rng.uniform(70, 82):.4f}&k=5'
+        else:
+            path = f'/api/providers?location={rng.choice(LOCATIONS).replace(" ", "+")}'
+        self.request('providers', 'GET', path)
+
+    def stats(self):
+        self.request('stats', 'GET', '/api/stats')
+
+    def run(self, routes, weights, deadline):
+        self.register()
+        self.consultation()
+        while time.monotonic() < deadline:
+            getattr(self, self.rng.choices(routes, weights)[0])()
+        if self.conn is not None:
+            self.conn.close()
+
+
+def run_load(host, port, mix, users, duration, warmup, seed):
+    routes = list(mix)
+    weights = [mix[route] for route in routes]
+    samples = collections.defaultdict(list)
+    errors = collections.Counter()
+    lock = threading.Lock()
+    measuring = threading.Event()
+
+    def record(route, elapsed, status):
+        if not measuring.is_set():
+            return
+        with lock:
+            samples[route].append(elapsed)
+            if not 200 <= status < 300:
+                errors[route] += 1
+
+    deadline = time.monotonic() + warmup + duration
+    threads = [
+        threading.Thread(target=VirtualUser(host, port, random.Random(seed + i), record).run,
+                         args=(routes, weights, deadline), daemon=True)
+        for i in range(users)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(warmup)
+    measuring.set()
+    started = time.monotonic()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    results = {}
+    for route in sorted(samples):
+        latencies = sorted(samples[route])
+        results[route] = {
+            'requests': len(latencies),
+            'errors': errors[route],
+            'rps': round(len(latencies) / elapsed, 2),
+            **{f'p{p}_ms': round(percentile(latencies, p) * 1000, 1) for p in (50, 95, 99)}
+        }
+    everything = sorted(latency for latencies in samples.values() for latency in latencies)
+    results['all'] = {
+        'requests': len(everything),
+        'errors': sum(errors.values()),
+        'rps': round(len(everything) / elapsed, 2),
+        **{f'p{p}_ms': round(percentile(everything, p) * 1000, 1) if everything else None for p in (50, 95, 99)}
+    }
+    return results
+
+
+def wait_until_up(host, port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'App did not come up on {host}:{port}')
+
+
+def start_app(args, env):
+    """Start the app server; returns (host, port, stop)"""
+    if args.server == 'gunicorn':
+        env = dict(env, GUNICORN_BIND=f'127.0.0.1:{args.app_port}',
+                   GUNICORN_WORKERS=str(args.gunicorn_workers), GUNICORN_THREADS=str(args.gunicorn_threads))
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        wait_until_up('127.0.0.1', args.app_port)
+
+        def stop():
+            process.terminate()
+            process.wait()
+        return '127.0.0.1', args.app_port, stop
+
+    os.environ.update(env)
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    import app as app_module
+
+    class QuietHandler(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', args.app_port, app_module.app, threaded=True,
+                         request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return '127.0.0.1', args.app_port, server.shutdown
+
+
+def compare(results, baseline, tolerance):
+    """Print the change against a baseline; return the routes that regressed"""
+    regressed = []
+    for route, current in results.items():
+        before = baseline['results'].get(route)
+        if before is None:
+            continue
+        p95_change = (current['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0.0
+        rps_change = (current['rps'] - before['rps']) / before['rps'] if before['rps'] else 0.0
+        worse = p95_change > tolerance or rps_change < -tolerance
+        if worse:
+            regressed.append(route)
+        print(f"{route:<13} p95 {before['p95_ms']:8.1f} -> {current['p95_ms']:8.1f}ms ({p95_change:+7.1%})  "
+              f"rps {before['rps']:7.1f} -> {current['rps']:7.1f} ({rps_change:+7.1%})"
+              f"{'  REGRESSED' if worse else ''}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=5, help='seconds before measuring starts')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='route=weight pairs, comma separated')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--url', help='test a running app instead of starting one')
+    parser.add_argument('--server', choices=('werkzeug', 'gunicorn'), default='werkzeug')
+    parser.add_argument('--gunicorn-workers', type=int, default=4)
+    parser.add_argument('--gunicorn-threads', type=int, default=32)
+    parser.add_argument('--app-port', type=int, default=5098)
+    parser.add_argument('--llm-port', type=int, default=8775)
+    parser.add_argument('--llm-latency-ms', type=float, default=800)
+    parser.add_argument('--llm-jitter-ms', type=float, default=300)
+    parser.add_argument('--llm-token-ms', type=float, default=0)
+    parser.add_argument('--llm-distribution', choices=('uniform', 'normal', 'lognormal'), default='lognormal')
+    parser.add_argument('--save-baseline', metavar='NAME')
+    parser.add_argument('--compare', metavar='NAME')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args()
+
+    mix = {}
+    for pair in args.mix.split(','):
+        route, weight = pair.split('=')
+        if route.strip() not in ROUTES:
+            parser.error(f"unknown route in --mix: {route} (choose from {', '.join(ROUTES)})")
+        mix[route.strip()] = float(weight)
+
+    if args.url:
+        target = urlsplit(args.url)
+        host, port, stop = target.hostname, target.port or 80, lambda: None
+        llm = None
+    else:
+        from stub_llm_server import serve
+
+        llm = serve(port=args.llm_port, latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms,
+                    token_ms=args.llm_token_ms, distribution=args.llm_distribution)
+        threading.Thread(target=llm.serve_forever, daemon=True).start()
+        env = {
+            'OPENAI_API_KEY': 'stub', 'OPENAI_API_BASE': f'http://127.0.0.1:{args.llm_port}/v1',
+            'DATABASE_URL': os.environ.get('DATABASE_URL')
+            or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load_test.db')}"
+        }
+        host, port, stop = start_app(args, dict(os.environ, **env))
+
+    try:
+        results = run_load(host, port, mix, args.users, args.duration, args.warmup, args.seed)
+    finally:
+        stop()
+        if llm is not None:
+            llm.shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'route':<13} {'requests':>8} {'errors':>6} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+        for route, r in results.items():
+            print(f"{route:<13} {r['requests']:8d} {r['errors']:6d} {r['rps']:8.1f} "
+                  f"{r['p50_ms']:7.1f}ms {r['p95_ms']:7.1f}ms {r['p99_ms']:7.1f}ms")
+
+    settings = {
+        'users': args.users, 'duration': args.duration, 'mix': mix, 'seed': args.seed,
+        'server': 'external' if args.url else args.server,
+        'gunicorn_workers': args.gunicorn_workers, 'gunicorn_threads': args.gunicorn_threads,
+        'llm': {'latency_ms': args.llm_latency_ms, 'jitter_ms': args.llm_jitter_ms,
+                'token_ms': args.llm_token_ms, 'distribution': args.llm_distribution}
+    }
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f'{args.save_baseline}.json')
+        with open(path, 'w') as f:
+            json.dump({'settings': settings, 'results': results, 'saved_at': time.time()}, f, indent=2)
+        print(f"Saved baseline {path}")
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f'{args.compare}.json')) as f:
+            baseline = json.load(f)
+        if baseline['settings'] != settings:
+            print("Warning: baseline was recorded with different settings:", json.dumps(baseline['settings']))
+        regressed = compare(results, baseline, args.tolerance)
+        if regressed:
+            print(f"Regressed beyond {args.tolerance:.0%}: {', '.join(regressed)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
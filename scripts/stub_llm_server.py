@@ -0,0 +1,143 @@
+"""Local stand-in for the OpenAI chat completions API.
+
+Answers POST /v1/chat/completions after an artificial delay so the LLM code
+paths can be exercised and benchmarked without network access or API cost.
+
+    python scripts/stub_llm_server.py --port 8001 --latency-ms 800 --jitter-ms 400
+
+--distribution picks how the delay varies: ``uniform`` (+/- --jitter-ms),
+``normal`` (--jitter-ms is the standard deviation) or ``lognormal``
+(--latency-ms is the median and sigma is --jitter-ms / --latency-ms, for
+the long tail real APIs have).
+
+Each word of the prompt costs --prompt-ms to "read" before anything is
+sent, so longer prompts answer later. Each word of the reply costs
+--token-ms to "generate". Streaming requests
+(``"stream": true``) get the first word after the latency delay and the rest
+as they are produced; other requests get the whole reply at the end.
+    OPENAI_API_BASE=http://127.0.0.1:8001/v1 OPENAI_API_KEY=stub python app.py
+"""
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def sample_latency_ms(latency_ms, jitter_ms, distribution='uniform'):
+    """One request's delay in milliseconds"""
+    if distribution == 'normal':
+        delay = random.gauss(latency_ms, jitter_ms)
+    elif distribution == 'lognormal':
+        sigma = jitter_ms / latency_ms if latency_ms > 0 else 0
+        delay = latency_ms * random.lognormvariate(0, sigma)
+    else:
+        delay = latency_ms + random.uniform(-jitter_ms, jitter_ms)
+    return max(delay, 0)
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    latency_ms = 500
+    jitter_ms = 0
+    distribution = 'uniform'
+    token_ms = 20
+    prompt_ms = 0
+    reply = "Drink plenty of fluids, rest, and visit your nearest health center if symptoms get worse."
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+
+        prompt_words = sum(len(str(message.get('content', '')).split()) for message in body.get('messages', []))
+        delay_ms = sample_latency_ms(self.latency_ms, self.jitter_ms, self.distribution) + prompt_words * self.prompt_ms
+        time.sleep(delay_ms / 1000.0)
+
+        if body.get('stream'):
+            self._stream_reply(body)
+            return
+
+        # A non-streaming reply still waits for every token to be generated
+        time.sleep(len(self.reply.split(' ')) * self.token_ms / 1000.0)
+
+        payload = json.dumps({
+            'id': 'chatcmpl-stub',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'gpt-4'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': self.reply},
+                'finish_reason': 'stop'
+            }],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+        }).encode()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream_reply(self, body):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+
+        try:
+            self._write_chunks(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
+
+    def _write_chunks(self, body):
+        words = self.reply.split(' ')
+        for index, word in enumerate(words):
+            chunk = {
+                'id': 'chatcmpl-stub',
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': body.get('model', 'gpt-4'),
+                'choices': [{
+                    'index': 0,
+                    'delta': {'content': word if index == 0 else ' ' + word},
+                    'finish_reason': None
+                }]
+            }
+            self.wfile.write(b'data: ' + json.dumps(chunk).encode() + b'\n\n')
+            self.wfile.flush()
+            time.sleep(self.token_ms / 1000.0)
+        self.wfile.write(b'data: [DONE]\n\n')
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host='127.0.0.1', port=8001, latency_ms=500, jitter_ms=0, token_ms=20, distribution='uniform',
+          prompt_ms=0):
+    StubLLMHandler.latency_ms = latency_ms
+    StubLLMHandler.prompt_ms = prompt_ms
+    StubLLMHandler.jitter_ms = jitter_ms
+    StubLLMHandler.distribution = distribution
+    StubLLMHandler.token_ms = token_ms
+    server = ThreadingHTTPServer((host, port), StubLLMHandler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency-ms', type=float, default=500)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--token-ms', type=float, default=20)
+    parser.add_argument('--prompt-ms', type=float, default=0, help='delay per prompt word')
+    parser.add_argument('--distribution', choices=('uniform', 'normal', 'lognormal'), default='uniform')
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.latency_ms, args.jitter_ms, args.token_ms, args.distribution,
+                   args.prompt_ms)
+    print(f"Stub LLM listening on http://{args.host}:{args.port}/v1 "
+          f"({args.distribution} {args.latency_ms}ms +/- {args.jitter_ms}ms)")
+    server.serve_forever()
@@ -0,0 +1,72 @@
+"""Local stand-in for the SMS gateway and provider webhook emergency notifiers.
+
+Accepts any POST after an artificial delay, fails a share of requests with a
+503 so the dispatcher's retries get exercised, and counts what it received.
+
+    python scripts/stub_notifier_server.py --port 8010 --latency-ms 200 --failure-rate 0.1
+    EMERGENCY_SMS_GATEWAY_URL=http://127.0.0.1:8010/sms \\
+    EMERGENCY_PROVIDER_WEBHOOK_URL=http://127.0.0.1:8010/webhook python app.py
+"""
+import argparse
+import collections
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubNotifierHandler(BaseHTTPRequestHandler):
+    latency_ms = 100
+    jitter_ms = 0
+    failure_rate = 0.0
+    received = collections.Counter()
+    failed = collections.Counter()
+    lock = threading.Lock()
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        json.loads(self.rfile.read(length) or b'{}')
+
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        time.sleep(max(delay, 0) / 1000.0)
+
+        failed = random.random() < self.failure_rate
+        with self.lock:
+            (self.failed if failed else self.received)[self.path] += 1
+
+        payload = json.dumps({'status': 'unavailable' if failed else 'queued'}).encode()
+        self.send_response(503 if failed else 200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host='127.0.0.1', port=8010, latency_ms=100, jitter_ms=0, failure_rate=0.0):
+    StubNotifierHandler.latency_ms = latency_ms
+    StubNotifierHandler.jitter_ms = jitter_ms
+    StubNotifierHandler.failure_rate = failure_rate
+    StubNotifierHandler.received.clear()
+    StubNotifierHandler.failed.clear()
+    server = ThreadingHTTPServer((host, port), StubNotifierHandler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8010)
+    parser.add_argument('--latency-ms', type=float, default=100)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.latency_ms, args.jitter_ms, args.failure_rate)
+    print(f"Stub notifier listening on http://{args.host}:{args.port} "
+          f"({args.latency_ms}ms +/- {args.jitter_ms}ms, {args.failure_rate:.0%} failures)")
+    server.serve_forever()
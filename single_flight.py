@@ -0,0 +1,187 @@
+"""Single-flight deduplication of identical in-flight LLM calls.
+
+``SingleFlight.do(key, func)`` runs ``func`` once for every group of
+concurrent callers with the same key. The first caller in a worker process
+becomes the leader and makes the upstream call; the others wait for its
+result (or its exception) instead of making their own.
+
+With LLM_COALESCE_BACKEND=redis the leader also takes a short Redis lock on
+the key and publishes its result there, so callers in other workers wait
+for that result instead of calling the API themselves. If the other worker
+fails or takes longer than LLM_COALESCE_WAIT, the caller makes the call
+itself, so a lost lock only costs a duplicate request.
+"""
+import json
+import threading
+import time
+import uuid
+
+# Deletes the lock only if this worker still holds it
+RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RedisCoordinator:
+    """Cross-worker lock and result hand-off for one key at a time"""
+
+    def __init__(self, url, lock_ttl=60.0, result_ttl=10.0, poll_interval=0.05, prefix='llm-flight:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.prefix = prefix
+        self._release = self.client.register_script(RELEASE_LOCK)
+
+    def acquire(self, key):
+        """Lock token if this worker now leads the key, else None"""
+        token = uuid.uuid4().hex
+        if self.client.set(f'{self.prefix}lock:{key}', token, nx=True, px=int(self.lock_ttl * 1000)):
+            return token
+        return None
+
+    def publish(self, key, token, result):
+        self.client.set(f'{self.prefix}result:{key}', json.dumps(result), px=int(self.result_ttl * 1000))
+        self._release(keys=[f'{self.prefix}lock:{key}'], args=[token])
+
+    def release(self, key, token):
+        self._release(keys=[f'{self.prefix}lock:{key}'], args=[token])
+
+    def wait(self, key, timeout):
+        """(True, result) once another worker publishes one; (False, None) if its lock goes away first"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            pipeline = self.client.pipeline()
+            pipeline.get(f'{self.prefix}result:{key}')
+            pipeline.exists(f'{self.prefix}lock:{key}')
+            value, locked = pipeline.execute()
+            if value is not None:
+                return True, json.loads(value)
+            if not locked:
+                return False, None
+            time.sleep(self.poll_interval)
+        return False, None
+
+
+class SingleFlight:
+    def __init__(self, app=None):
+        self.enabled = True
+        self.wait_timeout = 30.0
+        self.coordinator = None
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.remote_coalesced = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('LLM_COALESCE_ENABLED', True)
+        self.wait_timeout = app.config.get('LLM_COALESCE_WAIT', self.wait_timeout)
+        if app.config.get('LLM_COALESCE_BACKEND', 'local') == 'redis':
+            self.coordinator = RedisCoordinator(
+                app.config['LLM_COALESCE_REDIS_URL'], lock_ttl=self.wait_timeout * 2
+            )
+        app.extensions['single_flight'] = self
+
+    def _count(self, attr):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def do(self, key, func):
+        """Return ``func()``, sharing one call among concurrent callers with the same key"""
+        if not self.enabled:
+            self._count('calls')
+            self._count('executions')
+            return func()
+
+        with self._lock:
+            self.calls += 1
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+
+        if not leader:
+            if not call.done.wait(self.wait_timeout):
+                # The leader is stuck; don't hold this request hostage to it
+                self._count('executions')
+                return func()
+            self._count('coalesced')
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._lead(key, func)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call.done.set()
+
+    def _lead(self, key, func):
+        if self.coordinator is None:
+            self._count('executions')
+            return func()
+
+        try:
+            token = self.coordinator.acquire(key)
+            if token is None:
+                found, result = self.coordinator.wait(key, self.wait_timeout)
+                if found:
+                    self._count('remote_coalesced')
+                    return result
+                token = self.coordinator.acquire(key)
+        except Exception as e:
+            print(f"Single-flight coordination error: {e}")
+            token = None
+
+        self._count('executions')
+        if token is None:
+            return func()
+        try:
+            result = func()
+        except BaseException:
+            self._release(key, token)
+            raise
+        try:
+            self.coordinator.publish(key, token, result)
+        except Exception as e:
+            print(f"Single-flight publish error: {e}")
+        return result
+
+    def _release(self, key, token):
+        try:
+            self.coordinator.release(key, token)
+        except Exception as e:
+            print(f"Single-flight release error: {e}")
+
+    def stats(self):
+        shared = self.coalesced + self.remote_coalesced
+        return {
+            'backend': 'redis' if self.coordinator else 'local',
+            'calls': self.calls,
+            'upstream_calls': self.executions,
+            'coalesced': self.coalesced,
+            'coalesced_across_workers': self.remote_coalesced,
+            'in_flight': len(self._in_flight),
+            'coalescing_ratio': round(shared / self.calls, 4) if self.calls else 0.0
+        }
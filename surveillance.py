@@ -0,0 +1,253 @@
+"""Sliding-window symptom surveillance over committed assessments.
+
+Assessments are counted per (location, primary symptom, triage level) in
+fixed time buckets (SURVEILLANCE_BUCKET_MINUTES). Each key keeps a ring of
+bucket counts covering the current window (SURVEILLANCE_WINDOW_HOURS)
+plus the baseline before it (SURVEILLANCE_BASELINE_DAYS), along with
+running totals for both. Adding an assessment is one increment. As time
+moves on, each elapsed bucket shifts one count from the window total to the
+baseline total and drops one from the baseline, so reads never rescan the
+ring.
+
+A key is anomalous when its window count is unlikely under a Poisson
+model: the expected count is the baseline rate scaled to the window. It
+needs a p-value below SURVEILLANCE_P_VALUE and at least
+SURVEILLANCE_MIN_CASES cases.
+
+Counts live in memory. Every worker rebuilds them from the database on
+first use, then tails new assessments by id. The tail also re-reads the
+last few seconds by ``created_at``, so rows whose ids committed out of
+order are still picked up once. ``record`` adds this worker's own
+assessments immediately.
+"""
+import math
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+
+# Floor on the expected count, so a key with no history needs several cases to stand out
+MIN_EXPECTED = 0.5
+
+
+def normalize_location(location):
+    return ' '.join((location or '').lower().split()) or 'unknown'
+
+
+def epoch_seconds(timestamp):
+    """Seconds since the epoch for a naive UTC datetime"""
+    return timestamp.replace(tzinfo=timezone.utc).timestamp()
+
+
+def poisson_tail(observed, expected):
+    """P(X >= observed) for X ~ Poisson(expected)"""
+    if observed <= 0:
+        return 1.0
+    if expected > 200:
+        # Normal approximation with continuity correction
+        z = (observed - 0.5 - expected) / math.sqrt(expected)
+        return 0.5 * math.erfc(z / math.sqrt(2))
+    term = math.exp(-expected)
+    below = term
+    for k in range(1, observed):
+        term *= expected / k
+        below += term
+    return max(0.0, 1.0 - below)
+
+
+class _Series:
+    """Bucket counts for one key: window (head - W, head], baseline (head - H, head - W]"""
+    __slots__ = ('counts', 'head', 'window', 'baseline')
+
+    def __init__(self, size, head):
+        self.counts = array('I', bytes(4 * size))
+        self.head = head
+        self.window = 0
+        self.baseline = 0
+
+    def advance(self, bucket, window_buckets):
+        size = len(self.counts)
+        if bucket - self.head >= size:
+            # Everything has aged out
+            self.counts = array('I', bytes(4 * size))
+            self.window = self.baseline = 0
+            self.head = bucket
+            return
+        for t in range(self.head + 1, bucket + 1):
+            expired = t % size
+            self.baseline -= self.counts[expired]
+            self.counts[expired] = 0
+            moved = self.counts[(t - window_buckets) % size]
+            self.window -= moved
+            self.baseline += moved
+        self.head = max(self.head, bucket)
+
+    def add(self, bucket, window_buckets):
+        size = len(self.counts)
+        if bucket > self.head:
+            self.advance(bucket, window_buckets)
+        elif bucket <= self.head - size:
+            return False
+        self.counts[bucket % size] += 1
+        if bucket > self.head - window_buckets:
+            self.window += 1
+        else:
+            self.baseline += 1
+        return True
+
+
+class OutbreakMonitor:
+    def __init__(self, app=None):
+        self.enabled = True
+        self.bucket_seconds = 3600
+        self.window_buckets = 24
+        self.baseline_buckets = 14 * 24
+        self.min_cases = 5
+        self.p_value = 0.001
+        self.sync_interval = 5.0
+        self.tail_lag = 120.0
+        self.loaded = False
+        self.recorded = 0
+        self.rebuild_seconds = None
+        self._series = {}
+        self._seen = {}
+        self._watermark = 0
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('SURVEILLANCE_ENABLED', self.enabled)
+        self.bucket_seconds = int(app.config.get('SURVEILLANCE_BUCKET_MINUTES', 60) * 60)
+        self.window_buckets = max(1, int(app.config.get('SURVEILLANCE_WINDOW_HOURS', 24) * 3600 // self.bucket_seconds))
+        self.baseline_buckets = max(1, int(
+            app.config.get('SURVEILLANCE_BASELINE_DAYS', 14) * 86400 // self.bucket_seconds
+        ))
+        self.min_cases = app.config.get('SURVEILLANCE_MIN_CASES', self.min_cases)
+        self.p_value = app.config.get('SURVEILLANCE_P_VALUE', self.p_value)
+        self.sync_interval = app.config.get('SURVEILLANCE_SYNC_INTERVAL', self.sync_interval)
+        self.loaded = False
+        app.extensions['outbreak_monitor'] = self
+
+    @property
+    def horizon_seconds(self):
+        return (self.window_buckets + self.baseline_buckets) * self.bucket_seconds
+
+    def _bucket(self, seconds):
+        return int(seconds // self.bucket_seconds)
+
+    def _add(self, location, symptom, triage_level, created_at):
+        key = (normalize_location(location), (symptom or 'unknown').lower(), triage_level or 'unknown')
+        bucket = self._bucket(epoch_seconds(created_at))
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series(self.window_buckets + self.baseline_buckets, bucket)
+        series.add(bucket, self.window_buckets)
+
+    def _ingest(self, rows, now):
+        """Add (id, created_at, location, symptom, triage_level) rows not seen before"""
+        for assessment_id, created_at, location, symptom, triage_level in rows:
+            self._watermark = max(self._watermark, assessment_id)
+            if assessment_id in self._seen:
+                continue
+            if created_at is None:
+                continue
+            if epoch_seconds(created_at) >= now - 2 * self.tail_lag:
+                self._seen[assessment_id] = created_at
+            self._add(location, symptom, triage_level, created_at)
+
+    def _prune_seen(self, now):
+        cutoff = now - 2 * self.tail_lag
+        for assessment_id in [i for i, created_at in self._seen.items() if epoch_seconds(created_at) < cutoff]:
+            del self._seen[assessment_id]
+
+    def rebuild(self, load_rows):
+        """Recount the whole horizon from ``load_rows(after_id=None, since=<datetime>)``"""
+        started = time.perf_counter()
+        now = time.time()
+        since = datetime.utcfromtimestamp(now - self.horizon_seconds)
+        with self._lock:
+            self._series = {}
+            self._seen = {}
+            self._watermark = 0
+            self._ingest(load_rows(after_id=None, since=since), now)
+            self.loaded = True
+            self._synced_at = time.monotonic()
+        self.rebuild_seconds = round(time.perf_counter() - started, 3)
+
+    def sync(self, load_rows, force=False):
+        """Load new assessments at most every SURVEILLANCE_SYNC_INTERVAL seconds"""
+        if not self.enabled:
+            return
+        if not self.loaded:
+            with self._sync_lock:
+                if not self.loaded:
+                    self.rebuild(load_rows)
+            return
+        if not force and time.monotonic() - self._synced_at < self.sync_interval:
+            return
+        with self._sync_lock:
+            now = time.time()
+            rows = list(load_rows(after_id=self._watermark, since=datetime.utcfromtimestamp(now - self.tail_lag)))
+            with self._lock:
+                self._ingest(rows, now)
+                self._prune_seen(now)
+                self._synced_at = time.monotonic()
+
+    def record(self, assessment_id, location, symptom, triage_level, created_at):
+        """Count an assessment this worker just committed, without waiting for the next sync"""
+        if not self.enabled or not self.loaded:
+            return
+        with self._lock:
+            if assessment_id in self._seen:
+                return
+            self._seen[assessment_id] = created_at
+            self._add(location, symptom, triage_level, created_at)
+            self.recorded += 1
+
+    def signals(self, location=None, symptom=None, triage_level=None, anomalous_only=False, limit=100):
+        """Window counts against baseline per key, most anomalous first"""
+        now_bucket = self._bucket(time.time())
+        location = normalize_location(location) if location else None
+        symptom = symptom.lower() if symptom else None
+        results = []
+        with self._lock:
+            for key, series in self._series.items():
+                if (location and location not in key[0]) or (symptom and key[1] != symptom) \
+                        or (triage_level and key[2] != triage_level):
+                    continue
+                series.advance(now_bucket, self.window_buckets)
+                if not series.window and not series.baseline:
+                    continue
+                expected = series.baseline / self.baseline_buckets * self.window_buckets
+                p_value = poisson_tail(series.window, max(expected, MIN_EXPECTED))
+                anomalous = series.window >= self.min_cases and p_value < self.p_value
+                if anomalous_only and not anomalous:
+                    continue
+                results.append({
+                    'location': key[0],
+                    'symptom': key[1],
+                    'triage_level': key[2],
+                    'window_count': series.window,
+                    'baseline_count': series.baseline,
+                    'expected': round(expected, 2),
+                    'ratio': round(series.window / expected, 2) if expected else None,
+                    'p_value': p_value,
+                    'anomalous': anomalous
+                })
+        results.sort(key=lambda r: (not r['anomalous'], r['p_value'], -r['window_count']))
+        return results[:limit]
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'loaded': self.loaded,
+            'keys': len(self._series),
+            'window_hours': self.window_buckets * self.bucket_seconds / 3600,
+            'baseline_days': self.baseline_buckets * self.bucket_seconds / 86400,
+            'bucket_minutes': self.bucket_seconds / 60,
+            'recorded_inline': self.recorded,
+            'last_rebuild_seconds': self.rebuild_seconds
+        }
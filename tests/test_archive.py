@@ -0,0 +1,127 @@
+import gzip
+import json
+import os
+from datetime import datetime
+
+from archive import ArchiveStore, month_key, month_start
+
+
+def store(root):
+    archive = ArchiveStore()
+    archive.root = str(root)
+    archive.reload_interval = 0
+    archive.load()
+    return archive
+
+
+def assessments(first_id, last_id):
+    return [{
+        'id': row_id, 'patient_id': row_id % 3, 'triage_level': 'urgent' if row_id % 2 else 'routine',
+        'created_at': datetime(2024, 1, 1 + row_id % 28, 9, 30)
+    } for row_id in range(first_id, last_id + 1)]
+
+
+def triage_counts(rows):
+    counts = {}
+    for row in rows:
+        counts[f"triage:{row['triage_level']}"] = counts.get(f"triage:{row['triage_level']}", 0) + 1
+    return counts
+
+
+def write(archive, rows):
+    return archive.write_part('assessment', '2024-01', rows, 'patient_id', ['created_at'],
+                              index_ids=True, counts=triage_counts)
+
+
+def test_round_trip(tmp_path):
+    archive = store(tmp_path)
+    rows = assessments(1, 30)
+    write(archive, rows)
+
+    assert archive.has_group('assessment', 1)
+    assert not archive.has_group('assessment', 99)
+    assert archive.group_rows('assessment', 1) == [row for row in rows if row['patient_id'] == 1]
+    assert archive.find('assessment', 7) == rows[6]
+    assert archive.find('assessment', 31) is None
+    assert archive.counts('assessment') == {'triage:urgent': 15, 'triage:routine': 15}
+
+    # Another worker reads the same parts from disk
+    reader = store(tmp_path)
+    assert reader.group_rows('assessment', 2) == archive.group_rows('assessment', 2)
+    assert reader.stats()['tables']['assessment']['rows'] == 30
+
+
+def test_part_is_a_plain_gzip_file(tmp_path):
+    write(store(tmp_path), assessments(1, 5))
+    with gzip.open(tmp_path / 'assessment' / '2024-01' / 'part-1-5.jsonl.gz', 'rt') as f:
+        assert sorted(json.loads(line)['id'] for line in f) == [1, 2, 3, 4, 5]
+
+
+def test_rerun_of_the_same_batch_is_not_counted_twice(tmp_path):
+    write(store(tmp_path), assessments(1, 30))
+    archive = store(tmp_path)
+    write(archive, assessments(1, 30))
+
+    assert archive.counts('assessment') == {'triage:urgent': 15, 'triage:routine': 15}
+    assert sorted(os.listdir(tmp_path / 'assessment' / '2024-01')) == ['part-1-30.idx.json', 'part-1-30.jsonl.gz']
+
+
+def test_overlapping_part_replaces_the_parts_it_overlaps(tmp_path):
+    write(store(tmp_path), assessments(1, 30))
+    archive = store(tmp_path)
+    write(archive, assessments(21, 40))
+
+    assert sorted(os.listdir(tmp_path / 'assessment' / '2024-01')) == ['part-1-40.idx.json', 'part-1-40.jsonl.gz']
+    assert archive.counts('assessment') == {'triage:urgent': 20, 'triage:routine': 20}
+    assert [row['id'] for row in archive.group_rows('assessment', 0)] == list(range(3, 41, 3))
+    assert store(tmp_path).counts('assessment') == archive.counts('assessment')
+
+
+def test_load_skips_parts_overlapped_by_a_larger_one(tmp_path):
+    # The state between writing a merged part and deleting the parts it replaces
+    write(store(tmp_path / 'old'), assessments(1, 30))
+    write(store(tmp_path / 'new'), assessments(1, 40))
+    for name in ('part-1-40.idx.json', 'part-1-40.jsonl.gz'):
+        os.replace(tmp_path / 'new' / 'assessment' / '2024-01' / name, tmp_path / 'old' / 'assessment' / '2024-01' / name)
+
+    archive = store(tmp_path / 'old')
+    assert archive.counts('assessment') == {'triage:urgent': 20, 'triage:routine': 20}
+    assert archive.stats()['tables']['assessment']['parts'] == 1
+
+
+def test_reader_recovers_when_a_part_is_replaced(tmp_path):
+    write(store(tmp_path), assessments(1, 30))
+    reader = store(tmp_path)
+    assert len(reader.group_rows('assessment', 1)) == 10
+
+    # The reader still has the old catalog; the part it points to is gone
+    write(store(tmp_path), assessments(25, 45))
+    assert [row['id'] for row in reader.group_rows('assessment', 0)] == list(range(3, 46, 3))
+
+
+def test_unindexed_part_from_a_crash_is_removed(tmp_path):
+    directory = tmp_path / 'assessment' / '2024-01'
+    directory.mkdir(parents=True)
+    (directory / 'part-1-10.jsonl.gz').write_bytes(b'truncated')
+    archive = store(tmp_path)
+    write(archive, assessments(1, 10))
+
+    assert sorted(os.listdir(directory)) == ['part-1-10.idx.json', 'part-1-10.jsonl.gz']
+    assert len(archive.group_rows('assessment', 1)) == 4
+
+
+def test_disabled_store_reads_nothing(tmp_path):
+    archive = store(tmp_path)
+    write(archive, assessments(1, 5))
+    archive.enabled = False
+    assert not archive.has_group('assessment', 1)
+    assert archive.find('assessment', 1) is None
+    assert archive.counts('assessment') == {}
+
+
+def test_month_helpers():
+    assert month_key(datetime(2024, 3, 31, 23, 59)) == '2024-03'
+    assert month_start(datetime(2024, 3, 31, 23, 59)) == datetime(2024, 3, 1)
+    archive = ArchiveStore()
+    archive.after_days = 180
+    assert archive.cutoff(datetime(2024, 7, 15)) == datetime(2024, 1, 1)
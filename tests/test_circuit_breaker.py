@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+import pytest
+
+import inference
+from inference import CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(inference, 'time', SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def tripped(failure_threshold=3, reset_timeout=30.0):
+    breaker = CircuitBreaker(failure_threshold, reset_timeout)
+    for _ in range(failure_threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+    assert breaker.stats() == {'state': 'open', 'consecutive_failures': 3, 'trips': 1}
+
+
+def test_half_open_lets_one_trial_through(clock):
+    breaker = tripped()
+    clock.value += 29.9
+    assert not breaker.allow()
+
+    clock.value += 0.1
+    assert breaker.allow()
+    assert breaker.state == 'half_open'
+    # Concurrent callers keep using the fallback while the trial runs
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.allow()
+    assert breaker.stats()['consecutive_failures'] == 0
+
+
+def test_failed_trial_reopens_for_another_timeout(clock):
+    breaker = tripped()
+    clock.value += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert breaker.stats()['trips'] == 2
+
+    clock.value += 29
+    assert not breaker.allow()
+    clock.value += 1
+    assert breaker.allow()
+
+
+def test_abandoned_trial_reopens_but_abandoned_calls_do_not_count_when_closed(clock):
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_abandoned()
+    assert breaker.state == 'closed'
+
+    breaker = tripped()
+    clock.value += 30
+    assert breaker.allow()
+    breaker.record_abandoned()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+from http_cache import HTTPCache
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.config['HTTP_CACHE_BACKEND'] = 'memory'
+    http_cache = HTTPCache(app)
+    state = {'version': 1, 'builds': 0, 'last_modified': datetime(2024, 5, 1, 10, 0, 0, 123456)}
+
+    @app.route('/patient')
+    def patient():
+        def build():
+            state['builds'] += 1
+            return {'name': 'Asha', 'version': state['version']}
+        return http_cache.respond('patient:1', state['version'], build, last_modified=state['last_modified'])
+
+    client = app.test_client()
+    client.state = state
+    client.http_cache = http_cache
+    return client
+
+
+def test_matching_etag_gets_a_bodiless_304_without_building(client):
+    first = client.get('/patient')
+    assert first.status_code == 200
+    assert first.get_json() == {'name': 'Asha', 'version': 1}
+    assert first.headers['Cache-Control'] in ('no-cache, private', 'private, no-cache')
+
+    repeat = client.get('/patient', headers={'If-None-Match': first.headers['ETag']})
+    assert repeat.status_code == 304
+    assert repeat.data == b''
+    assert repeat.headers['ETag'] == first.headers['ETag']
+    assert client.state['builds'] == 1
+    assert client.http_cache.stats()['not_modified'] == 1
+
+
+def test_if_modified_since_uses_whole_seconds(client):
+    assert client.get('/patient').headers['Last-Modified'] == 'Wed, 01 May 2024 10:00:00 GMT'
+
+    response = client.get('/patient', headers={'If-Modified-Since': 'Wed, 01 May 2024 10:00:00 GMT'})
+    assert response.status_code == 304
+
+    response = client.get('/patient', headers={'If-Modified-Since': 'Wed, 01 May 2024 09:59:59 GMT'})
+    assert response.status_code == 200
+
+
+def test_stamp_in_the_current_second_is_validated_by_etag_only(client):
+    client.state['last_modified'] = datetime.utcnow()
+    first = client.get('/patient')
+    assert 'Last-Modified' not in first.headers
+
+    # A second write in the same second would not move an HTTP date
+    response = client.get('/patient', headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+    assert response.status_code == 200
+    response = client.get('/patient', headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 304
+
+    client.state['last_modified'] -= timedelta(seconds=2)
+    assert 'Last-Modified' in client.get('/patient').headers
+
+
+def test_if_none_match_wins_over_if_modified_since(client):
+    response = client.get('/patient', headers={
+        'If-None-Match': '"stale"', 'If-Modified-Since': 'Wed, 01 May 2024 10:00:00 GMT'
+    })
+    assert response.status_code == 200
+
+
+def test_new_validator_changes_the_etag_and_rebuilds(client):
+    etag = client.get('/patient').headers['ETag']
+    client.get('/patient')
+    assert client.state['builds'] == 1
+    assert client.http_cache.stats()['hits'] == 1
+
+    client.state['version'] = 2
+    response = client.get('/patient', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['version'] == 2
+    assert response.headers['ETag'] != etag
+    assert client.state['builds'] == 2
+
+
+def test_invalidate_drops_the_cached_body(client):
+    client.get('/patient')
+    client.http_cache.invalidate('patient:1')
+    client.get('/patient')
+    assert client.state['builds'] == 2
+    assert client.http_cache.stats()['invalidations'] == 1
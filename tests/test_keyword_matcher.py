@@ -0,0 +1,61 @@
+import os
+
+from conftest import ROOT
+from keyword_matcher import KeywordMatcher
+
+TABLE = {
+    'en': {
+        'emergency': ['chest pain', 'heart attack'],
+        'pain': ['pain'],
+        'symptom': ['fever', 'headache'],
+        'duration': ['how long']
+    },
+    'hi': {
+        'emergency': ['सीने में दर्द'],
+        'pain': ['दर्द', 'dard'],
+        'symptom': ['बुखार']
+    }
+}
+CATEGORIES = ['emergency', 'pain', 'symptom', 'duration']
+
+
+def matcher():
+    return KeywordMatcher(TABLE, CATEGORIES)
+
+
+def test_nested_phrases_report_every_category():
+    found = matcher().match('I have chest pain since morning')
+    assert found == {'emergency', 'pain'}
+
+
+def test_first_category_follows_precedence():
+    keywords = matcher()
+    assert keywords.first_category('fever and chest pain') == 'emergency'
+    assert keywords.first_category('how long will the fever last') == 'symptom'
+    assert keywords.first_category('how long') == 'duration'
+    assert keywords.first_category('thank you, doctor') is None
+
+
+def test_matching_ignores_case_across_languages():
+    keywords = matcher()
+    assert keywords.first_category('CHEST PAIN') == 'emergency'
+    assert keywords.match('मुझे बुखार है') == {'symptom'}
+    assert keywords.match('सीने में दर्द हो रहा है') == {'emergency', 'pain'}
+
+
+def test_find_returns_phrases_in_order():
+    assert matcher().find('Headache, then fever') == ['headache', 'fever']
+
+
+def test_empty_table_and_text():
+    empty = KeywordMatcher({})
+    assert len(empty) == 0
+    assert empty.first_category('chest pain') is None
+    assert matcher().match('') == frozenset()
+
+
+def test_shipped_table_loads():
+    keywords = KeywordMatcher.from_file(os.path.join(ROOT, 'data', 'medical_keywords.json'))
+    assert keywords.categories[:4] == CATEGORIES
+    assert keywords.first_category("I can't breathe") == 'emergency'
+    assert keywords.first_category('bukhar hai') == 'symptom'
@@ -0,0 +1,88 @@
+import io
+
+import pytest
+
+from patient_import import PatientValidationError, import_patients, read_records, validate_patient
+
+
+def test_validate_patient_maps_registration_fields():
+    row = validate_patient({
+        'fullName': 'Asha Devi', 'age': '42', 'gender': 'female', 'phone': '',
+        'language': 'hi', 'conditions': 'diabetes; hypertension'
+    })
+    assert row['full_name'] == 'Asha Devi'
+    assert row['age'] == 42
+    assert row['phone'] is None
+    assert row['preferred_language'] == 'hi'
+    assert row['medical_conditions'] == ['diabetes', 'hypertension']
+
+
+def test_validate_patient_accepts_json_condition_lists():
+    assert validate_patient({'fullName': 'A', 'age': 1, 'gender': 'male',
+                             'conditions': '["asthma"]'})['medical_conditions'] == ['asthma']
+    assert validate_patient({'fullName': 'A', 'age': 1, 'gender': 'male'})['preferred_language'] == 'en'
+
+
+@pytest.mark.parametrize('record, message', [
+    ({'age': 30, 'gender': 'male'}, 'Missing required field: fullName'),
+    ({'fullName': 'A', 'age': 'thirty', 'gender': 'male'}, 'Invalid age'),
+    ({'fullName': 'A', 'age': 151, 'gender': 'male'}, 'Invalid age: 151'),
+    ({'fullName': 'A', 'age': 30, 'gender': 'male', 'conditions': '[broken'}, 'Invalid conditions list'),
+    (['not', 'an', 'object'], 'must be an object')
+])
+def test_validate_patient_rejects(record, message):
+    with pytest.raises(PatientValidationError, match=message):
+        validate_patient(record)
+
+
+def test_import_patients_batches_and_reports_bad_lines():
+    stream = io.StringIO(
+        'fullName,age,gender,conditions\n'
+        'Asha,42,female,diabetes\n'
+        'Ravi,abc,male,\n'
+        'Meena,35,female,\n'
+        'Kiran,28,male,\n'
+    )
+    batches = []
+    result = import_patients(read_records(stream, 'csv'), batches.append, batch_size=2)
+
+    assert [[row['full_name'] for row in batch] for batch in batches] == [['Asha', 'Meena'], ['Kiran']]
+    summary = result.to_dict()
+    assert summary['imported'] == 3
+    assert summary['failed'] == 1
+    assert summary['errors'] == [{'line': 3, 'error': "Invalid age: 'abc'"}]
+
+
+def test_failed_batch_is_retried_row_by_row():
+    inserted = []
+
+    def insert_batch(rows):
+        if any(row['full_name'] == 'Duplicate' for row in rows):
+            raise RuntimeError('unique constraint')
+        inserted.extend(rows)
+
+    records = enumerate([
+        {'fullName': 'One', 'age': 1, 'gender': 'male'},
+        {'fullName': 'Duplicate', 'age': 2, 'gender': 'male'},
+        {'fullName': 'Three', 'age': 3, 'gender': 'female'}
+    ], start=1)
+    result = import_patients(records, insert_batch, batch_size=10)
+
+    assert [row['full_name'] for row in inserted] == ['One', 'Three']
+    assert result.imported == 2
+    assert result.errors == [{'line': 2, 'error': 'unique constraint'}]
+
+
+def test_jsonl_reports_invalid_json_and_caps_errors():
+    stream = io.StringIO('{"fullName": "A", "age": 5, "gender": "male"}\n\nnot json\n{"age": 1}\n')
+    result = import_patients(read_records(stream, 'jsonl'), lambda rows: None, max_errors=1)
+    summary = result.to_dict()
+    assert summary['imported'] == 1
+    assert summary['failed'] == 2
+    assert summary['errors'][0]['line'] == 3
+    assert summary['errors_truncated'] is True
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        list(read_records(io.StringIO(''), 'xml'))
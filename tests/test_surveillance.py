@@ -0,0 +1,108 @@
+import math
+from datetime import datetime, timedelta
+
+import pytest
+
+from surveillance import OutbreakMonitor, _Series, normalize_location, poisson_tail
+
+
+def test_series_moves_counts_from_window_to_baseline_and_out():
+    # Ring of 5 buckets: window is the newest 2, baseline the 3 before them
+    series = _Series(5, head=10)
+    for bucket in (10, 10, 9, 7, 6):
+        assert series.add(bucket, window_buckets=2)
+    assert (series.window, series.baseline) == (3, 2)
+
+    series.advance(11, window_buckets=2)
+    # Bucket 9 leaves the window; bucket 6 leaves the baseline
+    assert (series.window, series.baseline) == (2, 2)
+
+    series.advance(13, window_buckets=2)
+    # Buckets 9 and 10 are now baseline; 7 has expired
+    assert (series.window, series.baseline) == (0, 3)
+
+    series.advance(20, window_buckets=2)
+    assert (series.window, series.baseline) == (0, 0)
+
+
+def test_series_ignores_buckets_older_than_the_ring():
+    series = _Series(5, head=10)
+    assert not series.add(5, window_buckets=2)
+    assert series.add(6, window_buckets=2)
+    assert (series.window, series.baseline) == (0, 1)
+
+
+def test_series_totals_match_a_recount():
+    series = _Series(24, head=0)
+    added = []
+    for step, bucket in enumerate(range(0, 200, 3)):
+        series.add(bucket, window_buckets=6)
+        series.add(bucket - step % 5, window_buckets=6)
+        added += [bucket, bucket - step % 5]
+        live = [b for b in added if b > series.head - 24]
+        assert series.window == sum(1 for b in live if b > series.head - 6)
+        assert series.baseline == sum(1 for b in live if b <= series.head - 6)
+
+
+def test_poisson_tail():
+    assert poisson_tail(0, 3.0) == 1.0
+    assert poisson_tail(1, 2.0) == pytest.approx(1 - math.exp(-2.0))
+    assert poisson_tail(3, 1.0) == pytest.approx(1 - math.exp(-1.0) * (1 + 1 + 0.5))
+    # The normal approximation takes over for large expectations and stays monotonic
+    assert poisson_tail(400, 300.0) < poisson_tail(350, 300.0) < 0.01
+
+
+def test_normalize_location():
+    assert normalize_location('  Jaipur   Rural ') == 'jaipur rural'
+    assert normalize_location(None) == 'unknown'
+
+
+def monitor():
+    outbreak = OutbreakMonitor()
+    outbreak.min_cases = 5
+    outbreak.p_value = 0.001
+    return outbreak
+
+
+def rows_loader(rows):
+    def load_rows(after_id=None, since=None):
+        return [row for row in rows if (after_id is None or row[0] > after_id) and row[1] >= since]
+    return load_rows
+
+
+def test_spike_in_the_window_is_flagged():
+    now = datetime.utcnow()
+    rows = [(i, now - timedelta(days=3, hours=i), 'Village A', 'fever', 'routine') for i in range(1, 8)]
+    rows += [(100 + i, now - timedelta(hours=2, minutes=i), 'village a', 'Fever', 'routine') for i in range(12)]
+    rows += [(200, now - timedelta(days=30), 'Village A', 'fever', 'routine')]
+    outbreak = monitor()
+    outbreak.sync(rows_loader(rows))
+
+    [signal] = outbreak.signals()
+    assert signal['location'] == 'village a'
+    assert signal['window_count'] == 12
+    # The row older than the baseline is not counted
+    assert signal['baseline_count'] == 7
+    assert signal['expected'] == pytest.approx(7 / (14 * 24) * 24, abs=0.01)
+    assert signal['anomalous']
+    assert outbreak.signals(symptom='cough') == []
+
+
+def test_steady_counts_are_not_flagged_and_record_is_deduplicated():
+    now = datetime.utcnow()
+    rows = [(i, now - timedelta(hours=12 * i + 1), 'Village B', 'cough', 'routine') for i in range(28)]
+    outbreak = monitor()
+    outbreak.sync(rows_loader(rows))
+    assert not outbreak.signals()[0]['anomalous']
+    assert outbreak.signals(anomalous_only=True) == []
+
+    created_at = now - timedelta(seconds=1)
+    outbreak.record(500, 'Village B', 'cough', 'routine', created_at)
+    outbreak.sync(rows_loader(rows + [(500, created_at, 'Village B', 'cough', 'routine')]), force=True)
+    assert outbreak.signals()[0]['window_count'] == 3
+
+
+def test_record_waits_for_the_first_rebuild():
+    outbreak = monitor()
+    outbreak.record(1, 'Village C', 'rash', 'urgent', datetime.utcnow())
+    assert outbreak.stats()['keys'] == 0
@@ -0,0 +1,63 @@
+import os
+import sys
+
+from conftest import ROOT
+from triage_engine import TriageEngine, has_emergency_symptoms, symptom_codes
+
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+from check_triage_equivalence import find_mismatches  # noqa: E402
+
+
+def test_rule_table_matches_legacy_logic_for_every_combination():
+    assert find_mismatches() == []
+
+
+def test_rules_apply_in_order():
+    engine = TriageEngine()
+    assert engine.score({'primary_symptom': 'cough', 'symptom_severity': 'mild',
+                         'emergency_symptoms': ['seizures']}) == 'emergency'
+    assert engine.score({'primary_symptom': 'cough', 'symptom_severity': 'very_severe'}) == 'emergency'
+    assert engine.score({'primary_symptom': 'breathing_difficulty', 'symptom_severity': 'mild'}) == 'urgent'
+    assert engine.score({'primary_symptom': 'fever', 'symptom_severity': 'moderate'}) == 'urgent'
+    assert engine.score({'primary_symptom': 'cough', 'symptom_severity': 'moderate'}) == 'routine'
+    assert engine.score({}) == 'routine'
+
+
+def test_score_batch_matches_score():
+    engine = TriageEngine()
+    records = [
+        {'primary_symptom': 'chest_pain', 'symptom_severity': 'severe'},
+        {'primary_symptom': 'rash', 'symptom_severity': 'mild', 'symptom_onset': 'today'},
+        {'primary_symptom': ['unhashable'], 'symptom_severity': None}
+    ]
+    assert engine.score_batch(records) == [engine.score(record) for record in records]
+    assert engine.score_batch([]) == []
+
+
+def test_none_means_no_emergency_symptom():
+    assert not has_emergency_symptoms([])
+    assert not has_emergency_symptoms(['none'])
+    assert not has_emergency_symptoms(['none', 'seizures'])
+    assert has_emergency_symptoms(['seizures'])
+
+
+def test_symptom_codes_normalizes_what_is_stored():
+    assert symptom_codes([' None ', 'Seizures', 'seizures', '']) == ['none', 'seizures']
+    assert symptom_codes('Fever') == ['fever']
+    assert symptom_codes(None) == []
+
+
+def test_only_exact_none_cancels_emergency_symptoms():
+    # Triage scores the list as submitted; only the exact 'none' code counts, as in the legacy logic
+    engine = TriageEngine()
+    record = {'primary_symptom': 'cough', 'symptom_severity': 'mild'}
+    for emergency in (['None'], [' none '], ['None', 'Seizures'], ['NONE', 'severe_bleeding'], ['none ', 'paralysis']):
+        assert engine.score({**record, 'emergency_symptoms': emergency}) == 'emergency'
+        assert engine.score_batch([{**record, 'emergency_symptoms': emergency}]) == ['emergency']
+    assert engine.score({**record, 'emergency_symptoms': ['none', 'seizures']}) == 'routine'
+
+
+def test_custom_rules():
+    engine = TriageEngine(rules=[({'primary_symptom': 'rash'}, 'urgent')], default_level='routine')
+    assert engine.score({'primary_symptom': 'rash'}) == 'urgent'
+    assert engine.score({'primary_symptom': 'fever', 'symptom_severity': 'very_severe'}) == 'routine'
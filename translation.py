@@ -0,0 +1,428 @@
+"""Machine translation with a persistent per-sentence cache and batched backend calls.
+
+Text is split into sentences, and each sentence is looked up in a cache keyed by
+(sha256 of the sentence, target language). Repeated phrases, which make up much of
+canned replies and LLM advice ("Drink plenty of fluids."), never reach the
+backend again. Cache misses from every request thread go through one batcher.
+It waits up to TRANSLATION_BATCH_WAIT_MS, collects up to TRANSLATION_BATCH_SIZE
+sentences and translates each target language's share in one backend call.
+At most TRANSLATION_CONCURRENCY calls run at once; while they are busy, the
+next batch keeps filling. Identical misses in flight share a single result.
+
+The cache lives in memory (an LRU of TRANSLATION_CACHE_MAX_ENTRIES) and is
+appended to a JSON Lines file, which is read back on startup. Restarted
+workers therefore start warm, and `flask --app app warm-translations` can fill
+the file ahead of time.
+
+Translation fails open. If the backend errors or takes longer than
+TRANSLATION_TIMEOUT, the untranslated sentence is returned and nothing is
+cached. Read paths pass ``wait=False``: a miss returns the untranslated
+sentence at once and is translated in the background for the next read.
+
+Backends are pluggable. TRANSLATION_BACKEND is ``none`` (the default: text is
+returned as it is), ``google`` (googletrans, a network call), ``dictionary``
+(a JSON glossary, offline), ``stub`` (marks text as translated, for tests
+and benchmarks) or ``module:Class`` for a ``TranslationBackend`` subclass.
+"""
+import asyncio
+import collections
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+# Sentence ends (Latin and Devanagari danda) followed by spaces, or line breaks
+SEGMENT_BOUNDARY = re.compile(r'(?<=[.!?।॥])[ \t]+|\n+')
+
+
+def split_segments(text):
+    """[(sentence, separator after it)], so that joining both gives back ``text``"""
+    segments = []
+    position = 0
+    for match in SEGMENT_BOUNDARY.finditer(text):
+        segments.append((text[position:match.start()], match.group()))
+        position = match.end()
+    segments.append((text[position:], ''))
+    return segments
+
+
+def needs_translation(segment):
+    return any(char.isalpha() for char in segment)
+
+
+def cache_key(text, target):
+    return f"{hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]}:{target}"
+
+
+class TranslationBackend:
+    name = None
+
+    def translate_batch(self, texts, target, source='auto'):
+        """Translations of ``texts`` in order, with None where there is none"""
+        raise NotImplementedError
+
+
+class IdentityBackend(TranslationBackend):
+    """No translation: every text is returned as it is"""
+
+    name = 'none'
+
+    def translate_batch(self, texts, target, source='auto'):
+        return [None] * len(texts)
+
+
+class GoogleTranslateBackend(TranslationBackend):
+    """googletrans, with a batch sent as one newline-joined request"""
+
+    name = 'google'
+    # Google's limit per request is 5000 characters
+    max_chars = 4500
+
+    def __init__(self, timeout=5.0):
+        from googletrans import Translator
+
+        self.translator_class = Translator
+        self.timeout = timeout
+        # googletrans 4.0 made translate() a coroutine
+        self.is_async = inspect.iscoroutinefunction(Translator.translate)
+        self.client = None if self.is_async else Translator(timeout=timeout)
+
+    def _translate(self, text, target, source):
+        if not self.is_async:
+            return self.client.translate(text, dest=target, src=source)
+
+        async def run():
+            # A fresh client per call: its connection pool belongs to this event loop
+            return await self.translator_class(timeout=self.timeout).translate(text, dest=target, src=source)
+
+        return asyncio.run(run())
+
+    def _chunks(self, texts):
+        chunk, size = [], 0
+        for text in texts:
+            if chunk and size + len(text) + 1 > self.max_chars:
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(text)
+            size += len(text) + 1
+        if chunk:
+            yield chunk
+
+    def translate_batch(self, texts, target, source='auto'):
+        results = []
+        for chunk in self._chunks(texts):
+            lines = self._translate('\n'.join(chunk), target, source).text.split('\n')
+            if len(lines) != len(chunk):
+                # The service merged or split lines; fall back to one request per text
+                lines = [result.text for result in self._translate(chunk, target, source)]
+            results.extend(lines)
+        return results
+
+
+class DictionaryBackend(TranslationBackend):
+    """Offline glossary: a JSON file of {target language: {source text: translation}}"""
+
+    name = 'dictionary'
+
+    def __init__(self, path=None):
+        self.table = {}
+        if path:
+            with open(path, encoding='utf-8') as f:
+                self.table = json.load(f)
+
+    def translate_batch(self, texts, target, source='auto'):
+        entries = self.table.get(target, {})
+        return [entries.get(text) for text in texts]
+
+
+class StubBackend(TranslationBackend):
+    """Offline stand-in: "[hi] text", after latency_ms per call"""
+
+    name = 'stub'
+
+    def __init__(self, latency_ms=0.0):
+        self.latency_ms = latency_ms
+
+    def translate_batch(self, texts, target, source='auto'):
+        time.sleep(self.latency_ms / 1000.0)
+        return [f'[{target}] {text}' for text in texts]
+
+
+BACKENDS = {cls.name: cls for cls in (IdentityBackend, GoogleTranslateBackend, DictionaryBackend, StubBackend)}
+
+
+class TranslationCache:
+    """LRU of translations, appended to a JSON Lines file and reloaded from it"""
+
+    def __init__(self, path=None, max_entries=100000):
+        self.path = path
+        self.max_entries = max_entries
+        self.loaded = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Read the cache file; rewrite it when it holds many superseded or evicted lines"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        lines = 0
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                lines += 1
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._entries[entry['k']] = entry['v']
+                self._entries.move_to_end(entry['k'])
+                if len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        self.loaded = len(self._entries)
+        if lines > 2 * max(len(self._entries), 1000):
+            self._compact()
+
+    def _compact(self):
+        temporary = f'{self.path}.{os.getpid()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            for key, value in self._entries.items():
+                f.write(json.dumps({'k': key, 'v': value}, ensure_ascii=False) + '\n')
+        os.replace(temporary, self.path)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set_many(self, items):
+        if not items:
+            return
+        with self._lock:
+            for key, value in items:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if self.path:
+            try:
+                # One write per batch; appends from several processes interleave by line
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(''.join(json.dumps({'k': key, 'v': value}, ensure_ascii=False) + '\n'
+                                    for key, value in items))
+            except OSError as e:
+                print(f"Translation cache write error: {e}")
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TranslationService:
+    def __init__(self, app=None):
+        self.enabled = True
+        self.backend = StubBackend()
+        self.cache = TranslationCache()
+        self.batch_size = 64
+        self.batch_wait = 0.01
+        self.timeout = 3.0
+        self.concurrency = 4
+        self.llm_languages = frozenset()
+        self.hits = 0
+        self.misses = 0
+        self.backend_calls = 0
+        self.backend_errors = 0
+        self.timeouts = 0
+        self._queue = collections.deque()
+        self._in_flight = {}
+        self._wakeup = threading.Condition()
+        self._thread = None
+        self._calls = None
+        self._slots = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('TRANSLATION_ENABLED', self.enabled)
+        self.batch_size = app.config.get('TRANSLATION_BATCH_SIZE', self.batch_size)
+        self.batch_wait = app.config.get('TRANSLATION_BATCH_WAIT_MS', self.batch_wait * 1000) / 1000.0
+        self.timeout = app.config.get('TRANSLATION_TIMEOUT', self.timeout)
+        self.concurrency = app.config.get('TRANSLATION_CONCURRENCY', self.concurrency)
+        self.llm_languages = frozenset(app.config.get('TRANSLATION_LLM_LANGUAGES') or ())
+        name = app.config.get('TRANSLATION_BACKEND', IdentityBackend.name)
+        options = {
+            'none': {},
+            'google': {'timeout': self.timeout},
+            'dictionary': {'path': app.config.get('TRANSLATION_DICTIONARY_PATH')},
+            'stub': {'latency_ms': app.config.get('TRANSLATION_STUB_LATENCY_MS', 0.0)}
+        }
+        if name in BACKENDS:
+            self.backend = BACKENDS[name](**options[name])
+        else:
+            module, _, attr = name.partition(':')
+            self.backend = getattr(importlib.import_module(module), attr)()
+        path = app.config.get('TRANSLATION_CACHE_PATH') or os.path.join(app.instance_path, 'translations.jsonl')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.cache = TranslationCache(path, app.config.get('TRANSLATION_CACHE_MAX_ENTRIES', 100000))
+        try:
+            self.cache.load()
+        except (OSError, ValueError) as e:
+            print(f"Translation cache load error: {e}")
+        app.extensions['translation'] = self
+
+    def prompt_language(self, language):
+        """Language to prompt the LLM in: English for TRANSLATION_LLM_LANGUAGES, else ``language``"""
+        return 'en' if self.enabled and language in self.llm_languages else language
+
+    def _ensure_batcher(self):
+        with self._lock:
+            # Threads do not survive a fork into a gunicorn worker
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._queue.clear()
+            self._in_flight.clear()
+            self._calls = ThreadPoolExecutor(self.concurrency, thread_name_prefix='translation')
+            self._slots = threading.BoundedSemaphore(self.concurrency)
+            self._thread = threading.Thread(target=self._run, name='translation-batcher', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _submit(self, text, target, source):
+        """Future for one uncached sentence; identical sentences in flight share it"""
+        key = cache_key(text, target)
+        with self._wakeup:
+            future = self._in_flight.get(key)
+            if future is None:
+                future = self._in_flight[key] = Future()
+                self._queue.append((key, text, target, source))
+                self._wakeup.notify()
+            return future
+
+    def _next_batch(self):
+        with self._wakeup:
+            while not self._queue:
+                self._wakeup.wait()
+            deadline = time.monotonic() + self.batch_wait
+            while len(self._queue) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._wakeup.wait(remaining)
+            return [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            by_target = collections.defaultdict(list)
+            for item in batch:
+                by_target[(item[2], item[3])].append(item)
+            for (target, source), items in by_target.items():
+                # Wait for a free call slot; misses queue up into the next batch meanwhile
+                self._slots.acquire()
+                self._calls.submit(self._translate_items, items, target, source)
+
+    def _translate_items(self, items, target, source):
+        try:
+            self._count('backend_calls')
+            results = self.backend.translate_batch([item[1] for item in items], target, source)
+        except Exception as e:
+            print(f"Translation backend error: {e}")
+            self._count('backend_errors')
+            results = []
+        finally:
+            self._slots.release()
+        # A short answer must not leave a waiting request without a result
+        results = list(results)[:len(items)] + [None] * (len(items) - len(results))
+        self.cache.set_many([(item[0], result) for item, result in zip(items, results) if result])
+        with self._wakeup:
+            futures = [self._in_flight.pop(item[0]) for item in items]
+        for future, result in zip(futures, results):
+            future.set_result(result)
+
+    def translate_many(self, texts, target, source='auto', wait=True):
+        """Each text in ``target``, sentence by sentence; untranslatable sentences are left as they are
+
+        With ``wait=False``, uncached sentences are queued for the batcher and
+        returned untranslated instead of waiting up to TRANSLATION_TIMEOUT.
+        """
+        if not self.enabled or not target or isinstance(self.backend, IdentityBackend):
+            return list(texts)
+        split = [split_segments(text or '') for text in texts]
+        translated = {}
+        pending = {}
+        for segments in split:
+            for segment, _ in segments:
+                if segment in translated or segment in pending or not needs_translation(segment):
+                    continue
+                cached = self.cache.get(cache_key(segment, target))
+                if cached is not None:
+                    translated[segment] = cached
+                else:
+                    pending[segment] = None
+
+        with self._lock:
+            self.hits += len(translated)
+            self.misses += len(pending)
+        if pending:
+            self._ensure_batcher()
+            for segment in pending:
+                pending[segment] = self._submit(segment, target, source)
+            if not wait:
+                pending = {}
+            deadline = time.monotonic() + self.timeout
+            for segment, future in pending.items():
+                try:
+                    result = future.result(timeout=max(deadline - time.monotonic(), 0))
+                except FutureTimeoutError:
+                    self._count('timeouts')
+                    result = None
+                if result:
+                    translated[segment] = result
+
+        return [
+            ''.join(translated.get(segment, segment) + separator for segment, separator in segments)
+            for segments in split
+        ]
+
+    def translate(self, text, target, source='auto', wait=True):
+        return self.translate_many([text], target, source, wait)[0]
+
+    def translate_stream(self, chunks, target, source='auto'):
+        """Translate streamed text a sentence at a time, yielding each as soon as it is complete"""
+        buffer = ''
+        for chunk in chunks:
+            buffer += chunk
+            segments = split_segments(buffer)
+            if len(segments) > 1:
+                complete = ''.join(segment + separator for segment, separator in segments[:-1])
+                buffer = segments[-1][0]
+                yield self.translate(complete, target, source)
+        if buffer:
+            yield self.translate(buffer, target, source)
+
+    def _count(self, attr):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'backend': self.backend.name,
+            'cached_sentences': len(self.cache),
+            'loaded_from_disk': self.cache.loaded,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'backend_calls': self.backend_calls,
+            'sentences_per_call': round(self.misses / self.backend_calls, 2) if self.backend_calls else None,
+            'backend_errors': self.backend_errors,
+            'timeouts': self.timeouts,
+            'llm_languages': sorted(self.llm_languages)
+        }
@@ -0,0 +1,128 @@
+"""Table-driven triage scoring with a vectorized batch path.
+
+Triage rules are declared as data in TRIAGE_RULES and evaluated top to bottom,
+first match wins. At import time the rules are compiled into a dense NumPy
+lookup table indexed by (primary symptom, severity, onset, emergency flag)
+codes. Scoring one record is then a single table lookup, and scoring a batch
+is one fancy-indexing operation over the encoded columns.
+"""
+import itertools
+
+import numpy as np
+
+LEVELS = ('routine', 'urgent', 'emergency')
+DEFAULT_LEVEL = 'routine'
+
+# Each rule is (conditions, level). A condition value may be a single value or
+# a tuple of allowed values; 'emergency' is the emergency-symptom flag.
+TRIAGE_RULES = [
+    ({'emergency': True}, 'emergency'),
+    ({'symptom_severity': 'very_severe'}, 'emergency'),
+    ({'primary_symptom': 'chest_pain', 'symptom_severity': 'severe'}, 'urgent'),
+    ({'primary_symptom': 'breathing_difficulty'}, 'urgent'),
+    ({'primary_symptom': ('fever', 'abdominal_pain'), 'symptom_severity': 'severe'}, 'urgent'),
+    ({'symptom_onset': 'today', 'symptom_severity': 'severe'}, 'urgent'),
+    ({'symptom_severity': 'severe'}, 'urgent'),
+    ({'primary_symptom': ('fever', 'chest_pain', 'abdominal_pain'), 'symptom_severity': 'moderate'}, 'urgent'),
+]
+
+FIELDS = ('primary_symptom', 'symptom_severity', 'symptom_onset')
+
+# Sentinel for any value the rules never mention; code 0 on every axis
+OTHER = object()
+
+
+def symptom_codes(values):
+    """Normalize a reported symptom list to distinct, lower-case codes"""
+    if isinstance(values, str):
+        values = [values]
+    codes = []
+    for value in values or []:
+        code = str(value).strip().lower()[:50]
+        if code and code not in codes:
+            codes.append(code)
+    return codes
+
+
+def has_emergency_symptoms(emergency_symptoms):
+    """True when the patient reported an emergency symptom other than 'none'"""
+    return bool(emergency_symptoms) and 'none' not in emergency_symptoms
+
+
+def _as_tuple(value):
+    return value if isinstance(value, tuple) else (value,)
+
+
+class TriageEngine:
+    def __init__(self, rules=TRIAGE_RULES, default_level=DEFAULT_LEVEL):
+        self.rules = rules
+        self.default_level = default_level
+
+        # Per-field vocabularies: only values the rules mention get their own code
+        self.codes = {}
+        for field in FIELDS:
+            values = []
+            for conditions, _ in rules:
+                for value in _as_tuple(conditions.get(field, ())):
+                    if value not in values:
+                        values.append(value)
+            self.codes[field] = {value: index + 1 for index, value in enumerate(values)}
+
+        axes = [[OTHER] + list(self.codes[field]) for field in FIELDS] + [[False, True]]
+        self.table = np.empty([len(axis) for axis in axes], dtype=np.int8)
+        for index in itertools.product(*(range(len(axis)) for axis in axes)):
+            record = {field: axes[i][index[i]] for i, field in enumerate(FIELDS)}
+            record['emergency'] = axes[-1][index[-1]]
+            self.table[index] = LEVELS.index(self._evaluate(record))
+        # Nested lists index faster than NumPy for one record at a time
+        self._nested = self.table.tolist()
+
+    def _evaluate(self, record):
+        for conditions, level in self.rules:
+            if all(record[field] in _as_tuple(allowed) for field, allowed in conditions.items()):
+                return level
+        return self.default_level
+
+    def _encode(self, field, value):
+        try:
+            return self.codes[field].get(value, 0)
+        except TypeError:
+            return 0
+
+    def score(self, symptom_data):
+        """Triage level for one symptom record"""
+        symptom = self._encode('primary_symptom', symptom_data.get('primary_symptom'))
+        severity = self._encode('symptom_severity', symptom_data.get('symptom_severity'))
+        onset = self._encode('symptom_onset', symptom_data.get('symptom_onset'))
+        emergency = has_emergency_symptoms(symptom_data.get('emergency_symptoms', []))
+        return LEVELS[self._nested[symptom][severity][onset][emergency]]
+
+    def encode_batch(self, records):
+        """Encode records into one int array per lookup axis"""
+        columns = []
+        for field in FIELDS:
+            codes = self.codes[field]
+            try:
+                encoded = [codes.get(record.get(field), 0) for record in records]
+            except TypeError:
+                encoded = [self._encode(field, record.get(field)) for record in records]
+            columns.append(np.array(encoded, dtype=np.intp))
+        columns.append(np.array(
+            [has_emergency_symptoms(record.get('emergency_symptoms', [])) for record in records],
+            dtype=np.intp
+        ))
+        return columns
+
+    def score_arrays(self, primary_codes, severity_codes, onset_codes, emergency_flags):
+        """Vectorized lookup over pre-encoded arrays; returns level indexes into LEVELS"""
+        return self.table[primary_codes, severity_codes, onset_codes, emergency_flags]
+
+    def score_batch(self, records):
+        """Triage levels for a sequence of symptom records"""
+        if not len(records):
+            return []
+        level_codes = self.score_arrays(*self.encode_batch(records))
+        return np.asarray(LEVELS, dtype=object)[level_codes].tolist()
+
+
+triage_engine = TriageEngine()
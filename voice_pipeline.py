@@ -0,0 +1,322 @@
+"""Voice messages: streamed uploads, transcoding and transcription off the API workers.
+
+A voice message goes through these stages, each timed:
+
+1. upload: the request body is copied to VOICE_UPLOAD_DIR in fixed-size
+   chunks, so a large recording never sits in memory;
+2. transcode and transcribe: a process pool decodes the file with pydub to
+   16 kHz mono WAV and passes it to the recognizer. CPU-heavy audio work
+   stays out of the API processes and their GIL;
+3. reply: when the pool finishes, a background job feeds the transcript
+   into the chat flow like a typed message.
+
+Backpressure is per process. At most VOICE_MAX_UPLOADS bodies are written at
+once, and at most VOICE_MAX_PENDING files wait for or occupy the pool. Beyond
+that, uploads are refused straight away instead of queueing without bound.
+
+Recognizers are pluggable. VOICE_RECOGNIZER names a built-in one (``google``,
+or the offline ``stub``), or gives ``module:Class`` for any ``Recognizer``
+subclass. The recognizer is built inside the pool process, so it must be
+importable there.
+"""
+import collections
+import importlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Content-Type of an upload -> file extension pydub decodes it by
+AUDIO_TYPES = {
+    'audio/wav': 'wav', 'audio/x-wav': 'wav', 'audio/wave': 'wav',
+    'audio/mpeg': 'mp3', 'audio/mp3': 'mp3',
+    'audio/ogg': 'ogg', 'audio/webm': 'webm',
+    'audio/mp4': 'm4a', 'audio/m4a': 'm4a', 'audio/x-m4a': 'm4a',
+    'audio/amr': 'amr', 'audio/3gpp': '3gp'
+}
+
+# App language -> recognizer locale
+LANGUAGE_LOCALES = {
+    'en': 'en-IN', 'hi': 'hi-IN', 'bn': 'bn-IN', 'te': 'te-IN', 'mr': 'mr-IN', 'ta': 'ta-IN',
+    'gu': 'gu-IN', 'kn': 'kn-IN', 'ml': 'ml-IN', 'pa': 'pa-IN', 'or': 'or-IN'
+}
+
+STAGES = ('upload', 'queue', 'transcode', 'transcribe', 'reply', 'total')
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class PipelineBusy(Exception):
+    pass
+
+
+class Recognizer:
+    name = None
+
+    def transcribe(self, wav_path, language):
+        """Text spoken in a 16 kHz mono WAV file, or '' if nothing was recognized"""
+        raise NotImplementedError
+
+
+class GoogleRecognizer(Recognizer):
+    """speech_recognition's Google Web Speech API client"""
+
+    name = 'google'
+
+    def __init__(self, timeout=30.0):
+        self.timeout = timeout
+
+    def transcribe(self, wav_path, language):
+        import speech_recognition as sr
+
+        recognizer = sr.Recognizer()
+        recognizer.operation_timeout = self.timeout
+        with sr.AudioFile(wav_path) as source:
+            audio = recognizer.record(source)
+        try:
+            return recognizer.recognize_google(audio, language=LANGUAGE_LOCALES.get(language, language))
+        except sr.UnknownValueError:
+            return ''
+
+
+class StubRecognizer(Recognizer):
+    """Offline stand-in that returns a fixed transcript after cpu_ms of work per second of audio"""
+
+    name = 'stub'
+
+    def __init__(self, transcript='I have had a fever and a headache since yesterday', cpu_ms=0.0):
+        self.transcript = transcript
+        self.cpu_ms = cpu_ms
+
+    def transcribe(self, wav_path, language):
+        import wave
+
+        with wave.open(wav_path, 'rb') as audio:
+            seconds = audio.getnframes() / audio.getframerate()
+        deadline = time.perf_counter() + seconds * self.cpu_ms / 1000.0
+        while time.perf_counter() < deadline:
+            pass
+        return self.transcript
+
+
+RECOGNIZERS = {cls.name: cls for cls in (GoogleRecognizer, StubRecognizer)}
+
+# Recognizers built in this pool process, by (spec, options)
+_recognizers = {}
+
+
+def load_recognizer(spec, options):
+    key = (spec, tuple(sorted(options.items())))
+    if key not in _recognizers:
+        if spec in RECOGNIZERS:
+            cls = RECOGNIZERS[spec]
+        else:
+            module, _, name = spec.partition(':')
+            cls = getattr(importlib.import_module(module), name)
+        _recognizers[key] = cls(**options)
+    return _recognizers[key]
+
+
+def process_audio(source_path, language, recognizer_spec, recognizer_options, max_seconds, submitted_at):
+    """Pool process: decode to 16 kHz mono WAV and transcribe. Returns (transcript, seconds, timings)"""
+    from pydub import AudioSegment
+
+    started = time.time()
+    timings = {'queue': started - submitted_at}
+    audio = AudioSegment.from_file(source_path)
+    seconds = len(audio) / 1000.0
+    if seconds > max_seconds:
+        raise ValueError(f'Recording is {seconds:.0f}s long; the limit is {max_seconds}s')
+    wav_path = os.path.splitext(source_path)[0] + '-16k.wav'
+    audio.set_channels(1).set_frame_rate(16000).set_sample_width(2).export(wav_path, format='wav')
+    transcoded = time.time()
+    timings['transcode'] = transcoded - started
+    try:
+        transcript = load_recognizer(recognizer_spec, recognizer_options).transcribe(wav_path, language)
+    finally:
+        os.remove(wav_path)
+    timings['transcribe'] = time.time() - transcoded
+    return (transcript or '').strip(), seconds, timings
+
+
+class VoicePipeline:
+    def __init__(self, app=None):
+        self.enabled = True
+        self.upload_dir = 'voice'
+        self.chunk_size = 64 * 1024
+        self.max_bytes = 10 * 1024 * 1024
+        self.max_seconds = 120
+        self.workers = 2
+        self.max_pending = 32
+        self.max_uploads = 8
+        self.start_method = 'forkserver'
+        self.recognizer = 'google'
+        self.recognizer_options = {}
+        self.accepted = 0
+        self.rejected = 0
+        self.transcribed = 0
+        self.failed = 0
+        self._pending = 0
+        self._timings = {stage: collections.deque(maxlen=1000) for stage in STAGES}
+        self._uploads = threading.BoundedSemaphore(self.max_uploads)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('VOICE_ENABLED', self.enabled)
+        self.upload_dir = app.config.get('VOICE_UPLOAD_DIR') or os.path.join(app.instance_path, 'voice')
+        self.max_bytes = app.config.get('VOICE_MAX_UPLOAD_BYTES', self.max_bytes)
+        self.max_seconds = app.config.get('VOICE_MAX_SECONDS', self.max_seconds)
+        self.workers = app.config.get('VOICE_WORKERS', self.workers)
+        self.max_pending = app.config.get('VOICE_MAX_PENDING', self.max_pending)
+        self.max_uploads = app.config.get('VOICE_MAX_UPLOADS', self.max_uploads)
+        self.start_method = app.config.get('VOICE_POOL_START_METHOD', self.start_method)
+        self.recognizer = app.config.get('VOICE_RECOGNIZER', self.recognizer)
+        if self.recognizer == 'stub':
+            self.recognizer_options = {
+                'transcript': app.config.get('VOICE_STUB_TRANSCRIPT', StubRecognizer().transcript),
+                'cpu_ms': app.config.get('VOICE_STUB_CPU_MS', 0.0)
+            }
+        elif self.recognizer == 'google':
+            self.recognizer_options = {'timeout': app.config.get('VOICE_RECOGNIZER_TIMEOUT', 30.0)}
+        self._uploads = threading.BoundedSemaphore(self.max_uploads)
+        os.makedirs(self.upload_dir, exist_ok=True)
+        app.extensions['voice_pipeline'] = self
+
+    def _executor_for_process(self, broken=None):
+        with self._lock:
+            # A pool inherited through fork has no worker processes of its own,
+            # and a pool whose worker died refuses new work
+            if self._executor is None or self._executor is broken or self._pid != os.getpid():
+                context = multiprocessing.get_context(self.start_method)
+                if self.start_method == 'forkserver':
+                    # The server imports this module once instead of the entry script
+                    context.set_forkserver_preload([__name__])
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                self._pid = os.getpid()
+            return self._executor
+
+    def check_capacity(self):
+        """Raise PipelineBusy before an upload that submit() would refuse anyway"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise PipelineBusy('Too many voice messages waiting to be transcribed')
+
+    def observe(self, timings):
+        with self._lock:
+            for stage, seconds in timings.items():
+                if stage in self._timings and seconds is not None:
+                    self._timings[stage].append(seconds)
+
+    def save_upload(self, stream, path, content_length=None):
+        """Copy an upload to ``path`` a chunk at a time; returns (bytes written, seconds)"""
+        if content_length is not None and content_length > self.max_bytes:
+            raise UploadTooLarge(f'Recording is larger than {self.max_bytes} bytes')
+        if not self._uploads.acquire(blocking=False):
+            self._count('rejected')
+            raise PipelineBusy('Too many voice uploads in progress')
+        started = time.perf_counter()
+        written = 0
+        try:
+            with open(path, 'wb') as out:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    written += len(chunk)
+                    if written > self.max_bytes:
+                        raise UploadTooLarge(f'Recording is larger than {self.max_bytes} bytes')
+                    out.write(chunk)
+        except Exception:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        finally:
+            self._uploads.release()
+        return written, time.perf_counter() - started
+
+    def submit(self, path, language, on_done):
+        """Transcode and transcribe ``path`` in the pool; ``on_done(outcome)`` runs on a pool thread
+
+        ``outcome`` has transcript, seconds and timings, or error.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise PipelineBusy('Too many voice messages waiting to be transcribed')
+            self._pending += 1
+            self.accepted += 1
+
+        executor = None
+
+        def finished(future):
+            try:
+                transcript, seconds, timings = future.result()
+                outcome = {'transcript': transcript, 'seconds': seconds, 'timings': timings}
+                self.observe(timings)
+            except BrokenProcessPool as e:
+                outcome = {'error': f'Transcription worker died: {e}'}
+                self._executor_for_process(broken=executor)
+            except Exception as e:
+                outcome = {'error': f'{type(e).__name__}: {e}'}
+            with self._lock:
+                self._pending -= 1
+                if 'error' in outcome:
+                    self.failed += 1
+                else:
+                    self.transcribed += 1
+            try:
+                on_done(outcome)
+            except Exception as e:
+                print(f"Voice pipeline callback error: {e}")
+
+        args = (process_audio, path, language, self.recognizer, self.recognizer_options, self.max_seconds)
+        try:
+            executor = self._executor_for_process()
+            try:
+                future = executor.submit(*args, time.time())
+            except BrokenProcessPool:
+                executor = self._executor_for_process(broken=executor)
+                future = executor.submit(*args, time.time())
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(finished)
+
+    def _count(self, attr):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def stats(self):
+        with self._lock:
+            stages = {}
+            for stage, samples in self._timings.items():
+                ordered = sorted(samples)
+                stages[stage] = {
+                    'count': len(ordered),
+                    'p50_ms': round(ordered[len(ordered) // 2] * 1000, 1) if ordered else None,
+                    'p95_ms': round(ordered[max(int(len(ordered) * 0.95) - 1, 0)] * 1000, 1) if ordered else None,
+                    'max_ms': round(ordered[-1] * 1000, 1) if ordered else None
+                }
+            pending = self._pending
+        return {
+            'enabled': self.enabled,
+            'recognizer': self.recognizer,
+            'workers': self.workers,
+            'pending': pending,
+            'max_pending': self.max_pending,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'transcribed': self.transcribed,
+            'failed': self.failed,
+            'stages': stages
+        }